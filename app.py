@@ -1,6 +1,10 @@
 import os
 import json
-from datetime import datetime
+import hashlib
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
 
 import requests
 import streamlit as st
@@ -24,6 +28,51 @@ if not BACKEND_URL:
 
 PREDICT_URL = f"{BACKEND_URL}/predict"
 AGENT_URL = f"{BACKEND_URL}/agent"
+BATCH_URL = f"{BACKEND_URL}/predict/batch"
+
+# Building this dashboard belongs to and its key; sent as X-Tenant-ID /
+# X-Tenant-Key on every backend call (unset: the backend's default tenant)
+TENANT_ID = os.getenv("TENANT_ID", "")
+TENANT_KEY = os.getenv("TENANT_KEY", "")
+TENANT_HEADERS = {"X-Tenant-ID": TENANT_ID, "X-Tenant-Key": TENANT_KEY} if TENANT_ID else {}
+
+# Backend HTTP client: pooled keep-alive connections shared across reruns
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "4"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "16"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+HTTP_BACKOFF = float(os.getenv("HTTP_BACKOFF", "0.3"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "0") == "1"
+
+# Dashboard aggregates served by the backend /stats endpoints
+STATS_URL = f"{BACKEND_URL}/stats"
+STATS_REFRESH_S = int(os.getenv("STATS_REFRESH_S", "30"))
+STATS_GROUP_BY = os.getenv("STATS_GROUP_BY", "Location_Code")
+CHART_WIDTH_PX = int(os.getenv("CHART_WIDTH_PX", "900"))
+DASHBOARD_RANGES = {"7 Days": 7, "30 Days": 30, "90 Days": 90, "1 Year": 365}
+
+# Live mode: backend SSE feed applied as deltas at LIVE_FPS frames per second
+STREAM_URL = f"{BACKEND_URL}/stream"
+LIVE_FPS = float(os.getenv("LIVE_FPS", "1"))
+LIVE_BUFFER = int(os.getenv("LIVE_BUFFER", "5000"))
+# Most recent predictions a session keeps in its history list
+LIVE_HISTORY = int(os.getenv("LIVE_HISTORY", "5000"))
+
+# What-if sweeps: sweepable features with their input ranges
+SWEEP_FEATURES = {
+    "Pressure": ("💨 Pressure (PSI)", 0.0, 200.0),
+    "Flow_Rate": ("🌊 Flow Rate (L/min)", 0.0, 500.0),
+    "Temperature": ("🌡️ Temperature (°F)", 0.0, 200.0),
+    "Vibration": ("📳 Vibration (Hz)", 0.0, 10.0),
+    "RPM": ("⚙️ RPM", 0.0, 5000.0),
+    "Operational_Hours": ("⏱️ Operational Hours", 0.0, 50000.0),
+}
+SWEEP_MAX_STEPS = int(os.getenv("SWEEP_MAX_STEPS", "50"))
+
+# Stylesheets live in static/; with server.enableStaticServing they are
+# linked (and cached by the browser) instead of re-sent on every rerun
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+STATIC_URL = os.getenv("STATIC_URL", "app/static")
+STATIC_SERVING = st.get_option("server.enableStaticServing")
 
 ROOMS = [
     "Kitchen",
@@ -35,6 +84,99 @@ ROOMS = [
     "Basement",
 ]
 
+ROOM_BLUEPRINTS = {
+    "Kitchen": {
+        "pipes": [
+            {"type": "horizontal", "top": "30%", "left": "10%", "width": "40%"},
+            {"type": "vertical", "top": "30%", "left": "50%", "height": "40%"},
+            {"type": "horizontal", "top": "70%", "left": "50%", "width": "30%"},
+        ],
+        "nodes": [
+            {"type": "inlet", "top": "30%", "left": "10%", "label": "Main Inlet"},
+            {"type": "junction", "top": "30%", "left": "50%", "label": "T-Junction"},
+            {"type": "fixture", "top": "70%", "left": "50%", "label": "Sink"},
+            {"type": "fixture", "top": "70%", "left": "80%", "label": "Dishwasher"},
+            {"type": "leak", "top": "30%", "left": "35%", "label": "⚠️ Leak Detected"},
+        ]
+    },
+    "Bathroom": {
+        "pipes": [
+            {"type": "vertical", "top": "10%", "left": "30%", "height": "60%"},
+            {"type": "horizontal", "top": "40%", "left": "30%", "width": "50%"},
+            {"type": "vertical", "top": "40%", "left": "80%", "height": "30%"},
+        ],
+        "nodes": [
+            {"type": "inlet", "top": "10%", "left": "30%", "label": "Main Inlet"},
+            {"type": "junction", "top": "40%", "left": "30%", "label": "Junction"},
+            {"type": "fixture", "top": "70%", "left": "30%", "label": "Toilet"},
+            {"type": "fixture", "top": "40%", "left": "80%", "label": "Shower"},
+            {"type": "fixture", "top": "70%", "left": "80%", "label": "Sink"},
+        ]
+    },
+    "Master Bathroom": {
+        "pipes": [
+            {"type": "horizontal", "top": "20%", "left": "15%", "width": "70%"},
+            {"type": "vertical", "top": "20%", "left": "40%", "height": "50%"},
+            {"type": "vertical", "top": "20%", "left": "85%", "height": "35%"},
+        ],
+        "nodes": [
+            {"type": "inlet", "top": "20%", "left": "15%", "label": "Main Inlet"},
+            {"type": "junction", "top": "20%", "left": "40%", "label": "Splitter"},
+            {"type": "junction", "top": "20%", "left": "85%", "label": "T-Joint"},
+            {"type": "fixture", "top": "70%", "left": "40%", "label": "Bathtub"},
+            {"type": "fixture", "top": "55%", "left": "85%", "label": "Dual Sink"},
+            {"type": "leak", "top": "45%", "left": "40%", "label": "⚠️ Minor Leak"},
+        ]
+    },
+    "Living Room": {
+        "pipes": [
+            {"type": "horizontal", "top": "50%", "left": "20%", "width": "60%"},
+        ],
+        "nodes": [
+            {"type": "inlet", "top": "50%", "left": "20%", "label": "Main Line"},
+            {"type": "junction", "top": "50%", "left": "50%", "label": "Pass-through"},
+            {"type": "fixture", "top": "50%", "left": "80%", "label": "Radiator"},
+        ]
+    },
+    "Laundry": {
+        "pipes": [
+            {"type": "vertical", "top": "15%", "left": "40%", "height": "55%"},
+            {"type": "horizontal", "top": "40%", "left": "40%", "width": "35%"},
+        ],
+        "nodes": [
+            {"type": "inlet", "top": "15%", "left": "40%", "label": "Main Inlet"},
+            {"type": "junction", "top": "40%", "left": "40%", "label": "T-Junction"},
+            {"type": "fixture", "top": "70%", "left": "40%", "label": "Utility Sink"},
+            {"type": "fixture", "top": "40%", "left": "75%", "label": "Washer"},
+            {"type": "leak", "top": "55%", "left": "40%", "label": "⚠️ High Risk"},
+        ]
+    },
+    "Balcony": {
+        "pipes": [
+            {"type": "horizontal", "top": "35%", "left": "25%", "width": "50%"},
+        ],
+        "nodes": [
+            {"type": "inlet", "top": "35%", "left": "25%", "label": "Main Inlet"},
+            {"type": "fixture", "top": "35%", "left": "75%", "label": "Outdoor Tap"},
+        ]
+    },
+    "Basement": {
+        "pipes": [
+            {"type": "horizontal", "top": "25%", "left": "10%", "width": "80%"},
+            {"type": "vertical", "top": "25%", "left": "30%", "height": "45%"},
+            {"type": "vertical", "top": "25%", "left": "70%", "height": "45%"},
+        ],
+        "nodes": [
+            {"type": "inlet", "top": "25%", "left": "10%", "label": "Main Supply"},
+            {"type": "junction", "top": "25%", "left": "30%", "label": "Branch A"},
+            {"type": "junction", "top": "25%", "left": "70%", "label": "Branch B"},
+            {"type": "fixture", "top": "70%", "left": "30%", "label": "Boiler"},
+            {"type": "fixture", "top": "70%", "left": "70%", "label": "Water Heater"},
+            {"type": "fixture", "top": "25%", "left": "90%", "label": "Main Valve"},
+        ]
+    },
+}
+
 # ========================
 # Session State
 # ========================
@@ -51,19 +193,27 @@ if "last_prediction" not in st.session_state:
 if "sound_enabled" not in st.session_state:
     st.session_state.sound_enabled = True
 
+if "live_mode" not in st.session_state:
+    st.session_state.live_mode = False
+
+if "live_cursor" not in st.session_state:
+    st.session_state.live_cursor = 0
+
 if "agent_history" not in st.session_state:
     st.session_state.agent_history = []
 
+if "agent_session_id" not in st.session_state:
+    st.session_state.agent_session_id = None
+
 if "dummy_predictions" not in st.session_state:
     # Generate dummy historical data
     import random
-    from datetime import timedelta
     
     predictions = []
     base_time = datetime.now() - timedelta(days=7)
     
     for i in range(50):
-        time = base_time + timedelta(hours=i*3.36)
+        ts = base_time + timedelta(hours=i*3.36)
         room = random.choice(ROOMS)
         risk_levels = ["low", "low", "low", "medium", "medium", "high", "critical"]
         risk = random.choice(risk_levels)
@@ -78,7 +228,7 @@ if "dummy_predictions" not in st.session_state:
             prob = random.uniform(0.75, 0.95)
         
         predictions.append({
-            "timestamp": time,
+            "timestamp": ts,
             "room": room,
             "risk_level": risk,
             "probability": prob,
@@ -89,567 +239,29 @@ if "dummy_predictions" not in st.session_state:
         })
     
     st.session_state.dummy_predictions = predictions
+    # Rows trimmed off the front of the history so far
+    st.session_state.history_dropped = 0
 
 # ========================
 # Professional Styling
 # ========================
 
-def inject_global_styles():
-    css = """
-    <style>
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700;800&display=swap');
-    
-    * {
-        box-sizing: border-box;
-        margin: 0;
-        padding: 0;
-    }
-
-    .stApp {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        font-family: 'Inter', -apple-system, BlinkMacSystemFont, sans-serif;
-    }
-
-    /* Hide Streamlit branding */
-    header[data-testid="stHeader"], 
-    footer, 
-    #MainMenu,
-    .stDeployButton {
-        visibility: hidden;
-        height: 0;
-        display: none;
-    }
-
-    /* Custom scrollbar */
-    ::-webkit-scrollbar {
-        width: 8px;
-        height: 8px;
-    }
-
-    ::-webkit-scrollbar-track {
-        background: rgba(255, 255, 255, 0.1);
-        border-radius: 10px;
-    }
-
-    ::-webkit-scrollbar-thumb {
-        background: rgba(255, 255, 255, 0.3);
-        border-radius: 10px;
-    }
-
-    ::-webkit-scrollbar-thumb:hover {
-        background: rgba(255, 255, 255, 0.5);
-    }
-
-    /* Main container */
-    .main-container {
-        max-width: 1400px;
-        margin: 0 auto;
-        padding: 2rem 1.5rem;
-    }
-
-    /* Professional Navigation Bar */
-    .pro-navbar {
-        background: rgba(255, 255, 255, 0.95);
-        backdrop-filter: blur(20px);
-        border-radius: 16px;
-        padding: 1rem 1.5rem;
-        margin-bottom: 2rem;
-        box-shadow: 0 8px 32px rgba(0, 0, 0, 0.1);
-        border: 1px solid rgba(255, 255, 255, 0.8);
-        display: flex;
-        justify-content: space-between;
-        align-items: center;
-        flex-wrap: wrap;
-        gap: 1rem;
-    }
-
-    .navbar-brand {
-        display: flex;
-        align-items: center;
-        gap: 0.75rem;
-    }
-
-    .brand-logo {
-        width: 40px;
-        height: 40px;
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        border-radius: 10px;
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        font-size: 1.5rem;
-    }
-
-    .brand-text {
-        display: flex;
-        flex-direction: column;
-    }
-
-    .brand-name {
-        font-size: 1.25rem;
-        font-weight: 700;
-        color: #1a202c;
-        line-height: 1.2;
-    }
-
-    .brand-tagline {
-        font-size: 0.75rem;
-        color: #718096;
-        font-weight: 500;
-    }
-
-    /* Professional Cards */
-    .pro-card {
-        background: rgba(255, 255, 255, 0.95);
-        backdrop-filter: blur(20px);
-        border-radius: 16px;
-        padding: 2rem;
-        box-shadow: 0 8px 32px rgba(0, 0, 0, 0.1);
-        border: 1px solid rgba(255, 255, 255, 0.8);
-        margin-bottom: 1.5rem;
-        transition: all 0.3s ease;
-    }
-
-    .pro-card:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 12px 40px rgba(0, 0, 0, 0.15);
-    }
-
-    .card-header {
-        display: flex;
-        justify-content: space-between;
-        align-items: center;
-        margin-bottom: 1.5rem;
-        padding-bottom: 1rem;
-        border-bottom: 2px solid #e2e8f0;
-    }
-
-    .card-title {
-        font-size: 1.5rem;
-        font-weight: 700;
-        color: #1a202c;
-        display: flex;
-        align-items: center;
-        gap: 0.5rem;
-    }
-
-    .card-badge {
-        font-size: 0.75rem;
-        padding: 0.25rem 0.75rem;
-        border-radius: 12px;
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        font-weight: 600;
-    }
-
-    /* Hero Section */
-    .hero-section {
-        background: rgba(255, 255, 255, 0.95);
-        backdrop-filter: blur(20px);
-        border-radius: 20px;
-        padding: 3rem;
-        margin-bottom: 2rem;
-        box-shadow: 0 12px 48px rgba(0, 0, 0, 0.15);
-        border: 1px solid rgba(255, 255, 255, 0.8);
-    }
-
-    .hero-title {
-        font-size: 3rem;
-        font-weight: 800;
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        margin-bottom: 1rem;
-        line-height: 1.2;
-    }
-
-    .hero-subtitle {
-        font-size: 1.25rem;
-        color: #4a5568;
-        margin-bottom: 2rem;
-        line-height: 1.6;
-        max-width: 600px;
-    }
-
-    .hero-stats {
-        display: grid;
-        grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-        gap: 1.5rem;
-        margin-top: 2rem;
-    }
-
-    .stat-card {
-        background: linear-gradient(135deg, rgba(102, 126, 234, 0.1) 0%, rgba(118, 75, 162, 0.1) 100%);
-        border-radius: 12px;
-        padding: 1.5rem;
-        border: 1px solid rgba(102, 126, 234, 0.2);
-    }
-
-    .stat-value {
-        font-size: 2rem;
-        font-weight: 700;
-        color: #667eea;
-        margin-bottom: 0.25rem;
-    }
-
-    .stat-label {
-        font-size: 0.875rem;
-        color: #718096;
-        font-weight: 500;
-    }
-
-    /* Risk Indicators */
-    .risk-indicator {
-        display: inline-flex;
-        align-items: center;
-        gap: 0.5rem;
-        padding: 0.5rem 1rem;
-        border-radius: 12px;
-        font-size: 0.875rem;
-        font-weight: 600;
-    }
-
-    .risk-low {
-        background: rgba(72, 187, 120, 0.1);
-        color: #22543d;
-        border: 1px solid rgba(72, 187, 120, 0.3);
-    }
-
-    .risk-medium {
-        background: rgba(237, 137, 54, 0.1);
-        color: #7c2d12;
-        border: 1px solid rgba(237, 137, 54, 0.3);
-    }
+@st.cache_resource
+def load_stylesheet(name: str):
+    """Read a stylesheet from static/ once per process; return (css, version)."""
+    with open(os.path.join(STATIC_DIR, name), encoding="utf-8") as f:
+        css = f.read()
+    return css, hashlib.sha1(css.encode()).hexdigest()[:10]
 
-    .risk-high {
-        background: rgba(245, 101, 101, 0.1);
-        color: #742a2a;
-        border: 1px solid rgba(245, 101, 101, 0.3);
-    }
-
-    .risk-critical {
-        background: rgba(220, 38, 38, 0.1);
-        color: #7f1d1d;
-        border: 1px solid rgba(220, 38, 38, 0.3);
-        animation: pulse-border 2s infinite;
-    }
-
-    @keyframes pulse-border {
-        0%, 100% {
-            border-color: rgba(220, 38, 38, 0.3);
-            box-shadow: 0 0 0 rgba(220, 38, 38, 0);
-        }
-        50% {
-            border-color: rgba(220, 38, 38, 0.6);
-            box-shadow: 0 0 20px rgba(220, 38, 38, 0.3);
-        }
-    }
-
-    /* Room Grid */
-    .room-grid {
-        display: grid;
-        grid-template-columns: repeat(auto-fill, minmax(250px, 1fr));
-        gap: 1.5rem;
-        margin-top: 1.5rem;
-    }
-
-    .room-card-pro {
-        background: rgba(255, 255, 255, 0.9);
-        border-radius: 16px;
-        padding: 1.5rem;
-        border: 2px solid #e2e8f0;
-        cursor: pointer;
-        transition: all 0.3s ease;
-        position: relative;
-        overflow: hidden;
-    }
-
-    .room-card-pro::before {
-        content: '';
-        position: absolute;
-        top: 0;
-        left: 0;
-        right: 0;
-        height: 4px;
-        background: linear-gradient(90deg, #667eea 0%, #764ba2 100%);
-        transform: scaleX(0);
-        transition: transform 0.3s ease;
-    }
-
-    .room-card-pro:hover {
-        transform: translateY(-4px);
-        box-shadow: 0 12px 40px rgba(0, 0, 0, 0.15);
-        border-color: #667eea;
-    }
-
-    .room-card-pro:hover::before {
-        transform: scaleX(1);
-    }
-
-    .room-icon {
-        font-size: 2.5rem;
-        margin-bottom: 1rem;
-    }
-
-    .room-name {
-        font-size: 1.25rem;
-        font-weight: 600;
-        color: #1a202c;
-        margin-bottom: 0.5rem;
-    }
+def stylesheet_tag(name: str) -> str:
+    """A versioned <link> when static serving is on, else the CSS inline."""
+    css, version = load_stylesheet(name)
+    if STATIC_SERVING:
+        return f'<link rel="stylesheet" href="{STATIC_URL}/{name}?v={version}">'
+    return f"<style>{css}</style>"
 
-    .room-status {
-        font-size: 0.875rem;
-        color: #718096;
-    }
-
-    /* Agent Chat */
-    .chat-container {
-        background: white;
-        border-radius: 16px;
-        padding: 1.5rem;
-        max-height: 500px;
-        overflow-y: auto;
-        margin-bottom: 1rem;
-    }
-
-    .chat-message {
-        margin-bottom: 1rem;
-        padding: 1rem;
-        border-radius: 12px;
-        animation: fadeIn 0.3s ease;
-    }
-
-    @keyframes fadeIn {
-        from {
-            opacity: 0;
-            transform: translateY(10px);
-        }
-        to {
-            opacity: 1;
-            transform: translateY(0);
-        }
-    }
-
-    .chat-user {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        margin-left: 20%;
-    }
-
-    .chat-agent {
-        background: #f7fafc;
-        color: #1a202c;
-        margin-right: 20%;
-        border: 1px solid #e2e8f0;
-    }
-
-    .chat-label {
-        font-size: 0.75rem;
-        font-weight: 600;
-        margin-bottom: 0.5rem;
-        opacity: 0.8;
-    }
-
-    /* Buttons */
-    .stButton > button {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        border: none;
-        border-radius: 12px;
-        padding: 0.75rem 1.5rem;
-        font-weight: 600;
-        font-size: 0.95rem;
-        transition: all 0.3s ease;
-        box-shadow: 0 4px 12px rgba(102, 126, 234, 0.3);
-    }
-
-    .stButton > button:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 8px 20px rgba(102, 126, 234, 0.4);
-    }
-
-    /* Form inputs */
-    .stTextInput > div > div > input,
-    .stNumberInput > div > div > input,
-    .stSelectbox > div > div > div,
-    .stTextArea > div > div > textarea {
-        border-radius: 12px;
-        border: 2px solid #e2e8f0;
-        padding: 0.75rem;
-        font-size: 0.95rem;
-        transition: all 0.3s ease;
-    }
-
-    .stTextInput > div > div > input:focus,
-    .stNumberInput > div > div > input:focus,
-    .stSelectbox > div > div > div:focus,
-    .stTextArea > div > div > textarea:focus {
-        border-color: #667eea;
-        box-shadow: 0 0 0 3px rgba(102, 126, 234, 0.1);
-    }
-
-    /* Loading Animation */
-    .loading-indicator {
-        display: flex;
-        justify-content: center;
-        align-items: center;
-        gap: 0.5rem;
-        padding: 2rem;
-    }
-
-    .loading-dot {
-        width: 12px;
-        height: 12px;
-        border-radius: 50%;
-        background: #667eea;
-        animation: bounce 1.4s infinite ease-in-out;
-    }
-
-    .loading-dot:nth-child(1) {
-        animation-delay: -0.32s;
-    }
-
-    .loading-dot:nth-child(2) {
-        animation-delay: -0.16s;
-    }
-
-    @keyframes bounce {
-        0%, 80%, 100% {
-            transform: scale(0);
-        }
-        40% {
-            transform: scale(1);
-        }
-    }
-
-    /* Responsive */
-    @media (max-width: 768px) {
-        .hero-title {
-            font-size: 2rem;
-        }
-        
-        .hero-subtitle {
-            font-size: 1rem;
-        }
-        
-        .pro-card {
-            padding: 1.5rem;
-        }
-        
-        .room-grid {
-            grid-template-columns: 1fr;
-        }
-    }
-
-    /* Pipeline Blueprint Styles */
-    .blueprint-container {
-        background: #1a202c;
-        border-radius: 16px;
-        padding: 2rem;
-        position: relative;
-        min-height: 400px;
-        overflow: hidden;
-    }
-
-    .blueprint-grid {
-        position: relative;
-        background-image: 
-            linear-gradient(rgba(102, 126, 234, 0.1) 1px, transparent 1px),
-            linear-gradient(90deg, rgba(102, 126, 234, 0.1) 1px, transparent 1px);
-        background-size: 20px 20px;
-        height: 100%;
-        min-height: 400px;
-    }
-
-    .pipe-horizontal {
-        position: absolute;
-        height: 8px;
-        background: linear-gradient(90deg, #3b82f6, #60a5fa);
-        border-radius: 4px;
-        box-shadow: 0 0 20px rgba(59, 130, 246, 0.5);
-    }
-
-    .pipe-vertical {
-        position: absolute;
-        width: 8px;
-        background: linear-gradient(180deg, #3b82f6, #60a5fa);
-        border-radius: 4px;
-        box-shadow: 0 0 20px rgba(59, 130, 246, 0.5);
-    }
-
-    .pipe-node-blueprint {
-        position: absolute;
-        width: 24px;
-        height: 24px;
-        border-radius: 50%;
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        font-size: 12px;
-        font-weight: bold;
-        transform: translate(-50%, -50%);
-        z-index: 10;
-        box-shadow: 0 0 20px currentColor;
-    }
-
-    .node-inlet {
-        background: #10b981;
-        color: white;
-        border: 3px solid #059669;
-    }
-
-    .node-junction {
-        background: #f59e0b;
-        color: white;
-        border: 3px solid #d97706;
-    }
-
-    .node-fixture {
-        background: #3b82f6;
-        color: white;
-        border: 3px solid #2563eb;
-    }
-
-    .node-leak {
-        background: #ef4444;
-        color: white;
-        border: 3px solid #dc2626;
-        animation: leak-pulse 1.5s infinite;
-    }
-
-    @keyframes leak-pulse {
-        0%, 100% {
-            box-shadow: 0 0 20px #ef4444, 0 0 40px #ef4444;
-            transform: translate(-50%, -50%) scale(1);
-        }
-        50% {
-            box-shadow: 0 0 30px #ef4444, 0 0 60px #ef4444;
-            transform: translate(-50%, -50%) scale(1.1);
-        }
-    }
-
-    .blueprint-label {
-        position: absolute;
-        background: rgba(26, 32, 44, 0.9);
-        color: white;
-        padding: 0.25rem 0.5rem;
-        border-radius: 6px;
-        font-size: 0.75rem;
-        border: 1px solid rgba(102, 126, 234, 0.3);
-        white-space: nowrap;
-    }
-
-    /* Chart container */
-    .chart-container {
-        background: white;
-        border-radius: 12px;
-        padding: 1.5rem;
-        margin-bottom: 1.5rem;
-    }
-    </style>
-    """
-    st.markdown(css, unsafe_allow_html=True)
+def inject_global_styles():
+    st.markdown(stylesheet_tag("leakguard.css") + stylesheet_tag("blueprint.css"), unsafe_allow_html=True)
 
 inject_global_styles()
 
@@ -657,119 +269,162 @@ inject_global_styles()
 # Helper Functions
 # ========================
 
+class DashboardAggregates:
+    """Incrementally maintained dashboard aggregates over prediction history.
+
+    ``sync`` folds in only the rows appended since the last call, so a rerun
+    costs O(new rows). Derived DataFrames are cached per data version, which
+    is the number of rows consumed so far. Rows trimmed from the front of
+    the history stay counted.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self.risk_counts = {}
+        self.daily_counts = {}
+        self.daily_risk = {}
+        self.room_risk = {}
+        self.room_daily = {}
+        self._frames = {}
+
+    def sync(self, predictions: list, dropped: int = 0) -> bool:
+        """Apply newly arrived predictions; return True if anything changed.
+
+        ``dropped`` is how many rows have been trimmed off the front of
+        ``predictions`` since it was created.
+        """
+        total = dropped + len(predictions)
+        if total < self.version:
+            # History was replaced rather than appended to: start over
+            self.__init__()
+        if total == self.version:
+            return False
+        for p in predictions[max(0, self.version - dropped):]:
+            ts = p["timestamp"]
+            day = ts.date() if isinstance(ts, datetime) else pd.Timestamp(ts).date()
+            risk, room = p["risk_level"], p["room"]
+            self.risk_counts[risk] = self.risk_counts.get(risk, 0) + 1
+            self.daily_counts[day] = self.daily_counts.get(day, 0) + 1
+            self.daily_risk[(day, risk)] = self.daily_risk.get((day, risk), 0) + 1
+            self.room_risk[(room, risk)] = self.room_risk.get((room, risk), 0) + 1
+            self.room_daily[(room, day)] = self.room_daily.get((room, day), 0) + 1
+        self.version = total
+        self._frames = {}
+        return True
+
+    def _cached(self, name, build):
+        if name not in self._frames:
+            self._frames[name] = build()
+        return self._frames[name]
+
+    def risk_distribution(self) -> pd.Series:
+        return self._cached("risk", lambda: pd.Series(self.risk_counts, dtype="int64").sort_values(ascending=False))
+
+    def daily_events(self) -> pd.DataFrame:
+        return self._cached("daily", lambda: pd.DataFrame(
+            sorted(self.daily_counts.items()), columns=["date", "events"]
+        ))
+
+    def daily_risk_counts(self) -> pd.DataFrame:
+        return self._cached("daily_risk", lambda: pd.DataFrame(
+            [(d, r, c) for (d, r), c in sorted(self.daily_risk.items())],
+            columns=["date", "risk_level", "count"],
+        ))
+
+    def room_risk_counts(self) -> pd.DataFrame:
+        return self._cached("room_risk", lambda: pd.DataFrame(
+            [(room, r, c) for (room, r), c in sorted(self.room_risk.items())],
+            columns=["room", "risk_level", "count"],
+        ))
+
+    def room_date_pivot(self) -> pd.DataFrame:
+        return self._cached("heatmap", lambda: pd.DataFrame(
+            [(room, d, c) for (room, d), c in self.room_daily.items()],
+            columns=["room", "date", "count"],
+        ).pivot(index="room", columns="date", values="count").fillna(0).sort_index(axis=0).sort_index(axis=1))
+
+    def room_count(self, room: str, risk: str) -> int:
+        return self.room_risk.get((room, risk), 0)
+
+
+def get_dashboard_aggregates() -> DashboardAggregates:
+    if "dashboard_aggregates" not in st.session_state:
+        st.session_state.dashboard_aggregates = DashboardAggregates()
+    agg = st.session_state.dashboard_aggregates
+    agg.sync(st.session_state.dummy_predictions, st.session_state.history_dropped)
+    return agg
+
+@st.cache_data(ttl=STATS_REFRESH_S, show_spinner=False)
+def fetch_dashboard_stats(days: int = 7):
+    """Pre-aggregated dashboard data from the backend, or None if unavailable/empty."""
+    params = {"start": (datetime.utcnow() - timedelta(days=days)).isoformat()}
+    client = get_backend_client()
+    try:
+        dist = client.get(f"{STATS_URL}/risk-distribution", params=params, timeout=5)
+        if dist.status_code != 200 or not dist.json().get("total_events"):
+            return None
+        # The backend picks the granularity and downsamples to the chart width
+        timeline = client.get(
+            f"{STATS_URL}/timeline",
+            params={**params, "granularity": "auto", "width": CHART_WIDTH_PX},
+            timeout=5,
+        )
+        heatmap = client.get(
+            f"{STATS_URL}/heatmap",
+            params={**params, "granularity": "day", "by": STATS_GROUP_BY},
+            timeout=5,
+        )
+        if timeline.status_code != 200 or heatmap.status_code != 200:
+            return None
+        return {"distribution": dist.json(), "timeline": timeline.json(), "heatmap": heatmap.json()}
+    except (requests.exceptions.RequestException, ValueError):
+        return None
+
 def create_timeline_chart():
     """Create a timeline chart of predictions"""
-    df = pd.DataFrame(st.session_state.dummy_predictions)
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
-    
-    # Group by day and risk level
-    df['date'] = df['timestamp'].dt.date
-    risk_counts = df.groupby(['date', 'risk_level']).size().reset_index(name='count')
-    
-    return risk_counts
+    return get_dashboard_aggregates().daily_risk_counts()
 
 def create_room_risk_chart():
     """Create room-wise risk distribution"""
-    df = pd.DataFrame(st.session_state.dummy_predictions)
-    room_risks = df.groupby(['room', 'risk_level']).size().reset_index(name='count')
-    return room_risks
+    return get_dashboard_aggregates().room_risk_counts()
 
 def get_room_blueprint(room):
-    """Generate blueprint configuration for each room"""
-    blueprints = {
-        "Kitchen": {
-            "pipes": [
-                {"type": "horizontal", "top": "30%", "left": "10%", "width": "40%"},
-                {"type": "vertical", "top": "30%", "left": "50%", "height": "40%"},
-                {"type": "horizontal", "top": "70%", "left": "50%", "width": "30%"},
-            ],
-            "nodes": [
-                {"type": "inlet", "top": "30%", "left": "10%", "label": "Main Inlet"},
-                {"type": "junction", "top": "30%", "left": "50%", "label": "T-Junction"},
-                {"type": "fixture", "top": "70%", "left": "50%", "label": "Sink"},
-                {"type": "fixture", "top": "70%", "left": "80%", "label": "Dishwasher"},
-                {"type": "leak", "top": "30%", "left": "35%", "label": "⚠️ Leak Detected"},
-            ]
-        },
-        "Bathroom": {
-            "pipes": [
-                {"type": "vertical", "top": "10%", "left": "30%", "height": "60%"},
-                {"type": "horizontal", "top": "40%", "left": "30%", "width": "50%"},
-                {"type": "vertical", "top": "40%", "left": "80%", "height": "30%"},
-            ],
-            "nodes": [
-                {"type": "inlet", "top": "10%", "left": "30%", "label": "Main Inlet"},
-                {"type": "junction", "top": "40%", "left": "30%", "label": "Junction"},
-                {"type": "fixture", "top": "70%", "left": "30%", "label": "Toilet"},
-                {"type": "fixture", "top": "40%", "left": "80%", "label": "Shower"},
-                {"type": "fixture", "top": "70%", "left": "80%", "label": "Sink"},
-            ]
-        },
-        "Master Bathroom": {
-            "pipes": [
-                {"type": "horizontal", "top": "20%", "left": "15%", "width": "70%"},
-                {"type": "vertical", "top": "20%", "left": "40%", "height": "50%"},
-                {"type": "vertical", "top": "20%", "left": "85%", "height": "35%"},
-            ],
-            "nodes": [
-                {"type": "inlet", "top": "20%", "left": "15%", "label": "Main Inlet"},
-                {"type": "junction", "top": "20%", "left": "40%", "label": "Splitter"},
-                {"type": "junction", "top": "20%", "left": "85%", "label": "T-Joint"},
-                {"type": "fixture", "top": "70%", "left": "40%", "label": "Bathtub"},
-                {"type": "fixture", "top": "55%", "left": "85%", "label": "Dual Sink"},
-                {"type": "leak", "top": "45%", "left": "40%", "label": "⚠️ Minor Leak"},
-            ]
-        },
-        "Living Room": {
-            "pipes": [
-                {"type": "horizontal", "top": "50%", "left": "20%", "width": "60%"},
-            ],
-            "nodes": [
-                {"type": "inlet", "top": "50%", "left": "20%", "label": "Main Line"},
-                {"type": "junction", "top": "50%", "left": "50%", "label": "Pass-through"},
-                {"type": "fixture", "top": "50%", "left": "80%", "label": "Radiator"},
-            ]
-        },
-        "Laundry": {
-            "pipes": [
-                {"type": "vertical", "top": "15%", "left": "40%", "height": "55%"},
-                {"type": "horizontal", "top": "40%", "left": "40%", "width": "35%"},
-            ],
-            "nodes": [
-                {"type": "inlet", "top": "15%", "left": "40%", "label": "Main Inlet"},
-                {"type": "junction", "top": "40%", "left": "40%", "label": "T-Junction"},
-                {"type": "fixture", "top": "70%", "left": "40%", "label": "Utility Sink"},
-                {"type": "fixture", "top": "40%", "left": "75%", "label": "Washer"},
-                {"type": "leak", "top": "55%", "left": "40%", "label": "⚠️ High Risk"},
-            ]
-        },
-        "Balcony": {
-            "pipes": [
-                {"type": "horizontal", "top": "35%", "left": "25%", "width": "50%"},
-            ],
-            "nodes": [
-                {"type": "inlet", "top": "35%", "left": "25%", "label": "Main Inlet"},
-                {"type": "fixture", "top": "35%", "left": "75%", "label": "Outdoor Tap"},
-            ]
-        },
-        "Basement": {
-            "pipes": [
-                {"type": "horizontal", "top": "25%", "left": "10%", "width": "80%"},
-                {"type": "vertical", "top": "25%", "left": "30%", "height": "45%"},
-                {"type": "vertical", "top": "25%", "left": "70%", "height": "45%"},
-            ],
-            "nodes": [
-                {"type": "inlet", "top": "25%", "left": "10%", "label": "Main Supply"},
-                {"type": "junction", "top": "25%", "left": "30%", "label": "Branch A"},
-                {"type": "junction", "top": "25%", "left": "70%", "label": "Branch B"},
-                {"type": "fixture", "top": "70%", "left": "30%", "label": "Boiler"},
-                {"type": "fixture", "top": "70%", "left": "70%", "label": "Water Heater"},
-                {"type": "fixture", "top": "25%", "left": "90%", "label": "Main Valve"},
-            ]
-        }
-    }
-    
-    return blueprints.get(room, blueprints["Kitchen"])
+    """Blueprint configuration for a room (Kitchen if unknown)"""
+    return ROOM_BLUEPRINTS.get(room, ROOM_BLUEPRINTS["Kitchen"])
+
+@st.cache_data
+def build_blueprint_html(room: str) -> str:
+    """Static blueprint markup for a room with a {risk_state} placeholder"""
+    blueprint = get_room_blueprint(room)
+    parts = [stylesheet_tag("blueprint.css"), '<div class="blueprint-container blueprint-risk-{risk_state}"><div class="blueprint-grid">']
+
+    for pipe in blueprint["pipes"]:
+        if pipe["type"] == "horizontal":
+            parts.append(f'''
+            <div class="pipe-horizontal" style="top:{pipe['top']}; left:{pipe['left']}; width:{pipe['width']};"></div>''')
+        else:
+            parts.append(f'''
+            <div class="pipe-vertical" style="top:{pipe['top']}; left:{pipe['left']}; height:{pipe['height']};"></div>''')
+
+    for node in blueprint["nodes"]:
+        parts.append(f'''
+        <div class="pipe-node-blueprint node-{node['type']}" style="top:{node['top']}; left:{node['left']};">
+            {node['type'][0].upper()}
+        </div>
+        <div class="blueprint-label" style="top: calc({node['top']} + 18px); left:{node['left']}; transform:translateX(-50%);">
+            {node['label']}
+        </div>
+        ''')
+
+    parts.append('</div></div>')
+    return "".join(parts)
+
+def room_risk_state(room: str) -> str:
+    """Risk level of the room's most recent prediction ("none" if unseen)"""
+    for p in reversed(st.session_state.dummy_predictions):
+        if p["room"] == room:
+            return p["risk_level"].lower()
+    return "none"
 
 # ========================
 # Helper Functions
@@ -795,10 +450,230 @@ def risk_chip(risk: str) -> str:
         icon = "🔴"
     return f'<span class="risk-indicator {cls}"><span>{icon}</span><span>{risk.title()}</span></span>'
 
+class BackendClient:
+    """Process-wide pooled HTTP client for the backend API.
+
+    Uses a requests Session with a keep-alive connection pool and retries
+    with exponential backoff (honouring Retry-After on 429/503); POSTs are
+    not retried on 502/504, which may follow a completed request. With
+    HTTP2_ENABLED=1 and httpx[http2] installed, an HTTP/2 client is used
+    instead; it raises the same requests exceptions so callers don't care.
+    Every request carries the tenant headers when a TENANT_ID is configured.
+    """
+
+    def __init__(self):
+        self.requests_sent = 0
+        self.http2 = False
+        # httpx keeps no pool counters; the transport's trace events do
+        self._connections_opened = 0
+        self._http_attempts = 0
+        if HTTP2_ENABLED:
+            try:
+                import httpx
+                self._httpx = httpx
+                # With a custom transport the client ignores its own limits=
+                self._client = httpx.Client(
+                    transport=httpx.HTTPTransport(
+                        http2=True,
+                        retries=HTTP_RETRIES,
+                        limits=httpx.Limits(
+                            max_connections=HTTP_POOL_MAXSIZE,
+                            max_keepalive_connections=HTTP_POOL_MAXSIZE,
+                        ),
+                    ),
+                    headers=TENANT_HEADERS,
+                    event_hooks={"request": [self._attach_trace]},
+                )
+                self.http2 = True
+                return
+            except ImportError:
+                pass
+
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        class BackendRetry(Retry):
+            # A 502/504 may come after the backend already logged the
+            # prediction, so POSTs are only retried when it was refused
+            def is_retry(self, method, status_code, has_retry_after=False):
+                if method == "POST" and status_code not in (429, 503):
+                    return False
+                return super().is_retry(method, status_code, has_retry_after)
+
+        retry = BackendRetry(
+            total=HTTP_RETRIES,
+            connect=HTTP_RETRIES,
+            read=0,
+            status=HTTP_RETRIES,
+            backoff_factor=HTTP_BACKOFF,
+            status_forcelist=(429, 502, 503, 504),
+            allowed_methods=frozenset({"GET", "POST"}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        self._adapter = HTTPAdapter(
+            pool_connections=HTTP_POOL_CONNECTIONS,
+            pool_maxsize=HTTP_POOL_MAXSIZE,
+            max_retries=retry,
+        )
+        self._client = requests.Session()
+        self._client.headers.update(TENANT_HEADERS)
+        self._client.mount("https://", self._adapter)
+        self._client.mount("http://", self._adapter)
+
+    def request(self, method: str, url: str, **kwargs):
+        self.requests_sent += 1
+        if not self.http2:
+            return self._client.request(method, url, **kwargs)
+        try:
+            return self._client.request(method, url, **kwargs)
+        except self._httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(str(e))
+        except self._httpx.TransportError as e:
+            raise requests.exceptions.ConnectionError(str(e))
+
+    def _attach_trace(self, request):
+        request.extensions["trace"] = self._trace
+
+    def _trace(self, event: str, info: dict):
+        # A new TCP connection, and every request sent over any connection
+        # (retries included), mirroring urllib3's num_connections/num_requests
+        if event == "connection.connect_tcp.complete":
+            self._connections_opened += 1
+        elif event.endswith(".send_request_headers.started"):
+            self._http_attempts += 1
+
+    def post(self, url: str, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def get(self, url: str, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def stats(self) -> dict:
+        stats = {
+            "transport": "HTTP/2 (httpx)" if self.http2 else "HTTP/1.1 keep-alive (requests)",
+            "requests_sent": self.requests_sent,
+            "pool_maxsize": HTTP_POOL_MAXSIZE,
+            "retries": HTTP_RETRIES,
+        }
+        if self.http2:
+            connections, attempts = self._connections_opened, self._http_attempts
+        else:
+            # urllib3 pools count every new connection and every request they send
+            pools = self._adapter.poolmanager.pools
+            pools = [pools[key] for key in list(pools.keys())]
+            connections = sum(p.num_connections for p in pools)
+            attempts = sum(p.num_requests for p in pools)
+        stats.update({
+            "connections_opened": connections,
+            "http_attempts": attempts,
+            "connection_reuse": 1 - connections / attempts if attempts else 0.0,
+        })
+        return stats
+
+
+@st.cache_resource
+def get_backend_client() -> BackendClient:
+    return BackendClient()
+
+class LiveFeed:
+    """Background SSE consumer shared by all sessions of this process.
+
+    Keeps the last LIVE_BUFFER events; each session reads the ones after its
+    own cursor. Reconnects with backoff and resumes via Last-Event-ID.
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self.events = deque(maxlen=LIVE_BUFFER)
+        self.last_id = 0
+        self.connected = False
+        self._lock = threading.Lock()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
+        backoff = 1.0
+        while True:
+            try:
+                with requests.get(
+                    self.url,
+                    stream=True,
+                    timeout=(5, 60),
+                    headers={
+                        "Accept": "text/event-stream",
+                        "Last-Event-ID": str(self.last_id),
+                        **TENANT_HEADERS,
+                    },
+                ) as resp:
+                    resp.raise_for_status()
+                    self.connected = True
+                    backoff = 1.0
+                    self._consume(resp.iter_lines(decode_unicode=True))
+            except requests.exceptions.RequestException:
+                pass
+            self.connected = False
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+    def _consume(self, lines):
+        event_id, kind, data = None, "message", []
+        for line in lines:
+            if line:
+                field, _, value = line.partition(":")
+                value = value[1:] if value.startswith(" ") else value
+                if field == "id":
+                    event_id = int(value)
+                elif field == "event":
+                    kind = value
+                elif field == "data":
+                    data.append(value)
+                continue
+            if event_id is not None and data:
+                with self._lock:
+                    self.events.append((event_id, kind, json.loads("\n".join(data))))
+                    self.last_id = event_id
+            event_id, kind, data = None, "message", []
+
+    def since(self, cursor: int) -> tuple:
+        """Events with id > cursor, and the new cursor."""
+        with self._lock:
+            new = [e for e in self.events if e[0] > cursor]
+        return new, (new[-1][0] if new else cursor)
+
+
+@st.cache_resource
+def get_live_feed() -> LiveFeed:
+    return LiveFeed(STREAM_URL)
+
+def apply_live_events() -> list:
+    """Append new live predictions to the session history; return new alerts."""
+    events, st.session_state.live_cursor = get_live_feed().since(st.session_state.live_cursor)
+    alerts = []
+    for _, kind, payload in events:
+        if kind == "alert":
+            alerts.append(payload)
+        elif kind == "prediction":
+            st.session_state.dummy_predictions.append({
+                "timestamp": pd.Timestamp(payload["timestamp"]).to_pydatetime(),
+                "room": payload["Location_Code"],
+                "risk_level": payload["risk_level"],
+                "probability": payload["leakage_prob"],
+                "pressure": payload["Pressure"],
+                "flow_rate": payload["Flow_Rate"],
+                "temperature": payload["Temperature"],
+                "zone": payload["Zone"],
+            })
+    history = st.session_state.dummy_predictions
+    excess = len(history) - LIVE_HISTORY
+    if excess > 0:
+        del history[:excess]
+        st.session_state.history_dropped += excess
+    return alerts
+
 def call_predict_api(payload: dict):
     try:
         with st.spinner("🔍 Analyzing sensor data..."):
-            resp = requests.post(PREDICT_URL, json=payload, timeout=15)
+            resp = get_backend_client().post(PREDICT_URL, json=payload, timeout=15)
             if resp.status_code != 200:
                 st.error(f"⚠️ Prediction API error: {resp.status_code}")
                 return None
@@ -813,12 +688,35 @@ def call_predict_api(payload: dict):
         st.error(f"❌ Prediction call failed: {str(e)}")
         return None
 
-def call_agent_api(query: str):
+def call_batch_api(readings: list, dry_run: bool = True):
+    try:
+        with st.spinner(f"🧮 Scoring {len(readings)} scenarios..."):
+            resp = get_backend_client().post(
+                BATCH_URL, json={"readings": readings, "dry_run": dry_run}, timeout=30
+            )
+            if resp.status_code != 200:
+                st.error(f"⚠️ Batch API error: {resp.status_code}")
+                return None
+            return resp.json()
+    except requests.exceptions.Timeout:
+        st.error("⏱️ Batch request timed out. Please check if the backend is running.")
+        return None
+    except requests.exceptions.ConnectionError:
+        st.error(f"🔌 Cannot connect to backend at {BACKEND_URL}. Please verify the URL and ensure the backend is running.")
+        return None
+    except Exception as e:
+        st.error(f"❌ Batch call failed: {str(e)}")
+        return None
+
+def call_agent_api(query: str, session_id: str = None):
+    payload = {"query": query}
+    if session_id:
+        payload["session_id"] = session_id
     try:
         with st.spinner("🤖 Agent is thinking..."):
-            resp = requests.post(
-                AGENT_URL, 
-                json={"query": query}, 
+            resp = get_backend_client().post(
+                AGENT_URL,
+                json=payload, 
                 timeout=60,
                 headers={"Content-Type": "application/json"}
             )
@@ -938,6 +836,40 @@ def render_home():
             </div>
         """, unsafe_allow_html=True)
 
+def render_room_status(room: str, icon: str):
+    # Count leaks in this room
+    agg = get_dashboard_aggregates()
+    critical_count = agg.room_count(room, 'critical')
+    high_count = agg.room_count(room, 'high')
+    st.markdown(f"""
+        <div class="pro-card" style="margin-top: 2rem;">
+            <div class="card-header">
+                <div class="card-title">{icon} {room} – Live Pipeline Blueprint</div>
+                <div class="card-badge">Real-time Monitoring</div>
+            </div>
+            <div style="display: flex; gap: 1rem; margin-bottom: 1rem;">
+                <div class="risk-indicator risk-critical">
+                    🔴 {critical_count} Critical Alerts (7d)
+                </div>
+                <div class="risk-indicator risk-high">
+                    🟠 {high_count} High Risk Events (7d)
+                </div>
+            </div>
+        </div>
+    """, unsafe_allow_html=True)
+
+def render_room_blueprint(room: str):
+    blueprint_html = build_blueprint_html(room).replace("{risk_state}", room_risk_state(room))
+    st.components.v1.html(blueprint_html, height=700, scrolling=True)
+
+@st.fragment(run_every=1.0 / LIVE_FPS)
+def render_live_room_status(room: str, icon: str):
+    # The blueprint is re-emitted each frame; its markup (and so the
+    # iframe) only changes when the room's risk colour does
+    apply_live_events()
+    render_room_status(room, icon)
+    render_room_blueprint(room)
+
 def render_my_home():
     # 🚨 Notification logic
 
@@ -973,129 +905,12 @@ def render_my_home():
     
     # Selected room blueprint
     selected_room = st.session_state.selected_room
-    blueprint = get_room_blueprint(selected_room)
     
-    # Count leaks in this room
-    room_data = [p for p in st.session_state.dummy_predictions if p['room'] == selected_room]
-    critical_count = len([p for p in room_data if p['risk_level'] == 'critical'])
-    high_count = len([p for p in room_data if p['risk_level'] == 'high'])
-    st.markdown(f"""
-        <div class="pro-card" style="margin-top: 2rem;">
-            <div class="card-header">
-                <div class="card-title">{room_icons.get(selected_room, '📍')} {selected_room} – Live Pipeline Blueprint</div>
-                <div class="card-badge">Real-time Monitoring</div>
-            </div>
-            <div style="display: flex; gap: 1rem; margin-bottom: 1rem;">
-                <div class="risk-indicator risk-critical">
-                    🔴 {critical_count} Critical Alerts (7d)
-                </div>
-                <div class="risk-indicator risk-high">
-                    🟠 {high_count} High Risk Events (7d)
-                </div>
-            </div>
-        </div>
-    """, unsafe_allow_html=True)
-    
-    blueprint_css = """
-    <style>
-    .blueprint-container {
-        background: #1a202c;
-        border-radius: 16px;
-        padding: 2rem;
-        position: relative;
-        min-height: 400px;
-        overflow: hidden;
-    }
-    .blueprint-grid {
-        position: relative;
-        background-image:
-            linear-gradient(rgba(102, 126, 234, 0.1) 1px, transparent 1px),
-            linear-gradient(90deg, rgba(102, 126, 234, 0.1) 1px, transparent 1px);
-        background-size: 20px 20px;
-        height: 100%;
-        min-height: 400px;
-    }
-    .pipe-horizontal {
-        position: absolute;
-        height: 8px;
-        background: linear-gradient(90deg, #3b82f6, #60a5fa);
-        border-radius: 4px;
-        box-shadow: 0 0 20px rgba(59,130,246,0.5);
-    }
-    .pipe-vertical {
-        position: absolute;
-        width: 8px;
-        background: linear-gradient(180deg, #3b82f6, #60a5fa);
-        border-radius: 4px;
-        box-shadow: 0 0 20px rgba(59,130,246,0.5);
-    }
-    .pipe-node-blueprint {
-        position: absolute;
-        width: 28px;
-        height: 28px;
-        border-radius: 50%;
-        display:flex;
-        align-items:center;
-        justify-content:center;
-        font-size:14px;
-        font-weight:bold;
-        transform:translate(-50%,-50%);
-        z-index:10;
-        box-shadow:0 0 20px currentColor;
-    }
-    .node-inlet {
-        background:#10b981; color:white; border:3px solid #059669;
-    }
-    .node-junction {
-        background:#f59e0b; color:white; border:3px solid #d97706;
-    }
-    .node-fixture {
-        background:#3b82f6; color:white; border:3px solid #2563eb;
-    }
-    .node-leak {
-        background:#ef4444; color:white; border:3px solid #dc2626;
-        animation: leak-pulse 1.5s infinite;
-    }
-    @keyframes leak-pulse {
-        0%,100% { box-shadow: 0 0 20px #ef4444; transform: translate(-50%,-50%) scale(1); }
-        50% { box-shadow: 0 0 60px #ef4444; transform: translate(-50%,-50%) scale(1.15); }
-    }
-    .blueprint-label {
-        position:absolute;
-        background:rgba(26,32,44,0.9);
-        color:white;
-        padding:2px 6px;
-        border-radius:6px;
-        font-size:10px;
-        border:1px solid rgba(102,126,234,0.3);
-        white-space:nowrap;
-    }
-    </style>
-    """
-
-    blueprint_html = blueprint_css + '<div class="blueprint-container"><div class="blueprint-grid">'
-
-    for pipe in blueprint["pipes"]:
-        if pipe["type"] == "horizontal":
-            blueprint_html += f'''
-            <div class="pipe-horizontal" style="top:{pipe['top']}; left:{pipe['left']}; width:{pipe['width']};"></div>'''
-        else:
-            blueprint_html += f'''
-            <div class="pipe-vertical" style="top:{pipe['top']}; left:{pipe['left']}; height:{pipe['height']};"></div>'''
-
-    for node in blueprint["nodes"]:
-        blueprint_html += f'''
-        <div class="pipe-node-blueprint node-{node['type']}" style="top:{node['top']}; left:{node['left']};">
-            {node['type'][0].upper()}
-        </div>
-        <div class="blueprint-label" style="top: calc({node['top']} + 18px); left:{node['left']}; transform:translateX(-50%);">
-            {node['label']}
-        </div>
-        '''
-
-    blueprint_html += '</div></div>'
-
-    st.components.v1.html(blueprint_html, height=700, scrolling=True)
+    if st.session_state.live_mode:
+        render_live_room_status(selected_room, room_icons.get(selected_room, '📍'))
+    else:
+        render_room_status(selected_room, room_icons.get(selected_room, '📍'))
+        render_room_blueprint(selected_room)
     
     # Legend
     st.markdown("""
@@ -1121,41 +936,51 @@ def render_my_home():
         </div>
     """, unsafe_allow_html=True)
 
-def render_dashboard():
-    st.markdown("""
-        <div class="pro-card">
-            <div class="card-header">
-                <div class="card-title">📊 Leak Overview Dashboard</div>
-                <div class="card-badge">Live Analytics</div>
-            </div>
-            <p style="color: #4a5568;">Interactive monitoring using historical prediction data</p>
-        </div>
-    """, unsafe_allow_html=True)
-
-    df = pd.DataFrame(st.session_state.dummy_predictions)
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
-    df['date'] = df['timestamp'].dt.date
-
-    risk_counts = df['risk_level'].value_counts()
-    daily_risk = df.groupby('date').size().reset_index(name='events')
-    heatmap_df = df.groupby(['date', 'room']).size().reset_index(name='count')
-    heatmap_pivot = heatmap_df.pivot(index='room', columns='date', values='count').fillna(0)
-
+def backend_chart_data(stats: dict) -> dict:
+    risk_counts = {k: v for k, v in stats["distribution"]["risk_counts"].items() if v}
+    points = stats["timeline"]["points"]
+    heatmap = stats["heatmap"]
+    return {
+        "pie_labels": list(risk_counts),
+        "pie_values": list(risk_counts.values()),
+        "line_x": [pd.Timestamp(p["t"]) for p in points],
+        "line_y": [p["events"] for p in points],
+        "heat_z": heatmap["z"],
+        "heat_x": [pd.Timestamp(t).date() for t in heatmap["columns"]],
+        "heat_y": heatmap["rows"],
+    }
+
+def local_chart_data() -> dict:
+    agg = get_dashboard_aggregates()
+    risk_counts = agg.risk_distribution()
+    daily_risk = agg.daily_events()
+    heatmap_pivot = agg.room_date_pivot()
+    return {
+        "pie_labels": risk_counts.index,
+        "pie_values": risk_counts.values,
+        "line_x": daily_risk['date'],
+        "line_y": daily_risk['events'],
+        "heat_z": heatmap_pivot.values,
+        "heat_x": list(heatmap_pivot.columns),
+        "heat_y": list(heatmap_pivot.index),
+    }
+
+def draw_dashboard_charts(data: dict, range_label: str):
     fig_pie = go.Figure(data=[
-        go.Pie(labels=risk_counts.index, values=risk_counts.values, hole=0.4)
+        go.Pie(labels=data["pie_labels"], values=data["pie_values"], hole=0.4)
     ])
-    fig_pie.update_layout(title="Risk Level Distribution (7 Days)")
+    fig_pie.update_layout(title=f"Risk Level Distribution ({range_label})")
 
     fig_line = go.Figure()
     fig_line.add_trace(go.Scatter(
-        x=daily_risk['date'], y=daily_risk['events'], mode='lines+markers'
+        x=data["line_x"], y=data["line_y"], mode='lines+markers'
     ))
     fig_line.update_layout(title="Leakage Alerts Over Time")
 
     fig_heatmap = go.Figure(data=go.Heatmap(
-        z=heatmap_pivot.values,
-        x=list(heatmap_pivot.columns),
-        y=list(heatmap_pivot.index),
+        z=data["heat_z"],
+        x=data["heat_x"],
+        y=data["heat_y"],
         hoverongaps=False
     ))
     fig_heatmap.update_layout(title="Room vs Date – Risk Heatmap")
@@ -1168,6 +993,47 @@ def render_dashboard():
 
     st.plotly_chart(fig_heatmap, use_container_width=True)
 
+@st.fragment(run_every=1.0 / LIVE_FPS)
+def render_live_dashboard():
+    """Re-renders only this fragment: applies live deltas, KPIs and charts."""
+    for alert in apply_live_events()[-3:]:
+        icon = "🚨" if alert["type"] == "raised" else "✅"
+        st.toast(f"{icon} {alert['Zone']}/{alert['Block']}/{alert['Pipe']} alert {alert['type']}")
+
+    agg = get_dashboard_aggregates()
+    k1, k2, k3, k4 = st.columns(4)
+    k1.metric("Events", agg.version)
+    k2.metric("Critical", agg.risk_counts.get("critical", 0))
+    k3.metric("High", agg.risk_counts.get("high", 0))
+    k4.metric("Live feed", "🟢 Connected" if get_live_feed().connected else "🔴 Reconnecting")
+
+    draw_dashboard_charts(local_chart_data(), "Live")
+
+def render_dashboard():
+    st.markdown("""
+        <div class="pro-card">
+            <div class="card-header">
+                <div class="card-title">📊 Leak Overview Dashboard</div>
+                <div class="card-badge">Live Analytics</div>
+            </div>
+            <p style="color: #4a5568;">Interactive monitoring using historical prediction data</p>
+        </div>
+    """, unsafe_allow_html=True)
+
+    live = st.toggle("🔴 Live updates", value=st.session_state.live_mode)
+    st.session_state.live_mode = live
+
+    if live:
+        render_live_dashboard()
+    else:
+        range_label = st.selectbox("Time range", list(DASHBOARD_RANGES), index=0)
+        # Prefer backend aggregates; fall back to the local demo history
+        stats = fetch_dashboard_stats(DASHBOARD_RANGES[range_label])
+        if stats:
+            draw_dashboard_charts(backend_chart_data(stats), range_label)
+        else:
+            draw_dashboard_charts(local_chart_data(), "7 Days")
+
     st.markdown("""
         <div class="pro-card" style="margin-top: 1.5rem;">
             <div class="card-title">🤖 AI Insight</div>
@@ -1189,6 +1055,84 @@ def render_dashboard():
         else:
             st.error("Agent backend not reachable right now.")
 
+def sweep_values(lo: float, hi: float, steps: int) -> list:
+    """Evenly spaced values from lo to hi inclusive."""
+    if steps <= 1 or hi == lo:
+        return [lo]
+    return [lo + (hi - lo) * i / (steps - 1) for i in range(steps)]
+
+def draw_sweep_chart(x_name: str, xs: list, probs: list, y_name: str = None, ys: list = None):
+    """Line chart for a 1-D sweep, heatmap for a 2-D sweep."""
+    if y_name is None:
+        fig = go.Figure(go.Scatter(
+            x=xs, y=probs, mode="lines+markers",
+            line=dict(color="#667eea", width=3), marker=dict(size=6),
+        ))
+        for level, threshold, color in (("Medium", 0.25, "#f59e0b"), ("High", 0.5, "#ea580c"), ("Critical", 0.75, "#dc2626")):
+            fig.add_hline(y=threshold, line_dash="dot", line_color=color,
+                          annotation_text=level, annotation_position="top left")
+        fig.update_layout(xaxis_title=SWEEP_FEATURES[x_name][0], yaxis_title="Leak Probability",
+                          yaxis=dict(range=[0, 1.02], tickformat=".0%"))
+    else:
+        z = [probs[i * len(xs):(i + 1) * len(xs)] for i in range(len(ys))]
+        fig = go.Figure(go.Heatmap(
+            x=xs, y=ys, z=z, zmin=0, zmax=1, colorscale="RdYlGn_r",
+            colorbar=dict(title="P(leak)", tickformat=".0%"),
+        ))
+        fig.update_layout(xaxis_title=SWEEP_FEATURES[x_name][0], yaxis_title=SWEEP_FEATURES[y_name][0])
+    fig.update_layout(
+        height=400, plot_bgcolor="white", paper_bgcolor="white",
+        font=dict(family="Inter, sans-serif"), margin=dict(l=60, r=30, t=30, b=60),
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+def render_sensitivity_sweep(base: dict):
+    """What-if sweep of one or two features around the current reading."""
+    with st.expander("🎛️ Sensitivity Sweep (what-if)"):
+        # Feature pickers sit outside the form so the range sliders follow
+        # the selected features on the next rerun, not only after submit
+        names = list(SWEEP_FEATURES)
+        c1, c2 = st.columns(2)
+        with c1:
+            x_name = st.selectbox("Feature", names, format_func=lambda n: SWEEP_FEATURES[n][0])
+        with c2:
+            y_name = st.selectbox(
+                "Second feature (optional)", [None] + names,
+                format_func=lambda n: "—" if n is None else SWEEP_FEATURES[n][0],
+            )
+        with st.form("sweep_form"):
+            c1, c2 = st.columns(2)
+            with c1:
+                _, lo, hi = SWEEP_FEATURES[x_name]
+                x_range = st.slider("Range", lo, hi, (lo, hi), key=f"sweep_x_range_{x_name}")
+                x_steps = st.slider("Steps", 2, SWEEP_MAX_STEPS, 25, key="sweep_x_steps")
+            with c2:
+                if y_name is not None:
+                    _, lo, hi = SWEEP_FEATURES[y_name]
+                    y_range = st.slider("Range ", lo, hi, (lo, hi), key=f"sweep_y_range_{y_name}")
+                    y_steps = st.slider("Steps ", 2, SWEEP_MAX_STEPS, 15, key="sweep_y_steps")
+            run = st.form_submit_button("📈 Run Sweep", use_container_width=True)
+
+        if not run:
+            st.caption("Scores a grid of hypothetical readings in one request; nothing is logged.")
+            return
+        if y_name == x_name:
+            st.warning("Pick two different features for a 2-D sweep.")
+            return
+
+        xs = sweep_values(*x_range, x_steps)
+        ys = sweep_values(*y_range, y_steps) if y_name is not None else [None]
+        readings = [
+            {**base, x_name: x, **({y_name: y} if y_name is not None else {})}
+            for y in ys for x in xs
+        ]
+        result = call_batch_api(readings)
+        if result:
+            if y_name is None:
+                draw_sweep_chart(x_name, xs, result["leakage_prob"])
+            else:
+                draw_sweep_chart(x_name, xs, result["leakage_prob"], y_name, ys)
+
 def render_prediction():
     st.components.v1.html("""
         <div class="pro-card">
@@ -1228,22 +1172,22 @@ def render_prediction():
             
             submitted = st.form_submit_button("🔍 Analyze Leak Risk", use_container_width=True)
         
+        payload = {
+            "Pressure": pressure,
+            "Flow_Rate": flow_rate,
+            "Temperature": temperature,
+            "Vibration": vibration,
+            "RPM": rpm,
+            "Operational_Hours": op_hours,
+            "Latitude": latitude,
+            "Longitude": longitude,
+            "Zone": zone,
+            "Block": block,
+            "Pipe": pipe,
+            "Location_Code": location_code,
+        }
+
         if submitted:
-            payload = {
-                "Pressure": pressure,
-                "Flow_Rate": flow_rate,
-                "Temperature": temperature,
-                "Vibration": vibration,
-                "RPM": rpm,
-                "Operational_Hours": op_hours,
-                "Latitude": latitude,
-                "Longitude": longitude,
-                "Zone": zone,
-                "Block": block,
-                "Pipe": pipe,
-                "Location_Code": location_code,
-            }
-            
             result = call_predict_api(payload)
             
             if result:
@@ -1282,6 +1226,8 @@ def render_prediction():
                         </div>
                     </div>
                 """, unsafe_allow_html=True)
+
+        render_sensitivity_sweep(payload)
     
     with col2:
         st.markdown("""
@@ -1346,9 +1292,11 @@ def render_agent():
                 })
                 
                 # Call agent API
-                resp = call_agent_api(query)
+                resp = call_agent_api(query, st.session_state.agent_session_id)
                 
                 if resp and "answer" in resp:
+                    # Follow-ups continue the server-side conversation
+                    st.session_state.agent_session_id = resp.get("session_id")
                     # Add agent response to history
                     st.session_state.agent_history.append({
                         "role": "agent",
@@ -1366,6 +1314,7 @@ def render_agent():
     
     if st.button("🗑️ Clear Chat History"):
         st.session_state.agent_history = []
+        st.session_state.agent_session_id = None
         st.rerun()
     
     # Example questions
@@ -1442,6 +1391,26 @@ def render_settings():
             </div>
         """, unsafe_allow_html=True)
         
+        pool = get_backend_client().stats()
+        pool_rows = "".join(
+            f"<strong>{label}:</strong> {value}<br/>"
+            for label, value in [
+                ("Transport", pool["transport"]),
+                ("Requests sent", pool["requests_sent"]),
+                ("Connections opened", pool.get("connections_opened", "n/a")),
+                ("Connection reuse", f"{pool['connection_reuse']:.0%}" if "connection_reuse" in pool else "n/a"),
+                ("Pool size / retries", f"{pool['pool_maxsize']} / {pool['retries']}"),
+            ]
+        )
+        st.markdown(f"""
+            <div class="pro-card">
+                <div class="card-title">🔌 Backend Connection Pool</div>
+                <div style="margin-top: 1rem; color: #4a5568; line-height: 1.8;">
+                    {pool_rows}
+                </div>
+            </div>
+        """, unsafe_allow_html=True)
+
         st.markdown("""
             <div class="pro-card">
                 <div class="card-title">ℹ️ About</div>
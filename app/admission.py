@@ -0,0 +1,183 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+
+from app.metrics import Metrics
+
+
+class Rejected(Exception):
+    """Raised when a request is not admitted; carries the HTTP response details."""
+
+    def __init__(self, status_code: int, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class EndpointClass:
+    """Limits and live counters for one group of endpoints."""
+
+    def __init__(self, name: str, max_inflight: int, max_queue: int, shed_at: float,
+                 tenant_inflight: int, tenant_queue: int):
+        self.name = name
+        self.max_inflight = max_inflight
+        self.max_queue = max_queue
+        self.shed_at = shed_at
+        self.tenant_max_inflight = tenant_inflight
+        self.tenant_max_queue = tenant_queue
+        self.inflight = 0
+        self.tenant_inflight = {}
+        # tenant -> FIFO of waiting futures, in round-robin order
+        self.waiters = OrderedDict()
+        self.queued = 0
+        self.service_s = 0.05  # EWMA of time spent holding a slot
+
+
+class AdmissionController:
+    """Bounded in-flight and queued requests per endpoint class and tenant.
+
+    A request runs immediately while its class has free slots and its
+    tenant is under the per-tenant in-flight cap, otherwise it waits for
+    up to ``max_wait_s``. Waiters queue per tenant and freed slots go to
+    tenants in round robin, so one busy tenant cannot starve the others.
+    When the class queue or the tenant's share of it is full the request
+    gets 429; when it waits too long it gets 503. Classes are also shed
+    early by priority: once overall queue pressure (queued / queue
+    capacity, across all classes) reaches a class's ``shed_at``, new
+    requests of that class get 503 without queueing. Must be used from a
+    single event loop.
+    """
+
+    def __init__(self, metrics: Metrics, max_wait_s: float = 2.0):
+        self.metrics = metrics
+        self.max_wait_s = max_wait_s
+        self.classes = {}
+
+    def add_class(self, name: str, max_inflight: int, max_queue: int, shed_at: float = 1.0,
+                  tenant_inflight_share: float = 1.0, tenant_queue_share: float = 1.0):
+        self.classes[name] = EndpointClass(
+            name, max_inflight, max_queue, shed_at,
+            tenant_inflight=max(1, math.ceil(max_inflight * tenant_inflight_share)),
+            tenant_queue=max(1, math.ceil(max_queue * tenant_queue_share)),
+        )
+
+    def pressure(self) -> float:
+        capacity = sum(c.max_queue for c in self.classes.values())
+        queued = sum(c.queued for c in self.classes.values())
+        return queued / capacity if capacity else 0.0
+
+    def _retry_after(self, cls: EndpointClass) -> int:
+        backlog = cls.queued + 1
+        return max(1, math.ceil(cls.service_s * backlog / max(cls.max_inflight, 1)))
+
+    def _reject(self, cls, status_code, reason):
+        self.metrics.inc(f"admission.{cls.name}.{reason}")
+        raise Rejected(status_code, reason, self._retry_after(cls))
+
+    def _admit(self, cls: EndpointClass, tenant: str):
+        cls.inflight += 1
+        cls.tenant_inflight[tenant] = cls.tenant_inflight.get(tenant, 0) + 1
+
+    def _dequeue(self, cls: EndpointClass, tenant: str, waiter):
+        queue = cls.waiters.get(tenant)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            cls.queued -= 1
+            if not queue:
+                del cls.waiters[tenant]
+
+    async def acquire(self, name: str, tenant: str = "default") -> float:
+        """Wait for a slot; return the time spent queued in seconds."""
+        cls = self.classes[name]
+        tenant_inflight = cls.tenant_inflight.get(tenant, 0)
+        if (cls.inflight < cls.max_inflight and tenant_inflight < cls.tenant_max_inflight
+                and tenant not in cls.waiters):
+            self._admit(cls, tenant)
+            self.metrics.inc(f"admission.{name}.admitted")
+            self.metrics.observe_ms(f"admission.{name}.queue", 0.0)
+            return 0.0
+        if self.pressure() >= cls.shed_at:
+            self._reject(cls, 503, "shed")
+        if cls.queued >= cls.max_queue:
+            self._reject(cls, 429, "queue_full")
+        if len(cls.waiters.get(tenant, ())) >= cls.tenant_max_queue:
+            self._reject(cls, 429, "tenant_queue_full")
+
+        start = time.perf_counter()
+        waiter = asyncio.get_running_loop().create_future()
+        cls.waiters.setdefault(tenant, deque()).append(waiter)
+        cls.queued += 1
+        try:
+            await asyncio.wait_for(waiter, timeout=self.max_wait_s)
+        except asyncio.TimeoutError:
+            # A slot handed over just as the timeout fired must not leak
+            if waiter.done() and not waiter.cancelled():
+                self.release(name, 0.0, tenant)
+            else:
+                self._dequeue(cls, tenant, waiter)
+            self._reject(cls, 503, "timeout")
+        waited = time.perf_counter() - start
+        self.metrics.inc(f"admission.{name}.admitted")
+        self.metrics.observe_ms(f"admission.{name}.queue", waited * 1000)
+        return waited
+
+    def release(self, name: str, held_s: float, tenant: str = "default"):
+        cls = self.classes[name]
+        if held_s:
+            cls.service_s += 0.1 * (held_s - cls.service_s)
+        cls.inflight -= 1
+        remaining = cls.tenant_inflight[tenant] - 1
+        if remaining:
+            cls.tenant_inflight[tenant] = remaining
+        else:
+            del cls.tenant_inflight[tenant]
+        # Hand the slot straight to the next tenant in turn that is under its cap
+        for next_tenant in list(cls.waiters):
+            if cls.tenant_inflight.get(next_tenant, 0) >= cls.tenant_max_inflight:
+                continue
+            queue = cls.waiters[next_tenant]
+            while queue:
+                waiter = queue.popleft()
+                cls.queued -= 1
+                if not waiter.done():
+                    self._admit(cls, next_tenant)
+                    waiter.set_result(None)
+                    break
+            if queue:
+                cls.waiters.move_to_end(next_tenant)
+            else:
+                del cls.waiters[next_tenant]
+            if cls.inflight == cls.max_inflight:
+                return
+
+    def tenant_stats(self, tenant: str) -> dict:
+        return {
+            name: {
+                "inflight": c.tenant_inflight.get(tenant, 0),
+                "queued": len(c.waiters.get(tenant, ())),
+                "max_inflight": c.tenant_max_inflight,
+                "max_queue": c.tenant_max_queue,
+            }
+            for name, c in self.classes.items()
+        }
+
+    def stats(self) -> dict:
+        return {
+            "pressure": self.pressure(),
+            "classes": {
+                name: {
+                    "inflight": c.inflight,
+                    "queued": c.queued,
+                    "max_inflight": c.max_inflight,
+                    "max_queue": c.max_queue,
+                    "tenant_max_inflight": c.tenant_max_inflight,
+                    "tenant_max_queue": c.tenant_max_queue,
+                    "tenants_waiting": len(c.waiters),
+                    "shed_at": c.shed_at,
+                    "avg_service_ms": c.service_s * 1000,
+                }
+                for name, c in self.classes.items()
+            },
+        }
@@ -0,0 +1,118 @@
+import json
+import time
+from contextlib import contextmanager
+
+from app.metrics import Metrics
+
+
+def content_bytes(contents: list) -> int:
+    return sum(len(c.encode("utf-8")) for c in contents if isinstance(c, str))
+
+
+def _longest_list(obj, best=None):
+    if isinstance(obj, list):
+        if len(obj) > 1 and (best is None or len(obj) > len(best)):
+            best = obj
+        items = obj
+    elif isinstance(obj, dict):
+        items = obj.values()
+    else:
+        return best
+    for item in items:
+        best = _longest_list(item, best)
+    return best
+
+
+def fit_to_budget(result, max_bytes: int):
+    """JSON for a tool result, trimmed to at most ``max_bytes``.
+
+    The longest list is halved (keeping its head, since tool results are
+    ranked) until the JSON fits; if lists alone cannot get it under the
+    budget the text is cut. Returns ``(text, trimmed)``.
+    """
+    text = json.dumps(result, default=str)
+    if max_bytes <= 0 or len(text.encode("utf-8")) <= max_bytes:
+        return text, False
+    result = json.loads(text)
+    while True:
+        longest = _longest_list(result)
+        if longest is None:
+            break
+        del longest[(len(longest) + 1) // 2:]
+        text = json.dumps(result)
+        if len(text.encode("utf-8")) <= max_bytes:
+            return text, True
+    return text.encode("utf-8")[:max_bytes].decode("utf-8", "ignore"), True
+
+
+class AgentTrace:
+    """Model calls and tool runs of one /agent request.
+
+    Every call is also recorded in ``metrics``: latency histograms per
+    phase and tool, and running counters of prompt bytes and tokens.
+    """
+
+    def __init__(self, metrics: Metrics, input_usd_per_1k: float = 0.0, output_usd_per_1k: float = 0.0):
+        self.metrics = metrics
+        self.input_usd_per_1k = input_usd_per_1k
+        self.output_usd_per_1k = output_usd_per_1k
+        self.calls = []
+        self.tools = []
+        self.trimmed = False
+
+    def generate(self, model, contents: list, phase: str):
+        prompt_bytes = content_bytes(contents)
+        start = time.perf_counter()
+        response = model.generate_content(contents)
+        ms = (time.perf_counter() - start) * 1000
+
+        usage = getattr(response, "usage_metadata", None)
+        input_tokens = getattr(usage, "prompt_token_count", 0) or 0
+        output_tokens = getattr(usage, "candidates_token_count", 0) or 0
+        self.calls.append({
+            "phase": phase,
+            "latency_ms": round(ms, 1),
+            "prompt_bytes": prompt_bytes,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+        })
+        self.metrics.observe_ms(f"agent.model.{phase}", ms)
+        self.metrics.inc("agent.model.calls")
+        self.metrics.inc("agent.prompt_bytes", prompt_bytes)
+        self.metrics.inc("agent.tokens.input", input_tokens)
+        self.metrics.inc("agent.tokens.output", output_tokens)
+        return response
+
+    @contextmanager
+    def tool(self, name: str, cached: bool = False):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            ms = (time.perf_counter() - start) * 1000
+            self.tools.append({"tool": name, "latency_ms": round(ms, 1), "cached": cached})
+            if not cached:
+                self.metrics.observe_ms(f"agent.tool.{name}", ms)
+
+    def cost_usd(self) -> float:
+        input_tokens = sum(c["input_tokens"] for c in self.calls)
+        output_tokens = sum(c["output_tokens"] for c in self.calls)
+        return (input_tokens * self.input_usd_per_1k + output_tokens * self.output_usd_per_1k) / 1000
+
+    def finish(self) -> dict:
+        """Record the request totals and return the debug block."""
+        cost = self.cost_usd()
+        self.metrics.inc("agent.cost_usd", cost)
+        if self.trimmed:
+            self.metrics.inc("agent.tool_results_trimmed")
+        return {
+            "calls": self.calls,
+            "tools": self.tools,
+            "tool_result_trimmed": self.trimmed,
+            "input_tokens": sum(c["input_tokens"] for c in self.calls),
+            "output_tokens": sum(c["output_tokens"] for c in self.calls),
+            "prompt_bytes": sum(c["prompt_bytes"] for c in self.calls),
+            "model_ms": round(sum(c["latency_ms"] for c in self.calls), 1),
+            "tool_ms": round(sum(t["latency_ms"] for t in self.tools), 1),
+            "est_cost_usd": round(cost, 6),
+        }
@@ -0,0 +1,125 @@
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Optional
+
+
+class PipeAlertState:
+    """Hysteresis state for a single pipe (fixed size, no history kept)."""
+
+    __slots__ = ("active", "pending_since", "changed_at", "last_prob", "peak_prob")
+
+    def __init__(self):
+        self.active = False
+        self.pending_since = None
+        self.changed_at = 0.0
+        self.last_prob = 0.0
+        self.peak_prob = 0.0
+
+
+class AlertEngine:
+    """Turns a stream of per-pipe probabilities into raise/clear transitions.
+
+    A pipe raises once its probability has stayed at or above ``enter_prob``
+    for ``enter_dwell_s`` seconds, and clears once it has stayed below
+    ``exit_prob`` for ``exit_dwell_s`` seconds. After a clear, the pipe cannot
+    raise again until ``cooldown_s`` has passed. Only transitions are appended
+    to the alert stream, which is a bounded ring buffer.
+    """
+
+    def __init__(
+        self,
+        enter_prob: float = 0.75,
+        exit_prob: float = 0.6,
+        enter_dwell_s: float = 0.0,
+        exit_dwell_s: float = 0.0,
+        cooldown_s: float = 0.0,
+        stream_size: int = 10000,
+    ):
+        if exit_prob > enter_prob:
+            raise ValueError("exit_prob must not be greater than enter_prob")
+        self.enter_prob = enter_prob
+        self.exit_prob = exit_prob
+        self.enter_dwell_s = enter_dwell_s
+        self.exit_dwell_s = exit_dwell_s
+        self.cooldown_s = cooldown_s
+        self._states = {}
+        self._stream = deque(maxlen=stream_size)
+        self._next_seq = 1
+        self._lock = threading.Lock()
+
+    def update(self, key: tuple, prob: float, risk: str, now: Optional[float] = None) -> Optional[dict]:
+        """Feed one prediction; return the emitted transition, if any."""
+        now = time.time() if now is None else now
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                state = self._states[key] = PipeAlertState()
+            state.last_prob = prob
+
+            if state.active:
+                state.peak_prob = max(state.peak_prob, prob)
+                if prob >= self.exit_prob:
+                    state.pending_since = None
+                    return None
+                if state.pending_since is None:
+                    state.pending_since = now
+                if now - state.pending_since < self.exit_dwell_s:
+                    return None
+                return self._transition(key, state, "cleared", prob, risk, now)
+
+            if prob < self.enter_prob:
+                state.pending_since = None
+                return None
+            if state.pending_since is None:
+                state.pending_since = now
+            if now - state.pending_since < self.enter_dwell_s:
+                return None
+            if state.changed_at and now - state.changed_at < self.cooldown_s:
+                return None
+            state.peak_prob = prob
+            return self._transition(key, state, "raised", prob, risk, now)
+
+    def _transition(self, key, state, kind, prob, risk, now):
+        state.active = kind == "raised"
+        state.pending_since = None
+        state.changed_at = now
+        event = {
+            "seq": self._next_seq,
+            "type": kind,
+            "Zone": key[0],
+            "Block": key[1],
+            "Pipe": key[2],
+            "leakage_prob": prob,
+            "peak_prob": state.peak_prob,
+            "risk_level": risk,
+            "at": datetime.fromtimestamp(now, tz=timezone.utc).isoformat(),
+        }
+        self._next_seq += 1
+        self._stream.append(event)
+        return event
+
+    def events(self, since: int = 0, limit: int = 100) -> list:
+        """Transitions with ``seq > since``, oldest first."""
+        with self._lock:
+            if not self._stream:
+                return []
+            start = max(since + 1 - self._stream[0]["seq"], 0)
+            return [self._stream[i] for i in range(start, min(start + limit, len(self._stream)))]
+
+    def active(self) -> list:
+        """Pipes currently in the raised state."""
+        with self._lock:
+            return [
+                {
+                    "Zone": key[0],
+                    "Block": key[1],
+                    "Pipe": key[2],
+                    "last_prob": state.last_prob,
+                    "peak_prob": state.peak_prob,
+                    "since": datetime.fromtimestamp(state.changed_at, tz=timezone.utc).isoformat(),
+                }
+                for key, state in self._states.items()
+                if state.active
+            ]
@@ -0,0 +1,190 @@
+"""Duplicate reading suppression for retried ingestion.
+
+Readings are keyed by a client-supplied reading ID or a hash of their
+content, both scoped to the tenant. Keys seen recently are remembered in a time-rotated Bloom
+filter: two generations of fixed size, the older one dropped whenever
+the current one has been filling for ``window_s`` seconds or holds
+``capacity`` keys, so memory is fixed and a key is remembered for
+between one and two windows. Results for the most recent keys are kept
+in a bounded LRU so duplicates can get the original answer back.
+"""
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+from app.fastpath import FLOAT_FIELDS, STR_FIELDS
+
+_MASK64 = (1 << 64) - 1
+
+
+def content_key(values: tuple) -> bytes:
+    """Key for a tuple of normalised field values (see ``reading_key``)."""
+    return hashlib.blake2b(repr(values).encode(), digest_size=16).digest()
+
+
+def reading_key(features: dict, tenant: str = "default") -> bytes:
+    # Numbers as floats so 55 and 55.0 give the same key
+    return content_key(
+        (tenant,)
+        + tuple(float(features[f]) for f in FLOAT_FIELDS)
+        + tuple(str(features[f]) for f in STR_FIELDS)
+    )
+
+
+def id_key(reading_id: str, tenant: str = "default") -> bytes:
+    return hashlib.blake2b(f"id:{tenant}:{reading_id}".encode(), digest_size=16).digest()
+
+
+class _Generation:
+    __slots__ = ("bits", "inserted", "started")
+
+    def __init__(self, size_bytes: int, started: float):
+        self.bits = bytearray(size_bytes)
+        self.inserted = 0
+        self.started = started
+
+
+class DuplicateFilter:
+    """Rotating Bloom filter of recent keys plus an LRU of their results.
+
+    ``seen`` checks a key and claims it in one step, so of several
+    concurrent copies exactly one is treated as new. A claimed key enters
+    the filter only once its reading is logged (``add``); if that fails,
+    ``discard`` drops the claim so a retry is scored and logged as new
+    (a Bloom filter cannot forget a key once added). A false positive (about
+    ``error_rate`` at ``capacity`` keys per generation) makes a new
+    reading look like a duplicate: it is still scored, but not logged.
+    Such hits have no cached result, so callers can count them (a hit
+    whose result was evicted from the LRU looks the same).
+    """
+
+    def __init__(
+        self,
+        capacity: int = 1_000_000,
+        error_rate: float = 1e-4,
+        window_s: float = 300.0,
+        cache_size: int = 10_000,
+        clock=time.time,
+    ):
+        self.capacity = capacity
+        self.window_s = window_s
+        self.cache_size = cache_size
+        self.clock = clock
+        bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.size_bytes = (bits + 7) // 8
+        self.n_bits = self.size_bytes * 8
+        self.n_hashes = max(1, round(self.n_bits / capacity * math.log(2)))
+        self._current = _Generation(self.size_bytes, clock())
+        self._previous = None
+        self._pending = set()
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _positions(self, key: bytes) -> list:
+        # Kirsch-Mitzenmacher double hashing over the two halves of the key
+        # (64-bit wrap-around, matching the numpy path in seen_many)
+        h1 = int.from_bytes(key[:8], "little")
+        h2 = int.from_bytes(key[8:16], "little") | 1
+        return [((h1 + i * h2) & _MASK64) % self.n_bits for i in range(self.n_hashes)]
+
+    def _bit_masks(self, keys: list) -> tuple:
+        halves = np.frombuffer(b"".join(keys), dtype="<u8").reshape(-1, 2)
+        steps = np.arange(self.n_hashes, dtype=np.uint64)
+        positions = (halves[:, :1] + steps * (halves[:, 1:] | np.uint64(1))) % np.uint64(self.n_bits)
+        offsets = (positions >> np.uint64(3)).astype(np.intp)
+        masks = (np.uint8(1) << (positions & np.uint64(7)).astype(np.uint8))
+        return offsets, masks
+
+    def _rotate(self, now: float):
+        current = self._current
+        if now - current.started < self.window_s and current.inserted < self.capacity:
+            return
+        self._previous = current if now - current.started < 2 * self.window_s else None
+        self._current = _Generation(self.size_bytes, now)
+
+    def seen(self, key: bytes) -> bool:
+        """Whether ``key`` was (probably) seen recently or is claimed; claims it if not."""
+        positions = self._positions(key)
+        with self._lock:
+            self._rotate(self.clock())
+            if key in self._pending:
+                return True
+            for generation in (self._current, self._previous):
+                if generation is not None and all(
+                    generation.bits[p >> 3] & (1 << (p & 7)) for p in positions
+                ):
+                    return True
+            self._pending.add(key)
+            return False
+
+    def seen_many(self, keys: list) -> list:
+        """``seen`` for a batch of 16-byte keys, vectorised; repeats within the batch count as seen."""
+        if not keys:
+            return []
+        offsets, masks = self._bit_masks(keys)
+        first = {}
+        repeated = np.fromiter((first.setdefault(k, i) != i for i, k in enumerate(keys)), bool, len(keys))
+
+        with self._lock:
+            self._rotate(self.clock())
+            pending = self._pending
+            seen = repeated | np.fromiter((k in pending for k in keys), bool, len(keys))
+            for generation in (self._current, self._previous):
+                if generation is not None:
+                    bits = np.frombuffer(generation.bits, dtype=np.uint8)
+                    seen = seen | ((bits[offsets] & masks) != 0).all(axis=1)
+            pending.update(k for k, s in zip(keys, seen.tolist()) if not s)
+        return seen.tolist()
+
+    def add(self, keys: list):
+        """Record keys claimed by ``seen``/``seen_many`` once their readings are logged."""
+        if not keys:
+            return
+        offsets, masks = self._bit_masks(keys)
+        with self._lock:
+            self._rotate(self.clock())
+            bits = np.frombuffer(self._current.bits, dtype=np.uint8)
+            np.bitwise_or.at(bits, offsets.ravel(), masks.ravel())
+            self._current.inserted += len(keys)
+            self._pending.difference_update(keys)
+
+    def discard(self, keys: list):
+        """Drop claims whose readings were not logged, so a retry counts as new."""
+        with self._lock:
+            self._pending.difference_update(keys)
+
+    def cached(self, key: bytes) -> Optional[dict]:
+        with self._lock:
+            result = self._results.get(key)
+            if result is not None:
+                self._results.move_to_end(key)
+            return result
+
+    def remember(self, key: bytes, result: dict):
+        with self._lock:
+            self._results[key] = result
+            self._results.move_to_end(key)
+            while len(self._results) > self.cache_size:
+                self._results.popitem(last=False)
+
+    def stats(self) -> dict:
+        now = self.clock()
+        with self._lock:
+            generations = [g for g in (self._current, self._previous) if g is not None]
+            return {
+                "window_s": self.window_s,
+                "capacity": self.capacity,
+                "bits": self.n_bits,
+                "hashes": self.n_hashes,
+                "memory_bytes": self.size_bytes * 2,
+                "generations": [
+                    {"inserted": g.inserted, "age_s": now - g.started} for g in generations
+                ],
+                "pending": len(self._pending),
+                "cached_results": len(self._results),
+            }
@@ -0,0 +1,74 @@
+def _bucket_bounds(n: int, n_buckets: int) -> list:
+    """Split indices 1..n-2 into ``n_buckets`` contiguous ranges (ends kept apart)."""
+    inner = n - 2
+    return [
+        (1 + inner * b // n_buckets, 1 + inner * (b + 1) // n_buckets)
+        for b in range(n_buckets)
+    ]
+
+
+def minmax_indices(ys: list, n_buckets: int) -> list:
+    """Keep the first, last, and the min and max of every bucket."""
+    n = len(ys)
+    keep = {0, n - 1}
+    for lo, hi in _bucket_bounds(n, n_buckets):
+        if lo >= hi:
+            continue
+        seg = range(lo, hi)
+        keep.add(min(seg, key=ys.__getitem__))
+        keep.add(max(seg, key=ys.__getitem__))
+    return sorted(keep)
+
+
+def lttb_indices(ys: list, n_buckets: int) -> list:
+    """Largest-Triangle-Three-Buckets over evenly spaced samples."""
+    n = len(ys)
+    bounds = _bucket_bounds(n, n_buckets)
+    keep = [0]
+    a = 0
+    for b, (lo, hi) in enumerate(bounds):
+        if lo >= hi:
+            continue
+        # Average of the next bucket (or the last point) is the third vertex
+        if b + 1 < len(bounds) and bounds[b + 1][0] < bounds[b + 1][1]:
+            nlo, nhi = bounds[b + 1]
+            cx = (nlo + nhi - 1) / 2
+            cy = sum(ys[nlo:nhi]) / (nhi - nlo)
+        else:
+            cx, cy = n - 1, ys[n - 1]
+        ax, ay = a, ys[a]
+        best, best_area = lo, -1.0
+        for i in range(lo, hi):
+            area = abs((ax - cx) * (ys[i] - ay) - (ax - i) * (cy - ay))
+            if area > best_area:
+                best, best_area = i, area
+        keep.append(best)
+        a = best
+    keep.append(n - 1)
+    return keep
+
+
+def downsample(points: list, width: int, method: str = "minmax",
+               value_key: str = "events", spike_key: str = "critical") -> list:
+    """Reduce ``points`` to roughly what ``width`` pixels can show.
+
+    Indices are chosen on ``value_key``; in addition, the point with the most
+    ``spike_key`` events in every bucket is always kept so that no spike of
+    that series is dropped.
+    """
+    n = len(points)
+    n_buckets = max(width, 1)
+    if n <= 2 * n_buckets or n < 3:
+        return points
+    ys = [p[value_key] for p in points]
+    if method == "lttb":
+        keep = set(lttb_indices(ys, n_buckets))
+    else:
+        keep = set(minmax_indices(ys, n_buckets))
+    for lo, hi in _bucket_bounds(n, n_buckets):
+        if lo >= hi:
+            continue
+        peak = max(range(lo, hi), key=lambda i: points[i][spike_key])
+        if points[peak][spike_key] > 0:
+            keep.add(peak)
+    return [points[i] for i in sorted(keep)]
@@ -0,0 +1,284 @@
+"""Streaming input-drift monitor against a reference profile of the training data.
+
+Numeric features are counted into fixed bins (the reference deciles) and
+categorical features into per-category counters, so memory does not grow
+with traffic. Counts cover the current window plus the previous one.
+``report`` scores them against the reference with PSI and a binned KS
+statistic, and gives the rate of categories the model never saw in
+training (the one-hot encoder silently maps those to all zeros).
+"""
+import bisect
+import json
+import math
+import os
+import threading
+import time
+from statistics import NormalDist
+
+import numpy as np
+
+from app.gate import NUMERIC_FEATURES
+
+CATEGORICAL_FEATURES = ["Zone", "Block", "Pipe", "Location_Code"]
+REFERENCE_BINS = 10
+
+# Stands in for empty bins so PSI stays finite
+PSI_FLOOR = 1e-4
+# Distinct unknown categories remembered per feature (for the report)
+MAX_UNKNOWN_TRACKED = 20
+# Categorical PSI only counts towards the status with this many rows per
+# category; below that it is dominated by sampling noise (~categories / rows)
+MIN_ROWS_PER_CATEGORY = 20
+
+
+def profile_path(model_path: str) -> str:
+    """Reference profile location for a model: beside it, ``<name>.drift.json``."""
+    return os.path.splitext(model_path)[0] + ".drift.json"
+
+
+def profile_from_samples(numeric: dict, categorical: dict, bins: int = REFERENCE_BINS,
+                         source: str = "data", known: dict = None) -> dict:
+    """Profile from raw samples: decile bin edges and category frequencies.
+
+    ``known`` maps a categorical feature to the categories the model was
+    fitted on; other sampled values are left out so they still count as
+    unknown in live traffic.
+    """
+    profile = {"source": source, "numeric": {}, "categorical": {}}
+    for feature, values in numeric.items():
+        values = sorted(v for v in values if not math.isnan(v))
+        if not values:
+            continue
+        edges = sorted({values[int(i * len(values) / bins)] for i in range(1, bins)})
+        counts = [0] * (len(edges) + 1)
+        for v in values:
+            counts[bisect.bisect_right(edges, v)] += 1
+        profile["numeric"][feature] = {
+            "edges": edges,
+            "expected": [c / len(values) for c in counts],
+            "mean": sum(values) / len(values),
+        }
+    for feature, values in categorical.items():
+        counts = {}
+        for v in values:
+            counts[str(v)] = counts.get(str(v), 0) + 1
+        total = sum(counts.values()) or 1
+        keys = sorted(known[feature]) if known and feature in known else sorted(counts)
+        profile["categorical"][feature] = {k: counts.get(k, 0) / total for k in keys}
+    return profile
+
+
+def profile_from_model(pipeline, bins: int = REFERENCE_BINS) -> dict:
+    """Approximate profile from the fitted preprocessing step.
+
+    Numeric features are assumed normal with the scaler's mean and scale;
+    categories are assumed equally frequent. Used when no profile built
+    from training data is available.
+    """
+    profile = {"source": "model", "numeric": {}, "categorical": {}}
+    for _, transformer, columns in pipeline.named_steps["preprocess"].transformers_:
+        if hasattr(transformer, "mean_") and hasattr(transformer, "scale_"):
+            for col, mean, scale in zip(columns, transformer.mean_, transformer.scale_):
+                dist = NormalDist(float(mean), float(scale) or 1.0)
+                profile["numeric"][col] = {
+                    "edges": [dist.inv_cdf(i / bins) for i in range(1, bins)],
+                    "expected": [1.0 / bins] * bins,
+                    "mean": float(mean),
+                }
+        elif hasattr(transformer, "categories_"):
+            for col, categories in zip(columns, transformer.categories_):
+                share = 1.0 / len(categories)
+                profile["categorical"][col] = {str(c): share for c in categories}
+    return profile
+
+
+def load_profile(path: str, pipeline) -> dict:
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    return profile_from_model(pipeline)
+
+
+def psi(actual: list, expected: list) -> float:
+    """Population stability index between two distributions over the same bins."""
+    total = 0.0
+    for a, e in zip(actual, expected):
+        a, e = max(a, PSI_FLOOR), max(e, PSI_FLOOR)
+        total += (a - e) * math.log(a / e)
+    return total
+
+
+def binned_ks(actual: list, expected: list) -> float:
+    """Largest CDF gap at the bin edges (a lower bound on the exact KS statistic)."""
+    gap = seen_a = seen_e = 0.0
+    for a, e in zip(actual, expected):
+        seen_a += a
+        seen_e += e
+        gap = max(gap, abs(seen_a - seen_e))
+    return gap
+
+
+class _Window:
+    """Counts for one time window."""
+
+    __slots__ = ("start", "rows", "bins", "sums", "categories", "unknown", "unknown_values")
+
+    def __init__(self, start: float, profile: dict):
+        self.start = start
+        self.rows = 0
+        self.bins = {f: [0] * (len(p["edges"]) + 1) for f, p in profile["numeric"].items()}
+        self.sums = {f: 0.0 for f in profile["numeric"]}
+        self.categories = {f: dict.fromkeys(p, 0) for f, p in profile["categorical"].items()}
+        self.unknown = dict.fromkeys(profile["categorical"], 0)
+        self.unknown_values = {f: {} for f in profile["categorical"]}
+
+    def count_unknown(self, feature: str, value, n: int = 1):
+        self.unknown[feature] += n
+        seen = self.unknown_values[feature]
+        if value in seen or len(seen) < MAX_UNKNOWN_TRACKED:
+            seen[value] = seen.get(value, 0) + n
+
+
+class DriftMonitor:
+    """Fixed-memory live feature distributions scored against a reference profile.
+
+    The window rotates every ``window_s`` seconds; reports cover the
+    current and previous window, so they always reflect between one and
+    two windows of traffic. ``status`` is ``drift`` when any feature's PSI
+    reaches ``psi_alert`` (categorical features only once there are
+    ``MIN_ROWS_PER_CATEGORY`` rows per category), ``warn`` at ``psi_warn``
+    or when an unknown category rate exceeds ``unknown_warn``, and
+    ``insufficient_data`` below ``min_rows``.
+    """
+
+    def __init__(
+        self,
+        profile: dict,
+        window_s: float = 3600.0,
+        psi_warn: float = 0.1,
+        psi_alert: float = 0.25,
+        unknown_warn: float = 0.01,
+        min_rows: int = 200,
+        clock=time.time,
+    ):
+        self.profile = profile
+        self.window_s = window_s
+        self.psi_warn = psi_warn
+        self.psi_alert = psi_alert
+        self.unknown_warn = unknown_warn
+        self.min_rows = min_rows
+        self.clock = clock
+        self._edges = {f: p["edges"] for f, p in profile["numeric"].items()}
+        self._edge_arrays = {f: np.asarray(e, dtype=float) for f, e in self._edges.items()}
+        now = clock()
+        self._current = _Window(now, profile)
+        self._previous = None
+        self._lock = threading.Lock()
+
+    def _rotate(self, now: float):
+        if now - self._current.start < self.window_s:
+            return
+        recent = now - self._current.start < 2 * self.window_s
+        self._previous = self._current if recent else None
+        self._current = _Window(now, self.profile)
+
+    def observe(self, features: dict):
+        """Count one reading (a few bisects under a lock)."""
+        with self._lock:
+            self._rotate(self.clock())
+            w = self._current
+            w.rows += 1
+            for f, edges in self._edges.items():
+                v = features[f]
+                w.bins[f][bisect.bisect_right(edges, v)] += 1
+                w.sums[f] += v
+            for f, counts in w.categories.items():
+                value = features[f]
+                if value in counts:
+                    counts[value] += 1
+                else:
+                    w.count_unknown(f, value)
+
+    def observe_frame(self, df):
+        """Count a batch of readings (a DataFrame with the input columns)."""
+        if not len(df):
+            return
+        binned = {}
+        for f, edges in self._edge_arrays.items():
+            values = df[f].to_numpy(dtype=float)
+            idx = np.searchsorted(edges, values, side="right")
+            binned[f] = (np.bincount(idx, minlength=len(edges) + 1), float(values.sum()))
+        values = {f: df[f].astype(str).value_counts() for f in self.profile["categorical"]}
+
+        with self._lock:
+            self._rotate(self.clock())
+            w = self._current
+            w.rows += len(df)
+            for f, (counts, total) in binned.items():
+                bins = w.bins[f]
+                for i, c in enumerate(counts.tolist()):
+                    bins[i] += c
+                w.sums[f] += total
+            for f, value_counts in values.items():
+                counts = w.categories[f]
+                for value, n in value_counts.items():
+                    if value in counts:
+                        counts[value] += int(n)
+                    else:
+                        w.count_unknown(f, value, int(n))
+
+    def report(self) -> dict:
+        with self._lock:
+            self._rotate(self.clock())
+            windows = [w for w in (self._previous, self._current) if w is not None]
+            rows = sum(w.rows for w in windows)
+            numeric = {}
+            for f, ref in self.profile["numeric"].items():
+                counts = [sum(w.bins[f][i] for w in windows) for i in range(len(ref["edges"]) + 1)]
+                actual = [c / rows for c in counts] if rows else [0.0] * len(counts)
+                numeric[f] = {
+                    "psi": psi(actual, ref["expected"]) if rows else 0.0,
+                    "ks": binned_ks(actual, ref["expected"]) if rows else 0.0,
+                    "mean": sum(w.sums[f] for w in windows) / rows if rows else None,
+                    "reference_mean": ref.get("mean"),
+                }
+            categorical = {}
+            for f, ref in self.profile["categorical"].items():
+                unknown = sum(w.unknown[f] for w in windows)
+                counts = [sum(w.categories[f][c] for w in windows) for c in ref] + [unknown]
+                actual = [c / rows for c in counts] if rows else [0.0] * len(counts)
+                top = {}
+                for w in windows:
+                    for value, n in w.unknown_values[f].items():
+                        top[value] = top.get(value, 0) + n
+                categorical[f] = {
+                    "psi": psi(actual, list(ref.values()) + [0.0]) if rows else 0.0,
+                    "unknown_rate": unknown / rows if rows else 0.0,
+                    "unknown_top": sorted(top.items(), key=lambda kv: -kv[1])[:5],
+                }
+
+        psis = {f: s["psi"] for f, s in numeric.items()}
+        psis.update(
+            (f, s["psi"]) for f, s in categorical.items()
+            if rows >= MIN_ROWS_PER_CATEGORY * len(self.profile["categorical"][f])
+        )
+        unknown_high = [f for f, s in categorical.items() if s["unknown_rate"] > self.unknown_warn]
+        if rows < self.min_rows:
+            status = "insufficient_data"
+        elif any(v >= self.psi_alert for v in psis.values()):
+            status = "drift"
+        elif unknown_high or any(v >= self.psi_warn for v in psis.values()):
+            status = "warn"
+        else:
+            status = "ok"
+        return {
+            "status": status,
+            "rows": rows,
+            "window_s": self.window_s,
+            "since": windows[0].start,
+            "reference": self.profile.get("source", "data"),
+            "drifting": sorted(f for f, v in psis.items() if v >= self.psi_alert),
+            "unknown_categories": unknown_high,
+            "numeric": numeric,
+            "categorical": categorical,
+        }
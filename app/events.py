@@ -0,0 +1,86 @@
+import asyncio
+import threading
+from collections import deque
+
+from app.metrics import Metrics
+
+
+class Subscriber:
+    __slots__ = ("queue", "loop", "types", "tenant")
+
+    def __init__(self, loop, types, size, tenant):
+        self.queue = asyncio.Queue(maxsize=size)
+        self.loop = loop
+        self.types = types
+        self.tenant = tenant
+
+
+class EventBroker:
+    """Fan-out of live events (predictions, alert transitions) to SSE clients.
+
+    Events belong to a tenant and only reach that tenant's subscribers.
+    ``publish`` may be called from worker threads; events are handed to each
+    subscriber's event loop in one batch per call. Slow subscribers have
+    bounded queues and lose their oldest events first. The last
+    ``replay_size`` events of each tenant are kept so reconnecting clients
+    can resume from their Last-Event-ID. Event IDs are unique across
+    tenants, so a tenant's IDs increase but have gaps.
+    """
+
+    def __init__(self, metrics: Metrics, queue_size: int = 1000, replay_size: int = 1000):
+        self.metrics = metrics
+        self.queue_size = queue_size
+        self.replay_size = replay_size
+        self._subscribers = {}  # tenant -> set of Subscriber
+        self._replay = {}  # tenant -> deque of recent events
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def publish(self, kind: str, payloads: list, tenant: str = "default"):
+        if not payloads:
+            return
+        with self._lock:
+            events = []
+            for payload in payloads:
+                events.append((self._next_id, kind, payload))
+                self._next_id += 1
+            replay = self._replay.get(tenant)
+            if replay is None:
+                replay = self._replay[tenant] = deque(maxlen=self.replay_size)
+            replay.extend(events)
+            subscribers = list(self._subscribers.get(tenant, ()))
+        for sub in subscribers:
+            if sub.types is None or kind in sub.types:
+                sub.loop.call_soon_threadsafe(self._offer, sub, events)
+
+    def _offer(self, sub: Subscriber, events: list):
+        for event in events:
+            if sub.queue.full():
+                sub.queue.get_nowait()
+                self.metrics.inc("stream.dropped")
+            sub.queue.put_nowait(event)
+
+    def subscribe(self, types=None, last_id: int = 0, tenant: str = "default") -> Subscriber:
+        """Register a tenant's subscriber on the running loop, replaying its events after ``last_id``."""
+        sub = Subscriber(asyncio.get_running_loop(), types, self.queue_size, tenant)
+        with self._lock:
+            if last_id:
+                backlog = [
+                    e for e in self._replay.get(tenant, ())
+                    if e[0] > last_id and (types is None or e[1] in types)
+                ]
+                self._offer(sub, backlog[-self.queue_size:])
+            self._subscribers.setdefault(tenant, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(sub.tenant)
+            if subscribers is not None:
+                subscribers.discard(sub)
+                if not subscribers:
+                    del self._subscribers[sub.tenant]
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(s) for s in self._subscribers.values())
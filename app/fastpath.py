@@ -0,0 +1,198 @@
+import math
+
+import orjson
+from fastapi.exceptions import RequestValidationError
+
+# The 12 fixed Reading fields, in model column order
+FLOAT_FIELDS = (
+    "Pressure",
+    "Flow_Rate",
+    "Temperature",
+    "Vibration",
+    "RPM",
+    "Operational_Hours",
+    "Latitude",
+    "Longitude",
+)
+STR_FIELDS = ("Zone", "Block", "Pipe", "Location_Code")
+READING_FIELDS = FLOAT_FIELDS + STR_FIELDS
+
+
+def _build_validator():
+    """Generate a straight-line validator for the fixed Reading fields.
+
+    The generated function avoids per-field loops and attribute lookups and
+    mirrors pydantic's lax rules for these types: floats accept int/float/bool
+    and numeric strings but must be finite, strings accept only str. Extra
+    keys are ignored.
+    """
+    lines = ["def validate(data):", "    errors = None"]
+    for name in FLOAT_FIELDS:
+        lines += [
+            f"    v = data.get({name!r}, _MISSING)",
+            "    t = type(v)",
+            "    if t is not float:",
+            "        if t is int or t is bool:",
+            "            v = float(v)",
+            "        else:",
+            f"            v, err = _coerce_float({name!r}, v)",
+            "            if err is not None:",
+            "                errors = (errors or []) + [err]",
+            "    elif not _isfinite(v):",
+            f"        errors = (errors or []) + [_finite_error({name!r}, v)]",
+            f"    f_{name} = v",
+        ]
+    for name in STR_FIELDS:
+        lines += [
+            f"    v = data.get({name!r}, _MISSING)",
+            "    if type(v) is not str:",
+            f"        errors = (errors or []) + [_str_error({name!r}, v)]",
+            f"    f_{name} = v",
+        ]
+    lines += [
+        "    if errors:",
+        "        raise RequestValidationError(errors)",
+        "    return {" + ", ".join(f"{n!r}: f_{n}" for n in READING_FIELDS) + "}",
+    ]
+    namespace = {
+        "_MISSING": _MISSING,
+        "_coerce_float": _coerce_float,
+        "_finite_error": _finite_error,
+        "_isfinite": math.isfinite,
+        "_str_error": _str_error,
+        "RequestValidationError": RequestValidationError,
+    }
+    exec("\n".join(lines), namespace)
+    return namespace["validate"]
+
+
+_MISSING = object()
+
+
+def _missing(name):
+    return {"type": "missing", "loc": ("body", name), "msg": "Field required", "input": None}
+
+
+def _coerce_float(name, v):
+    if v is _MISSING:
+        return None, _missing(name)
+    if isinstance(v, str):
+        try:
+            f = float(v)
+        except ValueError:
+            pass
+        else:
+            return (f, None) if math.isfinite(f) else (None, _finite_error(name, v))
+        return None, {
+            "type": "float_parsing",
+            "loc": ("body", name),
+            "msg": "Input should be a valid number, unable to parse string as a number",
+            "input": v,
+        }
+    return None, {
+        "type": "float_type",
+        "loc": ("body", name),
+        "msg": "Input should be a valid number",
+        "input": v,
+    }
+
+
+def _finite_error(name, v):
+    # A float inf/nan input would make the 422 body itself invalid JSON
+    return {
+        "type": "finite_number",
+        "loc": ("body", name),
+        "msg": "Input should be a finite number",
+        "input": v if isinstance(v, str) else str(v),
+    }
+
+
+def _str_error(name, v):
+    if v is _MISSING:
+        return _missing(name)
+    return {
+        "type": "string_type",
+        "loc": ("body", name),
+        "msg": "Input should be a valid string",
+        "input": v,
+    }
+
+
+validate_reading = _build_validator()
+
+
+def decode_json(body: bytes):
+    """Parse a request body, reporting bad JSON the way FastAPI does."""
+    try:
+        return orjson.loads(body)
+    except orjson.JSONDecodeError as e:
+        raise RequestValidationError([{
+            "type": "json_invalid",
+            "loc": ("body", e.pos),
+            "msg": "JSON decode error",
+            "input": {},
+            "ctx": {"error": e.msg},
+        }])
+
+
+def decode_reading(body: bytes) -> dict:
+    """Decode and validate a single Reading body into a plain feature dict."""
+    data = decode_json(body)
+    if type(data) is not dict:
+        raise RequestValidationError([{
+            "type": "model_attributes_type",
+            "loc": ("body",),
+            "msg": "Input should be a valid dictionary or object to extract fields from",
+            "input": data,
+        }])
+    return validate_reading(data)
+
+
+def encode(obj) -> bytes:
+    return orjson.dumps(obj)
+
+
+def decode_batch_readings(body: bytes, max_rows: int) -> tuple:
+    """Decode ``{"readings": [...], "dry_run": bool}`` into feature dicts."""
+    data = decode_json(body)
+    readings = data.get("readings") if type(data) is dict else None
+    if type(readings) is not list:
+        raise RequestValidationError([{
+            "type": "list_type",
+            "loc": ("body", "readings"),
+            "msg": "Input should be a valid list",
+            "input": readings,
+        }])
+    if len(readings) > max_rows:
+        raise RequestValidationError([{
+            "type": "too_long",
+            "loc": ("body", "readings"),
+            "msg": f"List should have at most {max_rows} items",
+            "input": len(readings),
+        }])
+    # bool("false") is True: only a JSON boolean may decide whether rows are logged
+    dry_run = data.get("dry_run", False)
+    if type(dry_run) is not bool:
+        raise RequestValidationError([{
+            "type": "bool_type",
+            "loc": ("body", "dry_run"),
+            "msg": "Input should be a valid boolean",
+            "input": dry_run,
+        }])
+    rows, errors = [], []
+    for i, item in enumerate(readings):
+        try:
+            if type(item) is not dict:
+                raise RequestValidationError([{
+                    "type": "model_attributes_type",
+                    "loc": ("body",),
+                    "msg": "Input should be a valid dictionary or object to extract fields from",
+                    "input": item,
+                }])
+            rows.append(validate_reading(item))
+        except RequestValidationError as e:
+            for err in e.errors():
+                errors.append({**err, "loc": ("body", "readings", i) + tuple(err["loc"][1:])})
+    if errors:
+        raise RequestValidationError(errors)
+    return rows, dry_run
@@ -0,0 +1,126 @@
+import random
+import threading
+from typing import Optional
+
+from app.metrics import Metrics
+
+NUMERIC_FEATURES = [
+    "Pressure",
+    "Flow_Rate",
+    "Temperature",
+    "Vibration",
+    "RPM",
+    "Operational_Hours",
+    "Latitude",
+    "Longitude",
+]
+
+
+class PipeEnvelope:
+    """Exponentially weighted mean/variance of a pipe's normal readings."""
+
+    __slots__ = ("n", "mean", "var", "prob")
+
+    def __init__(self, size: int):
+        self.n = 0
+        self.mean = [0.0] * size
+        self.var = [0.0] * size
+        self.prob = 0.0
+
+
+class InferenceGate:
+    """Per-pipe z-score envelope that lets clearly normal readings skip the model.
+
+    Envelopes are learned only from readings the model itself scored as low
+    risk. A reading is gated when the pipe has seen at least ``warmup``
+    such readings, its recent model probability is below ``low_prob``, and
+    every numeric feature is within ``z_max`` standard deviations of the
+    envelope mean. A fraction ``audit_rate`` of gated readings is still
+    scored so the gate's false-negative rate can be measured.
+    """
+
+    def __init__(
+        self,
+        metrics: Metrics,
+        z_max: float = 3.0,
+        warmup: int = 50,
+        alpha: float = 0.05,
+        audit_rate: float = 0.05,
+        low_prob: float = 0.25,
+    ):
+        self.metrics = metrics
+        self.z_max = z_max
+        self.warmup = warmup
+        self.alpha = alpha
+        self.audit_rate = audit_rate
+        self.low_prob = low_prob
+        self._envelopes = {}
+        self._lock = threading.Lock()
+
+    def check(self, key: tuple, values: list) -> Optional[float]:
+        """Return a fast low-risk probability if the reading is inside the envelope."""
+        self.metrics.inc("gate.checked")
+        env = self._envelopes.get(key)
+        if env is None or env.n < self.warmup or env.prob >= self.low_prob:
+            self.metrics.inc("gate.warming")
+            return None
+        z2 = self.z_max * self.z_max
+        for x, mean, var in zip(values, env.mean, env.var):
+            d = x - mean
+            if d * d > z2 * var + 1e-12:
+                self.metrics.inc("gate.outside")
+                return None
+        self.metrics.inc("gate.inside")
+        return env.prob
+
+    def audit(self) -> bool:
+        """Decide whether a gated reading should still run through the model."""
+        if random.random() < self.audit_rate:
+            self.metrics.inc("gate.audited")
+            return True
+        self.metrics.inc("gate.skipped")
+        return False
+
+    def observe(self, key: tuple, values: list, prob: float, gated: bool = False):
+        """Record a model-scored reading; learn from it if it was low risk."""
+        if gated and prob >= self.low_prob:
+            self.metrics.inc("gate.audit_false_negative")
+        with self._lock:
+            env = self._envelopes.get(key)
+            if prob >= self.low_prob:
+                if env is not None:
+                    env.prob += self.alpha * (prob - env.prob)
+                return
+            if env is None:
+                env = self._envelopes[key] = PipeEnvelope(len(values))
+                env.mean = list(values)
+                env.prob = prob
+                env.n = 1
+                return
+            # Warm up with a plain running average, then switch to EWMA
+            a = max(self.alpha, 1.0 / (env.n + 1))
+            for i, x in enumerate(values):
+                d = x - env.mean[i]
+                env.mean[i] += a * d
+                env.var[i] = (1 - a) * (env.var[i] + a * d * d)
+            env.prob += a * (prob - env.prob)
+            env.n += 1
+
+    def stats(self) -> dict:
+        checked = self.metrics.counter("gate.checked")
+        skipped = self.metrics.counter("gate.skipped")
+        audited = self.metrics.counter("gate.audited")
+        false_neg = self.metrics.counter("gate.audit_false_negative")
+        return {
+            "pipes_tracked": len(self._envelopes),
+            "checked": checked,
+            "inside_envelope": self.metrics.counter("gate.inside"),
+            "skipped": skipped,
+            "skip_rate": skipped / checked if checked else 0.0,
+            "audited": audited,
+            "audit_false_negatives": false_neg,
+            "false_negative_rate": false_neg / audited if audited else 0.0,
+            "z_max": self.z_max,
+            "audit_rate": self.audit_rate,
+        }
+
@@ -0,0 +1,145 @@
+import heapq
+import math
+import threading
+from typing import Optional
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEG_LAT = 111320.0
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GridIndex:
+    """Uniform lat/lon grid over the latest prediction of every pipe.
+
+    Each pipe lives in exactly one cell; an update moves it only when its
+    coordinates change cell. Radius and k-nearest queries visit the cells
+    around the query point and check exact haversine distances.
+    """
+
+    def __init__(self, cell_m: float = 250.0):
+        self.cell_deg = cell_m / METERS_PER_DEG_LAT
+        self._cells = {}
+        self._pipes = {}
+        self._lock = threading.Lock()
+
+    def _cell(self, lat: float, lon: float) -> tuple:
+        return (math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg))
+
+    def update(self, key: tuple, lat: float, lon: float, prob: float, risk: str):
+        cell = self._cell(lat, lon)
+        with self._lock:
+            entry = self._pipes.get(key)
+            if entry is not None and entry[4] != cell:
+                members = self._cells[entry[4]]
+                members.discard(key)
+                if not members:
+                    del self._cells[entry[4]]
+                entry = None
+            if entry is None:
+                self._cells.setdefault(cell, set()).add(key)
+            self._pipes[key] = (lat, lon, prob, risk, cell)
+
+    def location(self, key: tuple) -> Optional[tuple]:
+        entry = self._pipes.get(key)
+        return None if entry is None else (entry[0], entry[1])
+
+    def _ring(self, center: tuple, r: int):
+        ci, cj = center
+        if r == 0:
+            yield center
+            return
+        for dj in range(-r, r + 1):
+            yield (ci - r, cj + dj)
+            yield (ci + r, cj + dj)
+        for di in range(-r + 1, r):
+            yield (ci + di, cj - r)
+            yield (ci + di, cj + r)
+
+    def _match(self, key, entry, lat, lon, min_prob, exclude):
+        if key == exclude or entry[2] < min_prob:
+            return None
+        return haversine_m(lat, lon, entry[0], entry[1])
+
+    def radius(self, lat: float, lon: float, radius_m: float, min_prob: float = 0.0,
+               limit: int = 100, exclude: Optional[tuple] = None) -> list:
+        """Pipes within ``radius_m`` of the point, nearest first."""
+        cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+        di = int(math.ceil(radius_m / METERS_PER_DEG_LAT / self.cell_deg))
+        dj = int(math.ceil(radius_m / (METERS_PER_DEG_LAT * cos_lat) / self.cell_deg))
+        ci, cj = self._cell(lat, lon)
+        hits = []
+        with self._lock:
+            if (2 * di + 1) * (2 * dj + 1) > len(self._cells):
+                candidates = self._pipes.keys()
+            else:
+                candidates = (
+                    key
+                    for i in range(ci - di, ci + di + 1)
+                    for j in range(cj - dj, cj + dj + 1)
+                    for key in self._cells.get((i, j), ())
+                )
+            for key in candidates:
+                entry = self._pipes[key]
+                d = self._match(key, entry, lat, lon, min_prob, exclude)
+                if d is not None and d <= radius_m:
+                    hits.append((d, key, entry))
+        hits.sort(key=lambda h: h[0])
+        return [self._row(d, key, entry) for d, key, entry in hits[:limit]]
+
+    def nearest(self, lat: float, lon: float, k: int = 5, min_prob: float = 0.0,
+                exclude: Optional[tuple] = None) -> list:
+        """The ``k`` pipes closest to the point."""
+        cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+        # Every point within r rings is at least r * ring_m away from outside ones
+        ring_m = self.cell_deg * METERS_PER_DEG_LAT * cos_lat
+        center = self._cell(lat, lon)
+        best = []  # max-heap of (-distance, key, entry)
+        with self._lock:
+            max_rings = max(1, int(math.isqrt(len(self._cells))) + 1)
+            for r in range(max_rings + 1):
+                for cell in self._ring(center, r):
+                    for key in self._cells.get(cell, ()):
+                        entry = self._pipes[key]
+                        d = self._match(key, entry, lat, lon, min_prob, exclude)
+                        if d is None:
+                            continue
+                        if len(best) < k:
+                            heapq.heappush(best, (-d, key, entry))
+                        elif d < -best[0][0]:
+                            heapq.heapreplace(best, (-d, key, entry))
+                if len(best) == k and -best[0][0] <= r * ring_m:
+                    break
+            else:
+                # Sparse or very spread-out network: finish with a full scan
+                for key, entry in self._pipes.items():
+                    d = self._match(key, entry, lat, lon, min_prob, exclude)
+                    if d is None or any(b[1] == key for b in best):
+                        continue
+                    if len(best) < k:
+                        heapq.heappush(best, (-d, key, entry))
+                    elif d < -best[0][0]:
+                        heapq.heapreplace(best, (-d, key, entry))
+        return [self._row(-nd, key, entry) for nd, key, entry in sorted(best, reverse=True)]
+
+    @staticmethod
+    def _row(d, key, entry) -> dict:
+        return {
+            "Zone": key[0],
+            "Block": key[1],
+            "Pipe": key[2],
+            "Latitude": entry[0],
+            "Longitude": entry[1],
+            "leakage_prob": entry[2],
+            "risk_level": entry[3],
+            "distance_m": round(d, 1),
+        }
+
+    def __len__(self):
+        return len(self._pipes)
@@ -0,0 +1,90 @@
+import threading
+from typing import Optional
+
+RISK_LEVELS = ("low", "medium", "high", "critical")
+LEVEL_NAMES = ("network", "Zone", "Block", "Pipe")
+
+
+class AggregateNode:
+    """Running totals for one level of the Zone -> Block -> Pipe tree."""
+
+    __slots__ = ("count", "leak_count", "prob_sum", "max_prob", "risk_counts",
+                 "last_prob", "last_risk", "children")
+
+    def __init__(self):
+        self.count = 0
+        self.leak_count = 0
+        self.prob_sum = 0.0
+        self.max_prob = 0.0
+        self.risk_counts = [0, 0, 0, 0]
+        self.last_prob = None
+        self.last_risk = None
+        self.children = {}
+
+    def add(self, prob: float, flag: int, risk_idx: int, risk: str):
+        self.count += 1
+        self.leak_count += flag
+        self.prob_sum += prob
+        if prob > self.max_prob:
+            self.max_prob = prob
+        self.risk_counts[risk_idx] += 1
+        self.last_prob = prob
+        self.last_risk = risk
+
+    def summary(self) -> dict:
+        return {
+            "total_events": self.count,
+            "leak_events": self.leak_count,
+            "avg_leakage_prob": self.prob_sum / self.count if self.count else 0.0,
+            "max_leakage_prob": self.max_prob,
+            "risk_mix": dict(zip(RISK_LEVELS, self.risk_counts)),
+            "last_leakage_prob": self.last_prob,
+            "last_risk_level": self.last_risk,
+        }
+
+
+class AggregateTree:
+    """In-memory network -> Zone -> Block -> Pipe aggregates.
+
+    Every prediction updates the four nodes on its path, so each node's
+    summary is always current and reading it costs O(1).
+    """
+
+    def __init__(self):
+        self.root = AggregateNode()
+        self._risk_index = {r: i for i, r in enumerate(RISK_LEVELS)}
+        self._lock = threading.Lock()
+
+    def update(self, zone: str, block: str, pipe: str, prob: float, flag: int, risk: str):
+        risk_idx = self._risk_index[risk]
+        with self._lock:
+            node = self.root
+            node.add(prob, flag, risk_idx, risk)
+            for name in (zone, block, pipe):
+                child = node.children.get(name)
+                if child is None:
+                    child = node.children[name] = AggregateNode()
+                child.add(prob, flag, risk_idx, risk)
+                node = child
+
+    def subtree(self, zone: Optional[str] = None, block: Optional[str] = None,
+                pipe: Optional[str] = None, children: bool = True) -> Optional[dict]:
+        """Summary of the node at the given path, plus its direct children."""
+        if (block and not zone) or (pipe and not block):
+            raise ValueError("Block requires Zone and Pipe requires Block")
+        path = [p for p in (zone, block, pipe) if p]
+        with self._lock:
+            node = self.root
+            for name in path:
+                node = node.children.get(name)
+                if node is None:
+                    return None
+            out = {
+                "level": LEVEL_NAMES[len(path)],
+                "path": dict(zip(LEVEL_NAMES[1:], path)),
+                **node.summary(),
+            }
+            if children and node.children:
+                out["children_level"] = LEVEL_NAMES[len(path) + 1]
+                out["children"] = {name: c.summary() for name, c in node.children.items()}
+            return out
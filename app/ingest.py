@@ -0,0 +1,106 @@
+"""Packed binary batch format for gateway ingestion (``LGB1``).
+
+All integers and floats are little-endian. A batch of ``n`` readings is laid
+out column-major so the server can view each block as a NumPy array without
+copying:
+
+    offset            size        content
+    0                 4           magic b"LGB1"
+    4                 4           uint32 n (number of rows)
+    8                 8 * 8n      float64 columns, FLOAT_FIELDS order
+    8 + 64n           4 * 4n      uint32 dictionary codes, STR_FIELDS order
+    8 + 80n           ...         4 dictionaries, STR_FIELDS order
+
+Each dictionary is a uint32 entry count followed by that many entries of
+uint16 byte length + UTF-8 bytes. A code is an index into the dictionary of
+its column.
+"""
+import struct
+
+import numpy as np
+
+from app.fastpath import FLOAT_FIELDS, STR_FIELDS
+
+MAGIC = b"LGB1"
+CONTENT_TYPE = "application/vnd.leakguard.batch"
+_HEADER = struct.Struct("<4sI")
+_COUNT = struct.Struct("<I")
+_LEN = struct.Struct("<H")
+
+
+def decode_batch(buf: bytes, max_rows: int = 100000) -> tuple:
+    """Return ``(numeric, codes, dictionaries)`` views over ``buf``.
+
+    ``numeric`` has shape (8, n) and ``codes`` shape (4, n); both share memory
+    with ``buf``. Raises ValueError on malformed input, including NaN or
+    infinite numeric values.
+    """
+    if len(buf) < _HEADER.size:
+        raise ValueError("batch too short")
+    magic, n = _HEADER.unpack_from(buf, 0)
+    if magic != MAGIC:
+        raise ValueError("bad magic, expected LGB1")
+    if n > max_rows:
+        raise ValueError(f"batch has {n} rows, limit is {max_rows}")
+
+    n_float, n_str = len(FLOAT_FIELDS), len(STR_FIELDS)
+    codes_at = _HEADER.size + 8 * n_float * n
+    dicts_at = codes_at + 4 * n_str * n
+    if len(buf) < dicts_at:
+        raise ValueError("batch truncated in column data")
+    numeric = np.frombuffer(buf, dtype="<f8", count=n_float * n, offset=_HEADER.size).reshape(n_float, n)
+    if not np.isfinite(numeric).all():
+        raise ValueError("numeric fields must be finite")
+    codes = np.frombuffer(buf, dtype="<u4", count=n_str * n, offset=codes_at).reshape(n_str, n)
+
+    dictionaries = []
+    pos = dicts_at
+    try:
+        for name in STR_FIELDS:
+            (count,) = _COUNT.unpack_from(buf, pos)
+            pos += _COUNT.size
+            entries = []
+            for _ in range(count):
+                (size,) = _LEN.unpack_from(buf, pos)
+                pos += _LEN.size
+                if pos + size > len(buf):
+                    raise ValueError(f"dictionary for {name} truncated")
+                entries.append(bytes(buf[pos:pos + size]).decode("utf-8"))
+                pos += size
+            dictionaries.append(np.array(entries, dtype=object))
+    except struct.error:
+        raise ValueError("batch truncated in dictionaries")
+    if pos != len(buf):
+        raise ValueError("trailing bytes after dictionaries")
+
+    for name, col, entries in zip(STR_FIELDS, codes, dictionaries):
+        if n and int(col.max()) >= len(entries):
+            raise ValueError(f"code out of range for {name}")
+    return numeric, codes, dictionaries
+
+
+def batch_frame_columns(numeric, codes, dictionaries) -> dict:
+    """Model input columns: numeric views plus dictionary-gathered strings."""
+    columns = dict(zip(FLOAT_FIELDS, numeric))
+    for name, col, entries in zip(STR_FIELDS, codes, dictionaries):
+        columns[name] = entries[col]
+    return columns
+
+
+def encode_batch(rows: list) -> bytes:
+    """Reference encoder, e.g. for gateways and load tests."""
+    n = len(rows)
+    numeric = np.array([[r[f] for f in FLOAT_FIELDS] for r in rows], dtype="<f8").reshape(n, len(FLOAT_FIELDS))
+    parts = [_HEADER.pack(MAGIC, n), numeric.T.tobytes()]
+    dict_parts = []
+    codes = np.empty((len(STR_FIELDS), n), dtype="<u4")
+    for j, name in enumerate(STR_FIELDS):
+        index = {}
+        for i, r in enumerate(rows):
+            codes[j, i] = index.setdefault(r[name], len(index))
+        dict_parts.append(_COUNT.pack(len(index)))
+        for value in index:
+            raw = value.encode("utf-8")
+            dict_parts.append(_LEN.pack(len(raw)) + raw)
+    parts.append(codes.tobytes())
+    return b"".join(parts + dict_parts)
@@ -0,0 +1,319 @@
+"""LLM backends for the /agent endpoint.
+
+Both backends expose ``generate_content(contents)`` returning an object
+shaped like a Vertex AI response: ``candidates[0].content.parts`` (each
+with ``function_call`` and/or ``text``), ``text`` and ``usage_metadata``.
+``GeminiBackend`` wraps Vertex AI; ``LocalBackend`` is a deterministic
+offline stand-in with configurable latency, for tests and load runs.
+"""
+import math
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+# Agent tools as plain JSON-schema declarations (backend independent)
+READING_PROPERTIES = {
+    "Pressure": {"type": "number"},
+    "Flow_Rate": {"type": "number"},
+    "Temperature": {"type": "number"},
+    "Vibration": {"type": "number"},
+    "RPM": {"type": "number"},
+    "Operational_Hours": {"type": "number"},
+    "Latitude": {"type": "number"},
+    "Longitude": {"type": "number"},
+    "Zone": {"type": "string"},
+    "Block": {"type": "string"},
+    "Pipe": {"type": "string"},
+    "Location_Code": {"type": "string"},
+}
+
+TOOL_SCHEMAS = [
+    # Tool 1: Predict leakage risk via Cloud Run
+    {
+        "name": "predict_leak_risk",
+        "description": (
+            "Call the LeakGuard Cloud Run API to predict leakage risk "
+            "for a given sensor reading."
+        ),
+        "parameters": {
+            "type": "object",
+            "properties": READING_PROPERTIES,
+            "required": list(READING_PROPERTIES),
+        },
+    },
+    # Tool 2: Summarize recent leakage stats from BigQuery
+    {
+        "name": "summarize_recent_leakage",
+        "description": (
+            "Summarize leakage statistics from the BigQuery predictions table "
+            "for a recent time window."
+        ),
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "hours": {
+                    "type": "integer",
+                    "description": "Look back this many hours, e.g. 24.",
+                    "default": 24,
+                },
+            },
+            "required": ["hours"],
+        },
+    },
+    # Tool 3: Find risky pipes near a location or another pipe
+    {
+        "name": "find_nearby_risky_pipes",
+        "description": (
+            "Find pipes near a point (Latitude/Longitude) or near a given "
+            "Zone/Block/Pipe, using the latest predicted risk of each pipe."
+        ),
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "Latitude": {"type": "number"},
+                "Longitude": {"type": "number"},
+                "Zone": {"type": "string"},
+                "Block": {"type": "string"},
+                "Pipe": {"type": "string"},
+                "radius_m": {
+                    "type": "number",
+                    "description": "Search radius in meters, e.g. 500.",
+                },
+                "k": {
+                    "type": "integer",
+                    "description": "Return the k nearest pipes instead of a radius search.",
+                },
+                "min_risk_level": {
+                    "type": "string",
+                    "enum": ["low", "medium", "high", "critical"],
+                },
+            },
+        },
+    },
+    # Tool 4: Drill down into Zone -> Block -> Pipe aggregates
+    {
+        "name": "drill_down_leakage",
+        "description": (
+            "Get live leakage aggregates (event counts, leak counts, max "
+            "probability, risk mix) for the whole network, a Zone, a Block "
+            "within a Zone, or a single Pipe, including its direct children."
+        ),
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "Zone": {"type": "string"},
+                "Block": {"type": "string"},
+                "Pipe": {"type": "string"},
+            },
+        },
+    },
+    # Tool 5: Leak probability quantiles per Zone
+    {
+        "name": "get_leak_probability_quantiles",
+        "description": (
+            "Get the median, 90th and 99th percentile of predicted leak "
+            "probability over the last N hours, for one Zone or broken down "
+            "by Zone. Use this for tail risk rather than averages."
+        ),
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "hours": {
+                    "type": "number",
+                    "description": "Look back this many hours, e.g. 24.",
+                    "default": 24,
+                },
+                "Zone": {"type": "string"},
+            },
+        },
+    },
+]
+
+
+class GeminiBackend:
+    """Gemini on Vertex AI; the SDK is imported and initialised on first use."""
+
+    def __init__(self, project: str, region: str, model_name: str, tool_schemas: list):
+        self.project = project
+        self.region = region
+        self.model_name = model_name
+        self.tool_schemas = tool_schemas
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        with self._lock:
+            if self._model is None:
+                import vertexai
+                from vertexai.generative_models import FunctionDeclaration, GenerativeModel, Tool
+
+                vertexai.init(project=self.project, location=self.region)
+                tools = [Tool(function_declarations=[FunctionDeclaration(**s) for s in self.tool_schemas])]
+                self._model = GenerativeModel(model_name=self.model_name, tools=tools)
+            return self._model
+
+    def generate_content(self, contents: list):
+        return self._get_model().generate_content(contents)
+
+
+class LatencyModel:
+    """Latency distribution parsed from a spec string (all values in ms).
+
+    ``fixed:300``, ``uniform:200,800``, ``normal:500,100`` or
+    ``lognormal:500,0.4`` (median and sigma of the log).
+    """
+
+    def __init__(self, spec: str):
+        kind, _, params = spec.partition(":")
+        self.kind = kind.strip().lower()
+        self.params = [float(p) for p in params.split(",") if p.strip()]
+        if self.kind not in ("fixed", "uniform", "normal", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {spec!r}")
+
+    def sample_ms(self, rng: random.Random) -> float:
+        p = self.params
+        if self.kind == "fixed":
+            return p[0] if p else 0.0
+        if self.kind == "uniform":
+            return rng.uniform(p[0], p[1])
+        if self.kind == "normal":
+            return max(0.0, rng.gauss(p[0], p[1]))
+        return p[0] * math.exp(rng.gauss(0.0, p[1]))
+
+
+_NUMBER = r"(-?\d+(?:\.\d+)?)"
+_HOURS = re.compile(_NUMBER + r"\s*(hour|hr|h\b|day|d\b|week)", re.I)
+# Training-set means of the numeric features, so unstated fields don't
+# push the reading out of distribution
+_DEFAULT_READING = {
+    "Pressure": 54.4,
+    "Flow_Rate": 88.6,
+    "Temperature": 99.9,
+    "Vibration": 3.0,
+    "RPM": 1992.0,
+    "Operational_Hours": 5529.0,
+    "Latitude": 25.18,
+    "Longitude": 55.25,
+    "Zone": "Zone_1",
+    "Block": "Block_1",
+    "Pipe": "Pipe_1",
+    "Location_Code": "Zone_1_Block_1_Pipe_1",
+}
+# "pressure 72", "flow rate: 300", "location code Zone_2_Block_1_Pipe_3";
+# Zone/Block/Pipe are recognised by their ids ("Zone_2"), also inside a
+# location code
+_FIELD_PATTERNS = [
+    (name, re.compile(
+        r"(?<![A-Za-z])(" + name + r"_\d+)(?!\d)" if name in ("Zone", "Block", "Pipe") else
+        r"\b" + name.replace("_", r"[\s_]?") + r"\b\s*(?:=|:|of|is)?\s*"
+        + (_NUMBER if isinstance(default, float) else r"([A-Za-z0-9_-]+)"),
+        re.I,
+    ))
+    for name, default in _DEFAULT_READING.items()
+]
+_LOCATION_CODE = re.compile(r"(Zone_\d+)_(Block_\d+)_(Pipe_\d+)$", re.I)
+
+
+def _part(function_call=None, text=None):
+    return SimpleNamespace(function_call=function_call, text=text)
+
+
+def _response(parts, prompt_chars, output_text):
+    return SimpleNamespace(
+        candidates=[SimpleNamespace(content=SimpleNamespace(parts=parts))],
+        text=output_text,
+        # Rough token estimate: ~4 characters per token
+        usage_metadata=SimpleNamespace(
+            prompt_token_count=max(1, prompt_chars // 4),
+            candidates_token_count=max(1, len(output_text) // 4),
+        ),
+    )
+
+
+class LocalBackend:
+    """Deterministic offline stand-in for Gemini.
+
+    Planning prompts that mention sensor readings call
+    ``predict_leak_risk`` (values parsed from the query, defaults for the
+    rest); percentile / tail questions call ``get_leak_probability_quantiles``
+    and anything else about recent activity, summaries or zones calls
+    ``summarize_recent_leakage`` (window parsed from "N hours/days");
+    other queries get a canned text answer. Explain prompts get a canned
+    explanation. Each call sleeps for a sample of the phase's latency
+    distribution, drawn from an RNG seeded with ``seed``.
+    """
+
+    SENSOR_WORDS = ("pressure", "flow", "temperature", "vibration", "rpm", "reading", "predict")
+    QUANTILE_WORDS = ("percentile", "quantile", "p90", "p99", "median", "tail")
+    SUMMARY_WORDS = ("summar", "recent", "last", "zone", "trend", "report", "hours", "today")
+
+    def __init__(self, plan_latency: str = "fixed:0", explain_latency: str = "fixed:0", seed: int = 0):
+        self.plan_latency = LatencyModel(plan_latency)
+        self.explain_latency = LatencyModel(explain_latency)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _sleep(self, latency: LatencyModel):
+        with self._lock:
+            ms = latency.sample_ms(self._rng)
+        if ms > 0:
+            time.sleep(ms / 1000)
+
+    def generate_content(self, contents: list):
+        texts = [c for c in contents if isinstance(c, str)]
+        prompt_chars = sum(len(t) for t in texts)
+        tool_line = next((t for t in texts if t.startswith("Tool ") and " returned: " in t), None)
+        if tool_line is not None:
+            self._sleep(self.explain_latency)
+            name = tool_line[5:].split(" ", 1)[0]
+            text = (
+                f"Based on {name}, the results above summarise the current leak risk. "
+                "Inspect the highest-risk pipes first and re-check their pressure and "
+                "vibration readings within the next shift."
+            )
+            return _response([_part(text=text)], prompt_chars, text)
+
+        self._sleep(self.plan_latency)
+        query = texts[-1] if texts else ""
+        lower = query.lower()
+        if any(w in lower for w in self.SENSOR_WORDS):
+            args = dict(_DEFAULT_READING)
+            found = set()
+            for name, pattern in _FIELD_PATTERNS:
+                m = pattern.search(query)
+                if m:
+                    args[name] = float(m.group(1)) if isinstance(args[name], float) else m.group(1)
+                    found.add(name)
+            code = _LOCATION_CODE.match(args["Location_Code"]) if "Location_Code" in found else None
+            if code:
+                # The code names the pipe; it wins over ids mentioned elsewhere
+                args["Zone"], args["Block"], args["Pipe"] = code.groups()
+            elif "Location_Code" not in found:
+                args["Location_Code"] = f"{args['Zone']}_{args['Block']}_{args['Pipe']}"
+            call = SimpleNamespace(name="predict_leak_risk", args=args)
+            return _response([_part(function_call=call)], prompt_chars, "")
+        if any(w in lower for w in self.QUANTILE_WORDS + self.SUMMARY_WORDS):
+            hours = 24
+            m = _HOURS.search(query)
+            if m:
+                unit = m.group(2).lower()
+                scale = 168 if unit.startswith("w") else 24 if unit.startswith("d") else 1
+                hours = max(1, int(float(m.group(1)) * scale))
+            if any(w in lower for w in self.QUANTILE_WORDS):
+                args = {"hours": hours}
+                zone = dict(_FIELD_PATTERNS)["Zone"].search(query)
+                if zone:
+                    args["Zone"] = zone.group(1)
+                call = SimpleNamespace(name="get_leak_probability_quantiles", args=args)
+            else:
+                call = SimpleNamespace(name="summarize_recent_leakage", args={"hours": hours})
+            return _response([_part(function_call=call)], prompt_chars, "")
+
+        text = (
+            "I can predict leak risk for a sensor reading or summarise recent "
+            "leakage activity. Ask about a reading or the last few hours."
+        )
+        return _response([_part(text=text)], prompt_chars, text)
+
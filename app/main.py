@@ -1,18 +1,36 @@
 import os
 import json
+import math
+import time
+import asyncio
 from datetime import datetime
+from typing import Literal, Optional
 import joblib
 import pandas as pd
 import requests
-from fastapi import FastAPI, Request
-from google.cloud import bigquery
-from app.schemas import Reading, PredictionOut
-import vertexai
-from vertexai.generative_models import (
-    GenerativeModel,
-    FunctionDeclaration,
-    Tool,
-    ToolConfig,
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from app.schemas import Reading, PredictionOut, BatchPredictionOut
+from app import dedup, drift, fastpath, ingest
+from app.admission import AdmissionController, Rejected
+from app.alerts import AlertEngine
+from app.gate import InferenceGate, NUMERIC_FEATURES
+from app.geo import GridIndex
+from app.hierarchy import AggregateTree
+from app.downsample import downsample
+from app.events import EventBroker
+from app.rollup import GRANULARITY_S, TimeRollup, TTLCache, to_epoch
+from app.sessions import SessionStore
+from app.agenttrace import AgentTrace, fit_to_budget
+from app.metrics import metrics
+from app.store import BigQueryStore, local_store
+from app.llm import GeminiBackend, LocalBackend, TOOL_SCHEMAS
+from app.explain import PipelineExplainer
+from app.quantiles import QuantileStore
+from app.tenants import (
+    ADMIN_KEY_HEADER, DEFAULT_TENANT, TENANT_HEADER, TENANT_KEY_HEADER, RateLimiter,
+    TenantRegistry, is_admin, jain_index, parse_keys, parse_limits, resolve_tenant,
 )
 
 # -------------------------------------------------------------------
@@ -21,101 +39,350 @@ from vertexai.generative_models import (
 MODEL_PATH = os.getenv("MODEL_PATH", "models/waterleak_best.pkl")
 PROJECT_ID = os.getenv("GCP_PROJECT", "weighty-stacker-472817-j1")
 VERTEX_REGION = os.getenv("VERTEX_REGION", "us-central1")
+
+# Agent LLM: "gemini" (Vertex AI) or "local" (offline deterministic stand-in
+# whose per-phase latency follows e.g. "fixed:300" or "lognormal:500,0.4")
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+GEMINI_MODEL_NAME = os.getenv("GEMINI_MODEL_NAME", "gemini-2.0-flash-001")
+LOCAL_LLM_PLAN_LATENCY = os.getenv("LOCAL_LLM_PLAN_LATENCY", "lognormal:400,0.3")
+LOCAL_LLM_EXPLAIN_LATENCY = os.getenv("LOCAL_LLM_EXPLAIN_LATENCY", "lognormal:900,0.3")
+LOCAL_LLM_SEED = int(os.getenv("LOCAL_LLM_SEED", "0"))
 PREDICT_URL = os.getenv(
     "PREDICT_URL",
     "https://leakguard-api-217279920936.asia-south1.run.app",
 )
 
+# Alert hysteresis: raise at/above ALERT_ENTER_PROB, clear below ALERT_EXIT_PROB
+ALERT_ENTER_PROB = float(os.getenv("ALERT_ENTER_PROB", "0.75"))
+ALERT_EXIT_PROB = float(os.getenv("ALERT_EXIT_PROB", "0.6"))
+ALERT_ENTER_DWELL_S = float(os.getenv("ALERT_ENTER_DWELL_S", "10"))
+ALERT_EXIT_DWELL_S = float(os.getenv("ALERT_EXIT_DWELL_S", "60"))
+ALERT_COOLDOWN_S = float(os.getenv("ALERT_COOLDOWN_S", "300"))
+ALERT_STREAM_SIZE = int(os.getenv("ALERT_STREAM_SIZE", "10000"))
+
+# Optional statistical pre-filter in front of the model (off by default)
+GATE_ENABLED = os.getenv("GATE_ENABLED", "0") == "1"
+GATE_Z_MAX = float(os.getenv("GATE_Z_MAX", "3.0"))
+GATE_WARMUP = int(os.getenv("GATE_WARMUP", "50"))
+GATE_ALPHA = float(os.getenv("GATE_ALPHA", "0.05"))
+GATE_AUDIT_RATE = float(os.getenv("GATE_AUDIT_RATE", "0.05"))
+
+# Duplicate suppression for retried readings: keyed by X-Reading-ID; with
+# DEDUP_CONTENT_HASH=1 also readings without one, by content (readings carry
+# no timestamp, so identical real readings within the window are dropped
+# too); keys are remembered for 1-2 windows
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "1") == "1"
+DEDUP_CONTENT_HASH = os.getenv("DEDUP_CONTENT_HASH", "0") == "1"
+DEDUP_WINDOW_S = float(os.getenv("DEDUP_WINDOW_S", "300"))
+DEDUP_CAPACITY = int(os.getenv("DEDUP_CAPACITY", "1000000"))
+DEDUP_ERROR_RATE = float(os.getenv("DEDUP_ERROR_RATE", "0.0001"))
+DEDUP_CACHE_SIZE = int(os.getenv("DEDUP_CACHE_SIZE", "10000"))
+
+# Input-drift monitor; the reference profile defaults to <model>.drift.json
+# (build it with tools/drift_profile.py, else it is derived from the model)
+DRIFT_ENABLED = os.getenv("DRIFT_ENABLED", "1") == "1"
+DRIFT_PROFILE_PATH = os.getenv("DRIFT_PROFILE_PATH", drift.profile_path(MODEL_PATH))
+DRIFT_WINDOW_S = float(os.getenv("DRIFT_WINDOW_S", "3600"))
+DRIFT_PSI_WARN = float(os.getenv("DRIFT_PSI_WARN", "0.1"))
+DRIFT_PSI_ALERT = float(os.getenv("DRIFT_PSI_ALERT", "0.25"))
+DRIFT_UNKNOWN_WARN = float(os.getenv("DRIFT_UNKNOWN_WARN", "0.01"))
+DRIFT_MIN_ROWS = int(os.getenv("DRIFT_MIN_ROWS", "200"))
+
+# Batch scoring limits
+BATCH_MAX_ROWS = int(os.getenv("BATCH_MAX_ROWS", "10000"))
+BQ_INSERT_CHUNK = int(os.getenv("BQ_INSERT_CHUNK", "500"))
+
+# Prediction log: "bigquery", or an embedded store for edge/offline use
+# ("local" picks DuckDB when installed, else SQLite; "duckdb"/"sqlite" force one)
+PREDICTION_STORE = os.getenv("PREDICTION_STORE", "bigquery")
+PREDICTION_STORE_PATH = os.getenv("PREDICTION_STORE_PATH", "data/predictions")
+
+# BigQuery layout (see app/warehouse.py and tools/migrate_warehouse.py)
+BQ_DATASET = os.getenv("BQ_DATASET", "leakguard_db")
+WAREHOUSE_MERGE_INTERVAL_S = float(os.getenv("WAREHOUSE_MERGE_INTERVAL_S", "300"))
+WAREHOUSE_MERGE_LOOKBACK_H = float(os.getenv("WAREHOUSE_MERGE_LOOKBACK_H", "24"))
+
+# Tenants (one per building): TENANT_KEYS='{"bldg-7": "<secret>"}' lists them;
+# requests send X-Tenant-ID plus that key as X-Tenant-Key (none: "default").
+# Live views are kept per tenant, dropped after TENANT_IDLE_TTL_S idle or
+# least recently used first past TENANT_MAX. Rate limits are requests/s per
+# tenant (0 = unlimited), overridable via TENANT_LIMITS='{"bldg-7": {"agent_rps": 1}}'
+TENANT_KEYS = parse_keys(os.getenv("TENANT_KEYS", ""))
+TENANT_MAX = int(os.getenv("TENANT_MAX", "1000"))
+TENANT_IDLE_TTL_S = float(os.getenv("TENANT_IDLE_TTL_S", "86400"))
+TENANT_PREDICT_RPS = float(os.getenv("TENANT_PREDICT_RPS", "0"))
+TENANT_AGENT_RPS = float(os.getenv("TENANT_AGENT_RPS", "0"))
+TENANT_BURST_S = float(os.getenv("TENANT_BURST_S", "2"))
+TENANT_LIMITS = parse_limits(os.getenv("TENANT_LIMITS", ""))
+# Key (sent as X-Admin-Key) for cross-tenant stats in GET /tenants and
+# /metrics; without it callers only see their own tenant's series
+TENANT_ADMIN_KEY = os.getenv("TENANT_ADMIN_KEY", "")
+
+# Admission control: per-endpoint in-flight/queue bounds; /agent is shed
+# once overall queue pressure reaches ADMIT_AGENT_SHED_AT, /predict only
+# when its own queue is full or the wait exceeds ADMIT_MAX_WAIT_S. One
+# tenant may hold at most the given shares of a class's slots and queue
+ADMIT_PREDICT_INFLIGHT = int(os.getenv("ADMIT_PREDICT_INFLIGHT", "32"))
+ADMIT_PREDICT_QUEUE = int(os.getenv("ADMIT_PREDICT_QUEUE", "256"))
+ADMIT_AGENT_INFLIGHT = int(os.getenv("ADMIT_AGENT_INFLIGHT", "4"))
+ADMIT_AGENT_QUEUE = int(os.getenv("ADMIT_AGENT_QUEUE", "16"))
+ADMIT_AGENT_SHED_AT = float(os.getenv("ADMIT_AGENT_SHED_AT", "0.5"))
+ADMIT_MAX_WAIT_S = float(os.getenv("ADMIT_MAX_WAIT_S", "2.0"))
+ADMIT_TENANT_INFLIGHT_SHARE = float(os.getenv("ADMIT_TENANT_INFLIGHT_SHARE", "1.0"))
+ADMIT_TENANT_QUEUE_SHARE = float(os.getenv("ADMIT_TENANT_QUEUE_SHARE", "0.5"))
+
+# Dashboard statistics rollup
+ROLLUP_MINUTE_RETENTION_H = float(os.getenv("ROLLUP_MINUTE_RETENTION_H", "48"))
+ROLLUP_HOUR_RETENTION_D = float(os.getenv("ROLLUP_HOUR_RETENTION_D", "400"))
+STATS_CACHE_TTL_S = float(os.getenv("STATS_CACHE_TTL_S", "5"))
+STATS_MAX_POINTS = int(os.getenv("STATS_MAX_POINTS", "5000"))
+
+# Per-Zone leakage_prob quantile sketches (t-digest per Zone and time bucket)
+QUANTILE_COMPRESSION = float(os.getenv("QUANTILE_COMPRESSION", "100"))
+QUANTILE_FINE_BUCKET_S = int(os.getenv("QUANTILE_FINE_BUCKET_S", "300"))
+QUANTILE_FINE_RETENTION_H = float(os.getenv("QUANTILE_FINE_RETENTION_H", "24"))
+QUANTILE_HOUR_RETENTION_D = float(os.getenv("QUANTILE_HOUR_RETENTION_D", "30"))
+
+# Live event stream (SSE) of predictions and alert transitions
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "1000"))
+STREAM_REPLAY_SIZE = int(os.getenv("STREAM_REPLAY_SIZE", "1000"))
+STREAM_HEARTBEAT_S = float(os.getenv("STREAM_HEARTBEAT_S", "15"))
+
+# Spatial index cell size for proximity queries
+GEO_CELL_M = float(os.getenv("GEO_CELL_M", "250"))
+
+# Agent sessions: recent turns kept verbatim, older ones compacted
+AGENT_SESSION_TURNS = int(os.getenv("AGENT_SESSION_TURNS", "6"))
+AGENT_SUMMARY_CHARS = int(os.getenv("AGENT_SUMMARY_CHARS", "1500"))
+AGENT_TURN_CHARS = int(os.getenv("AGENT_TURN_CHARS", "400"))
+AGENT_TOOL_CACHE_TTL_S = float(os.getenv("AGENT_TOOL_CACHE_TTL_S", "60"))
+AGENT_SESSION_TTL_S = float(os.getenv("AGENT_SESSION_TTL_S", "3600"))
+AGENT_MAX_SESSIONS = int(os.getenv("AGENT_MAX_SESSIONS", "1000"))
+
+# Agent prompt budget and instrumentation; prices only feed the cost estimate
+AGENT_TOOL_RESULT_MAX_BYTES = int(os.getenv("AGENT_TOOL_RESULT_MAX_BYTES", "8000"))
+AGENT_DEBUG = os.getenv("AGENT_DEBUG", "0") == "1"
+GEMINI_INPUT_USD_PER_1K = float(os.getenv("GEMINI_INPUT_USD_PER_1K", "0"))
+GEMINI_OUTPUT_USD_PER_1K = float(os.getenv("GEMINI_OUTPUT_USD_PER_1K", "0"))
+
 # -------------------------------------------------------------------
 # Load ML model
 # -------------------------------------------------------------------
 model = joblib.load(MODEL_PATH)
 
+# Gradient x input attributions (?explain=1); None if the pipeline shape is unsupported
+try:
+    explainer = PipelineExplainer(model)
+except (KeyError, ValueError):
+    explainer = None
+
 # -------------------------------------------------------------------
-# BigQuery client + table for logging
+# Inference gate (skips the model for readings inside a pipe's envelope)
 # -------------------------------------------------------------------
-bq_client = bigquery.Client(project=PROJECT_ID)
-BQ_TABLE_ID = f"{PROJECT_ID}.leakguard_db.predictions"
+gate = InferenceGate(
+    metrics,
+    z_max=GATE_Z_MAX,
+    warmup=GATE_WARMUP,
+    alpha=GATE_ALPHA,
+    audit_rate=GATE_AUDIT_RATE,
+) if GATE_ENABLED else None
 
 # -------------------------------------------------------------------
-# Vertex AI (Gemini) initialization
+# Duplicate suppression (rotating Bloom filter + LRU of recent results)
 # -------------------------------------------------------------------
-vertexai.init(project=PROJECT_ID, location=VERTEX_REGION)
-
-# Tool 1: Predict leakage risk via Cloud Run
-predict_leak_fn = FunctionDeclaration(
-    name="predict_leak_risk",
-    description=(
-        "Call the LeakGuard Cloud Run API to predict leakage risk "
-        "for a given sensor reading."
-    ),
-    parameters={
-        "type": "object",
-        "properties": {
-            "Pressure": {"type": "number"},
-            "Flow_Rate": {"type": "number"},
-            "Temperature": {"type": "number"},
-            "Vibration": {"type": "number"},
-            "RPM": {"type": "number"},
-            "Operational_Hours": {"type": "number"},
-            "Latitude": {"type": "number"},
-            "Longitude": {"type": "number"},
-            "Zone": {"type": "string"},
-            "Block": {"type": "string"},
-            "Pipe": {"type": "string"},
-            "Location_Code": {"type": "string"},
-        },
-        "required": [
-            "Pressure",
-            "Flow_Rate",
-            "Temperature",
-            "Vibration",
-            "RPM",
-            "Operational_Hours",
-            "Latitude",
-            "Longitude",
-            "Zone",
-            "Block",
-            "Pipe",
-            "Location_Code",
-        ],
-    },
-)
+duplicate_filter = dedup.DuplicateFilter(
+    capacity=DEDUP_CAPACITY,
+    error_rate=DEDUP_ERROR_RATE,
+    window_s=DEDUP_WINDOW_S,
+    cache_size=DEDUP_CACHE_SIZE,
+) if DEDUP_ENABLED else None
 
-# Tool 2: Summarize recent leakage stats from BigQuery
-leak_stats_fn = FunctionDeclaration(
-    name="summarize_recent_leakage",
-    description=(
-        "Summarize leakage statistics from the BigQuery predictions table "
-        "for a recent time window."
-    ),
-    parameters={
-        "type": "object",
-        "properties": {
-            "hours": {
-                "type": "integer",
-                "description": "Look back this many hours, e.g. 24.",
-                "default": 24,
-            },
-        },
-        "required": ["hours"],
-    },
+# -------------------------------------------------------------------
+# Input-drift monitor (live feature distributions vs. the training profile)
+# -------------------------------------------------------------------
+drift_monitor = drift.DriftMonitor(
+    drift.load_profile(DRIFT_PROFILE_PATH, model),
+    window_s=DRIFT_WINDOW_S,
+    psi_warn=DRIFT_PSI_WARN,
+    psi_alert=DRIFT_PSI_ALERT,
+    unknown_warn=DRIFT_UNKNOWN_WARN,
+    min_rows=DRIFT_MIN_ROWS,
+) if DRIFT_ENABLED else None
+
+# -------------------------------------------------------------------
+# Per-tenant live views (created on a tenant's first scored reading)
+# -------------------------------------------------------------------
+class TenantViews:
+    """One tenant's in-memory views of its scored readings.
+
+    ``alerts``: per-pipe hysteresis, transitions only; ``geo``: spatial
+    index over the latest risk per pipe; ``tree``: Zone -> Block -> Pipe
+    aggregates for drill-down; ``rollup``: time rollup backing the
+    dashboard /stats endpoints; ``quantiles``: leakage_prob t-digests.
+    """
+
+    def __init__(self):
+        self.alerts = AlertEngine(
+            enter_prob=ALERT_ENTER_PROB,
+            exit_prob=ALERT_EXIT_PROB,
+            enter_dwell_s=ALERT_ENTER_DWELL_S,
+            exit_dwell_s=ALERT_EXIT_DWELL_S,
+            cooldown_s=ALERT_COOLDOWN_S,
+            stream_size=ALERT_STREAM_SIZE,
+        )
+        self.geo = GridIndex(cell_m=GEO_CELL_M)
+        self.tree = AggregateTree()
+        self.rollup = TimeRollup(
+            minute_retention_s=ROLLUP_MINUTE_RETENTION_H * 3600,
+            hour_retention_s=ROLLUP_HOUR_RETENTION_D * 86400,
+        )
+        self.quantiles = QuantileStore(
+            compression=QUANTILE_COMPRESSION,
+            fine_s=QUANTILE_FINE_BUCKET_S,
+            fine_retention_s=QUANTILE_FINE_RETENTION_H * 3600,
+            hour_retention_s=QUANTILE_HOUR_RETENTION_D * 86400,
+        )
+
+
+tenant_views = TenantRegistry(TenantViews, max_tenants=TENANT_MAX, idle_ttl_s=TENANT_IDLE_TTL_S)
+# Read by queries for tenants with nothing recorded yet
+EMPTY_VIEWS = TenantViews()
+stats_cache = TTLCache(ttl_s=STATS_CACHE_TTL_S)
+
+
+def views_of(tenant: str) -> TenantViews:
+    return tenant_views.get(tenant, create=False) or EMPTY_VIEWS
+
+
+rate_limiter = RateLimiter(
+    {"predict": TENANT_PREDICT_RPS, "agent": TENANT_AGENT_RPS},
+    overrides=TENANT_LIMITS,
+    burst_s=TENANT_BURST_S,
 )
 
-tools = [
-    Tool(function_declarations=[predict_leak_fn, leak_stats_fn])
-]
+# -------------------------------------------------------------------
+# Live event broker feeding GET /stream
+# -------------------------------------------------------------------
+event_broker = EventBroker(metrics, queue_size=STREAM_QUEUE_SIZE, replay_size=STREAM_REPLAY_SIZE)
 
-gemini_model = GenerativeModel(
-    model_name="gemini-2.0-flash-001",
-    tools=tools,
+# -------------------------------------------------------------------
+# Server-side agent conversation sessions
+# -------------------------------------------------------------------
+agent_sessions = SessionStore(
+    window=AGENT_SESSION_TURNS,
+    summary_chars=AGENT_SUMMARY_CHARS,
+    turn_chars=AGENT_TURN_CHARS,
+    tool_ttl_s=AGENT_TOOL_CACHE_TTL_S,
+    ttl_s=AGENT_SESSION_TTL_S,
+    max_sessions=AGENT_MAX_SESSIONS,
 )
 
+# -------------------------------------------------------------------
+# Prediction store for logging and zone summaries
+# -------------------------------------------------------------------
+if PREDICTION_STORE == "bigquery":
+    prediction_store = BigQueryStore(
+        project=PROJECT_ID,
+        table_id=f"{PROJECT_ID}.{BQ_DATASET}.predictions",
+        rollup_table_id=f"{PROJECT_ID}.{BQ_DATASET}.predictions_zone_hourly",
+        chunk_size=BQ_INSERT_CHUNK,
+        merge_interval_s=WAREHOUSE_MERGE_INTERVAL_S,
+        lookback_s=WAREHOUSE_MERGE_LOOKBACK_H * 3600,
+    )
+elif PREDICTION_STORE in ("local", "duckdb", "sqlite"):
+    prediction_store = local_store(
+        PREDICTION_STORE_PATH,
+        engine=None if PREDICTION_STORE == "local" else PREDICTION_STORE,
+    )
+else:
+    raise ValueError(f"Unknown PREDICTION_STORE: {PREDICTION_STORE!r}")
+
+# -------------------------------------------------------------------
+# Agent LLM backend (tools are declared in app.llm.TOOL_SCHEMAS)
+# -------------------------------------------------------------------
+if LLM_BACKEND == "local":
+    gemini_model = LocalBackend(
+        plan_latency=LOCAL_LLM_PLAN_LATENCY,
+        explain_latency=LOCAL_LLM_EXPLAIN_LATENCY,
+        seed=LOCAL_LLM_SEED,
+    )
+elif LLM_BACKEND == "gemini":
+    gemini_model = GeminiBackend(
+        project=PROJECT_ID,
+        region=VERTEX_REGION,
+        model_name=GEMINI_MODEL_NAME,
+        tool_schemas=TOOL_SCHEMAS,
+    )
+else:
+    raise ValueError(f"Unknown LLM_BACKEND: {LLM_BACKEND!r}")
+
 # -------------------------------------------------------------------
 # FastAPI app
 # -------------------------------------------------------------------
 app = FastAPI(title="LeakGuard Water Leakage Detection API with Agent")
 
+admission = AdmissionController(metrics, max_wait_s=ADMIT_MAX_WAIT_S)
+TENANT_SHARES = {
+    "tenant_inflight_share": ADMIT_TENANT_INFLIGHT_SHARE,
+    "tenant_queue_share": ADMIT_TENANT_QUEUE_SHARE,
+}
+admission.add_class("predict", ADMIT_PREDICT_INFLIGHT, ADMIT_PREDICT_QUEUE, shed_at=1.0, **TENANT_SHARES)
+admission.add_class("agent", ADMIT_AGENT_INFLIGHT, ADMIT_AGENT_QUEUE, shed_at=ADMIT_AGENT_SHED_AT, **TENANT_SHARES)
+
+
+def admission_class(path: str) -> Optional[str]:
+    if path == "/predict" or path.startswith("/predict/"):
+        return "predict"
+    if path == "/agent":
+        return "agent"
+    return None
+
+
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    """Resolve the tenant, then apply its rate limit and admission quota.
+
+    Per-tenant latency (queueing included) is recorded as
+    ``tenant.<id>.<class>`` for GET /tenants.
+    """
+    try:
+        tenant = resolve_tenant(
+            request.headers.get(TENANT_HEADER), request.headers.get(TENANT_KEY_HEADER), TENANT_KEYS
+        )
+    except PermissionError as e:
+        return JSONResponse({"detail": str(e)}, status_code=403)
+    request.state.tenant = tenant
+    name = admission_class(request.url.path)
+    if name is None:
+        return await call_next(request)
+
+    prefix = f"tenant.{tenant}.{name}"
+    retry_after = rate_limiter.check(tenant, name)
+    if retry_after:
+        metrics.inc(f"{prefix}.rate_limited")
+        return JSONResponse(
+            {"detail": "Tenant rate limit exceeded, retry later."},
+            status_code=429,
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+    try:
+        waited = await admission.acquire(name, tenant)
+    except Rejected as e:
+        metrics.inc(f"{prefix}.rejected")
+        return JSONResponse(
+            {"detail": f"Server busy ({e.reason}), retry later."},
+            status_code=e.status_code,
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    start = time.perf_counter()
+    try:
+        return await call_next(request)
+    finally:
+        held = time.perf_counter() - start
+        admission.release(name, held, tenant)
+        metrics.inc(f"{prefix}.admitted")
+        metrics.observe_ms(prefix, (waited + held) * 1000)
+
 
 def risk_from_prob(p: float) -> str:
     if p < 0.25:
@@ -127,6 +394,10 @@ def risk_from_prob(p: float) -> str:
     return "critical"
 
 
+# Lowest probability that maps to each risk level
+RISK_MIN_PROB = {"low": 0.0, "medium": 0.25, "high": 0.5, "critical": 0.75}
+
+
 @app.get("/")
 def root():
     return {
@@ -135,45 +406,647 @@ def root():
     }
 
 
-@app.post("/predict", response_model=PredictionOut)
-def predict(request: Request, reading: Reading):
-
-    input_df = pd.DataFrame([{
-        "Pressure": reading.Pressure,
-        "Flow_Rate": reading.Flow_Rate,
-        "Temperature": reading.Temperature,
-        "Vibration": reading.Vibration,
-        "RPM": reading.RPM,
-        "Operational_Hours": reading.Operational_Hours,
-        "Latitude": reading.Latitude,
-        "Longitude": reading.Longitude,
-        "Zone": reading.Zone,
-        "Block": reading.Block,
-        "Pipe": reading.Pipe,
-        "Location_Code": reading.Location_Code,
-    }])
-
-    proba = model.predict_proba(input_df)[0][1]
-    label = int(proba >= 0.5)
-    risk = risk_from_prob(proba)
-
-    row = [{
-        "timestamp": datetime.utcnow().isoformat(),
-        **input_df.iloc[0].to_dict(),
-        "leakage_flag": label,
+def prediction_row(features: dict, proba: float, request_id: str, timestamp: str,
+                   tenant: str = DEFAULT_TENANT, gated: bool = False) -> dict:
+    """Log row for a scored reading.
+
+    A ``gated`` probability is the pipe's envelope estimate, not a model
+    score: the row is flagged and it stays out of the quantile sketches.
+    """
+    return {
+        "timestamp": timestamp,
+        **features,
+        "leakage_flag": int(proba >= 0.5),
+        "leakage_prob": proba,
+        "risk_level": risk_from_prob(proba),
+        "request_id": request_id,
+        "tenant_id": tenant,
+        "gated": gated,
+    }
+
+
+def record_predictions(rows: list, tenant: str = DEFAULT_TENANT):
+    """Fan logged rows out to their tenant's live views."""
+    views = tenant_views.get(tenant)
+    for row in rows:
+        pipe_key = (row["Zone"], row["Block"], row["Pipe"])
+        proba, label, risk = row["leakage_prob"], row["leakage_flag"], row["risk_level"]
+        alert = views.alerts.update(pipe_key, proba, risk)
+        if alert is not None:
+            event_broker.publish("alert", [alert], tenant)
+        views.geo.update(pipe_key, row["Latitude"], row["Longitude"], proba, risk)
+        views.tree.update(*pipe_key, proba, label, risk)
+        views.rollup.add(row, label, risk)
+        if not row["gated"]:
+            views.quantiles.add(row["Zone"], proba)
+
+
+LIVE_FIELDS = (
+    "timestamp", "Zone", "Block", "Pipe", "Location_Code",
+    "Pressure", "Flow_Rate", "Temperature",
+    "leakage_flag", "leakage_prob", "risk_level",
+)
+
+
+def publish_predictions(rows: list, tenant: str = DEFAULT_TENANT):
+    # Published even with no subscribers: the tenant's replay buffer must
+    # hold them for clients resuming with Last-Event-ID
+    event_broker.publish("prediction", [{k: r[k] for k in LIVE_FIELDS} for r in rows], tenant)
+
+
+def log_rows(rows: list):
+    prediction_store.append(rows)
+
+
+def score_reading(features: dict, request_id: str, explain: bool = False,
+                  dedup_key: Optional[bytes] = None, tenant: str = DEFAULT_TENANT,
+                  dry_run: bool = False) -> tuple:
+    """Score one validated reading, log it and update the live views.
+
+    With ``explain`` the gate is bypassed and the model is run through the
+    explainer, which returns the probability and per-feature attributions.
+    A reading whose ``dedup_key`` was seen recently gets the cached result
+    back (or is re-scored if it was evicted) and is not logged or counted
+    again. A ``dry_run`` is scored by the model alone and touches no state.
+    Returns ``(result, duplicate)``.
+    """
+    duplicate = dedup_key is not None and duplicate_filter.seen(dedup_key)
+    if duplicate:
+        metrics.inc("dedup.duplicates")
+        cached = duplicate_filter.cached(dedup_key)
+        if cached is None:
+            # A Bloom false positive or an evicted result; counted so a
+            # rate of dropped new readings is visible
+            metrics.inc("dedup.unconfirmed")
+        elif not explain or "attributions" in cached:
+            metrics.inc("dedup.cache_hits")
+            return cached, True
+
+    # A claimed key is only added once the reading is logged, so a failed
+    # attempt leaves its retry free to go through
+    claimed = dedup_key is not None and not duplicate
+    try:
+        pipe_key = (tenant, features["Zone"], features["Block"], features["Pipe"])
+        if drift_monitor is not None and not duplicate and not dry_run:
+            drift_monitor.observe(features)
+
+        use_gate = gate is not None and not explain and not duplicate and not dry_run
+        gated_prob = None
+        if use_gate:
+            numeric = [features[f] for f in NUMERIC_FEATURES]
+            gated_prob = gate.check(pipe_key, numeric)
+
+        attributions = None
+        gated = False
+        if explain:
+            proba, attributions = explainer.explain(pd.DataFrame([features]))
+            proba = proba[0]
+            metrics.inc("model.rows_scored")
+            metrics.inc("model.rows_explained")
+        elif gated_prob is not None and not gate.audit():
+            proba = gated_prob
+            gated = True
+        else:
+            proba = model.predict_proba(pd.DataFrame([features]))[0][1]
+            metrics.inc("model.rows_scored")
+            if use_gate:
+                gate.observe(pipe_key, numeric, float(proba), gated=gated_prob is not None)
+
+        if not duplicate and not dry_run:
+            rows = [prediction_row(
+                features, float(proba), request_id, datetime.utcnow().isoformat(), tenant, gated
+            )]
+            log_rows(rows)
+            record_predictions(rows, tenant)
+            publish_predictions(rows, tenant)
+    except Exception:
+        if claimed:
+            duplicate_filter.discard([dedup_key])
+        raise
+    if claimed:
+        duplicate_filter.add([dedup_key])
+
+    result = {
+        "leakage_flag": int(proba >= 0.5),
         "leakage_prob": float(proba),
-        "risk_level": risk,
-        "request_id": request.headers.get("X-Cloud-Trace-Context", "local"),
-    }]
-    bq_client.insert_rows_json(BQ_TABLE_ID, row)
-
-    return PredictionOut(
-        leakage_flag=label,
-        leakage_prob=float(proba),
-        risk_level=risk,
+        "risk_level": risk_from_prob(proba),
+    }
+    if gated:
+        result["gated"] = True
+    if attributions is not None:
+        result["attributions"] = explainer.as_dicts(attributions)[0]
+    if dedup_key is not None:
+        duplicate_filter.remember(dedup_key, result)
+    return result, duplicate
+
+
+def batch_duplicates(records: list, reading_id: Optional[str], tenant: str = DEFAULT_TENANT) -> tuple:
+    """Per-row duplicate flags and the keys claimed for the new rows.
+
+    Rows are keyed ``<reading_id>:<index>`` or by content. The claimed keys
+    go to ``duplicate_filter.add`` once the rows are logged, or to
+    ``discard`` if that fails.
+    """
+    if duplicate_filter is None or not (reading_id or DEDUP_CONTENT_HASH):
+        return [False] * len(records), []
+    if reading_id:
+        keys = [dedup.id_key(f"{reading_id}:{i}", tenant) for i in range(len(records))]
+    else:
+        keys = [dedup.reading_key(r, tenant) for r in records]
+    duplicates = duplicate_filter.seen_many(keys)
+    metrics.inc("dedup.duplicates", sum(duplicates))
+    return duplicates, [k for k, dup in zip(keys, duplicates) if not dup]
+
+
+def score_batch(columns, request_id: str, dry_run: bool = False, explain: bool = False,
+                reading_id: Optional[str] = None, tenant: str = DEFAULT_TENANT) -> tuple:
+    """Score a batch with one model call (no gating).
+
+    ``columns`` is anything pandas accepts (column dict or list of rows).
+    Dry runs (what-if sweeps) are neither logged nor fed to the live views,
+    and neither are rows seen recently (see ``batch_duplicates``); those are
+    still scored and returned. With ``explain`` the result also carries
+    per-feature attribution columns. Returns ``(result, duplicate_count)``.
+    """
+    df = pd.DataFrame(columns)
+    attributions = None
+    if not len(df):
+        proba = []
+    elif explain:
+        proba, attributions = explainer.explain(df)
+        metrics.inc("model.rows_explained", len(df))
+    else:
+        proba = model.predict_proba(df)[:, 1]
+    metrics.inc("model.rows_scored", len(df))
+    metrics.inc("model.batches_scored")
+
+    duplicates = 0
+    if not dry_run:
+        records = df.to_dict("records")
+        seen, claimed = batch_duplicates(records, reading_id, tenant)
+        duplicates = sum(seen)
+        try:
+            if drift_monitor is not None:
+                drift_monitor.observe_frame(df[[not d for d in seen]] if duplicates else df)
+            timestamp = datetime.utcnow().isoformat()
+            rows = [
+                prediction_row(features, float(p), request_id, timestamp, tenant)
+                for features, p, dup in zip(records, proba, seen)
+                if not dup
+            ]
+            log_rows(rows)
+            record_predictions(rows, tenant)
+            publish_predictions(rows, tenant)
+        except Exception:
+            if claimed:
+                duplicate_filter.discard(claimed)
+            raise
+        if claimed:
+            duplicate_filter.add(claimed)
+
+    result = {
+        "count": len(df),
+        "leakage_flag": [int(p >= 0.5) for p in proba],
+        "leakage_prob": [float(p) for p in proba],
+        "risk_level": [risk_from_prob(p) for p in proba],
+    }
+    if explain:
+        result["attributions"] = (
+            explainer.as_columns(attributions) if attributions is not None
+            else {f: [] for f in explainer.features}
+        )
+    return result, duplicates
+
+
+def require_explainer(explain: bool):
+    if explain and explainer is None:
+        raise HTTPException(status_code=400, detail="Attributions are not available for this model")
+
+
+def reading_dedup_key(request: Request, features: dict) -> Optional[bytes]:
+    """Idempotency key: the X-Reading-ID header, else (if enabled) the reading's content."""
+    if duplicate_filter is None:
+        return None
+    tenant = request.state.tenant
+    reading_id = request.headers.get("X-Reading-ID")
+    if reading_id:
+        return dedup.id_key(reading_id, tenant)
+    return dedup.reading_key(features, tenant) if DEDUP_CONTENT_HASH else None
+
+
+# Request/response bodies are decoded and encoded by app.fastpath (orjson +
+# a generated validator); the pydantic models only document the schema.
+READING_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": Reading.model_json_schema()}},
+    }
+}
+
+
+@app.post("/predict", response_model=PredictionOut, response_model_exclude_none=True,
+          openapi_extra=READING_BODY)
+async def predict(request: Request, explain: bool = False, dry_run: bool = False):
+    """Score one reading; ``?explain=1`` adds log-odds attributions per feature.
+
+    ``?dry_run=1`` scores it without logging it or updating any live view.
+    """
+    require_explainer(explain)
+    features = fastpath.decode_reading(await request.body())
+    result, duplicate = await run_in_threadpool(
+        score_reading,
+        features,
+        request.headers.get("X-Cloud-Trace-Context", "local"),
+        explain,
+        None if dry_run else reading_dedup_key(request, features),
+        request.state.tenant,
+        dry_run,
+    )
+    return Response(
+        fastpath.encode(result),
+        media_type="application/json",
+        headers={"X-Duplicate": "1"} if duplicate else None,
+    )
+
+
+BATCH_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": {
+            "type": "object",
+            "properties": {
+                "readings": {"type": "array", "items": Reading.model_json_schema()},
+                "dry_run": {"type": "boolean", "default": False},
+            },
+            "required": ["readings"],
+        }}},
+    }
+}
+
+
+@app.post("/predict/batch", response_model=BatchPredictionOut, response_model_exclude_none=True,
+          openapi_extra=BATCH_BODY)
+async def predict_batch(request: Request, explain: bool = False):
+    """Score many readings in one model call; ``dry_run`` skips logging."""
+    require_explainer(explain)
+    rows, dry_run = fastpath.decode_batch_readings(await request.body(), BATCH_MAX_ROWS)
+    result, duplicates = await run_in_threadpool(
+        score_batch,
+        rows,
+        request.headers.get("X-Cloud-Trace-Context", "local"),
+        dry_run,
+        explain,
+        request.headers.get("X-Reading-ID"),
+        request.state.tenant,
+    )
+    return Response(
+        fastpath.encode(result),
+        media_type="application/json",
+        headers={"X-Duplicates": str(duplicates)},
+    )
+
+
+@app.post(
+    "/predict/batch/binary",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {ingest.CONTENT_TYPE: {"schema": {"type": "string", "format": "binary"}}},
+        }
+    },
+)
+async def predict_batch_binary(request: Request, explain: bool = False):
+    """Score a packed LGB1 batch (see app/ingest.py for the layout)."""
+    require_explainer(explain)
+    try:
+        numeric, codes, dictionaries = ingest.decode_batch(
+            await request.body(), max_rows=BATCH_MAX_ROWS
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid batch: {e}")
+    result, duplicates = await run_in_threadpool(
+        score_batch,
+        ingest.batch_frame_columns(numeric, codes, dictionaries),
+        request.headers.get("X-Cloud-Trace-Context", "local"),
+        False,
+        explain,
+        request.headers.get("X-Reading-ID"),
+        request.state.tenant,
+    )
+    return Response(
+        fastpath.encode(result),
+        media_type="application/json",
+        headers={"X-Duplicates": str(duplicates)},
+    )
+
+
+@app.get("/alerts")
+def alerts(request: Request, since: int = 0, limit: int = 100):
+    events = views_of(request.state.tenant).alerts.events(since=since, limit=min(limit, 1000))
+    return {
+        "events": events,
+        "next_since": events[-1]["seq"] if events else since,
+    }
+
+
+@app.get("/alerts/active")
+def active_alerts(request: Request):
+    return {"active": views_of(request.state.tenant).alerts.active()}
+
+
+@app.get("/pipes/nearby")
+def nearby_pipes(
+    request: Request,
+    lat: Optional[float] = None,
+    lon: Optional[float] = None,
+    zone: Optional[str] = None,
+    block: Optional[str] = None,
+    pipe: Optional[str] = None,
+    radius_m: float = 500.0,
+    k: Optional[int] = None,
+    min_risk: str = "high",
+):
+    result = find_nearby_pipes({
+        "Latitude": lat,
+        "Longitude": lon,
+        "Zone": zone,
+        "Block": block,
+        "Pipe": pipe,
+        "radius_m": radius_m,
+        "k": k,
+        "min_risk_level": min_risk,
+    }, request.state.tenant)
+    if "error" in result:
+        raise HTTPException(status_code=400, detail=result["error"])
+    return result
+
+
+@app.get("/drilldown")
+def drilldown(
+    request: Request,
+    zone: Optional[str] = None,
+    block: Optional[str] = None,
+    pipe: Optional[str] = None,
+    children: bool = True,
+):
+    try:
+        node = views_of(request.state.tenant).tree.subtree(zone, block, pipe, children=children)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if node is None:
+        raise HTTPException(status_code=404, detail="No predictions recorded for this path")
+    return node
+
+
+def stats_window(start: Optional[datetime], end: Optional[datetime], granularity: str) -> tuple:
+    """Resolve a query window (default: last 7 days) and its granularity.
+
+    ``auto`` picks the finest granularity that is still retained and stays
+    within STATS_MAX_POINTS buckets.
+    """
+    end_ts = to_epoch(end) if end else time.time()
+    start_ts = to_epoch(start) if start else end_ts - 7 * 86400
+    if start_ts >= end_ts:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    span = end_ts - start_ts
+    if granularity == "auto":
+        granularity = "day"
+        for candidate in ("minute", "hour"):
+            if candidate == "minute" and time.time() - start_ts > ROLLUP_MINUTE_RETENTION_H * 3600:
+                continue
+            if span / GRANULARITY_S[candidate] <= STATS_MAX_POINTS:
+                granularity = candidate
+                break
+    if span / GRANULARITY_S[granularity] > STATS_MAX_POINTS:
+        raise HTTPException(status_code=400, detail="Range too long for this granularity")
+    # Results only change per bucket, so cache on whole minutes
+    return start_ts, end_ts, granularity, (granularity, int(start_ts // 60), int(end_ts // 60))
+
+
+@app.get("/stats/risk-distribution")
+def stats_risk_distribution(request: Request, start: Optional[datetime] = None, end: Optional[datetime] = None):
+    tenant = request.state.tenant
+    start_ts, end_ts, _, key = stats_window(start, end, "day")
+    return stats_cache.get_or_compute(
+        (tenant, "risk") + key, lambda: views_of(tenant).rollup.risk_distribution(start_ts, end_ts)
+    )
+
+
+@app.get("/stats/timeline")
+def stats_timeline(
+    request: Request,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    granularity: Literal["auto", "minute", "hour", "day"] = "day",
+    width: Optional[int] = None,
+    method: Literal["minmax", "lttb"] = "minmax",
+):
+    """Event counts over time, optionally downsampled to ``width`` pixels.
+
+    Downsampling keeps, per pixel bucket, the points picked by ``method`` and
+    the point with the most critical events, so critical spikes survive.
+    """
+    tenant = request.state.tenant
+    start_ts, end_ts, granularity, key = stats_window(start, end, granularity)
+    points = stats_cache.get_or_compute(
+        (tenant, "timeline") + key,
+        lambda: views_of(tenant).rollup.timeline(start_ts, end_ts, granularity),
+    )
+    total = len(points)
+    if width:
+        points = downsample(points, min(max(width, 10), 10000), method=method)
+    return {"granularity": granularity, "total_points": total, "points": points}
+
+
+@app.get("/stats/heatmap")
+def stats_heatmap(
+    request: Request,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    granularity: Literal["minute", "hour", "day"] = "day",
+    by: Literal["Zone", "Block", "Location_Code"] = "Location_Code",
+):
+    tenant = request.state.tenant
+    start_ts, end_ts, granularity, key = stats_window(start, end, granularity)
+    return stats_cache.get_or_compute(
+        (tenant, "heatmap", by) + key,
+        lambda: {"granularity": granularity, **views_of(tenant).rollup.heatmap(start_ts, end_ts, granularity, by)},
+    )
+
+
+def quantile_levels(q: Optional[str]) -> tuple:
+    try:
+        levels = tuple(float(v) for v in q.split(",")) if q else (0.5, 0.9, 0.99)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="q must be comma-separated numbers")
+    if not levels or any(not 0 <= v <= 1 for v in levels):
+        raise HTTPException(status_code=400, detail="q values must be between 0 and 1")
+    return levels
+
+
+@app.get("/stats/quantiles")
+def stats_quantiles(
+    request: Request,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    zone: Optional[str] = None,
+    q: Optional[str] = None,
+    by_zone: bool = False,
+):
+    """leakage_prob quantiles (default p50/p90/p99) over a window, default the last 24 hours.
+
+    The window is widened to whole sketch buckets.
+    """
+    levels = quantile_levels(q)
+    end_ts = to_epoch(end) if end else time.time()
+    start_ts = to_epoch(start) if start else end_ts - 86400
+    if start_ts >= end_ts:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    tenant = request.state.tenant
+    return stats_cache.get_or_compute(
+        (tenant, "quantiles", zone, levels, by_zone, int(start_ts // 60), int(end_ts // 60)),
+        lambda: views_of(tenant).quantiles.quantiles(start_ts, end_ts, levels, zone=zone, by_zone=by_zone),
+    )
+
+
+@app.get("/stats/quantiles/snapshot")
+def stats_quantiles_snapshot(request: Request, start: Optional[datetime] = None, end: Optional[datetime] = None):
+    """This worker's digests for the tenant, for POST /stats/quantiles/merge on another worker."""
+    return views_of(request.state.tenant).quantiles.snapshot(
+        to_epoch(start) if start else None,
+        to_epoch(end) if end else None,
+    )
+
+
+@app.post("/stats/quantiles/merge")
+async def stats_quantiles_merge(request: Request):
+    """Import another worker's snapshot for the tenant (replacing its previous one)."""
+    views = tenant_views.get(request.state.tenant)
+    try:
+        merged = views.quantiles.merge_snapshot(await request.json())
+    except (KeyError, TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid snapshot: {e}")
+    return {"merged": merged}
+
+
+@app.get("/stream")
+async def stream(request: Request, types: Optional[str] = None):
+    """Server-sent events for the tenant: ``prediction`` and ``alert`` (raise/clear transitions)."""
+    tenant = request.state.tenant
+    wanted = set(types.split(",")) if types else None
+    try:
+        last_id = int(request.headers.get("Last-Event-ID") or 0)
+    except ValueError:
+        last_id = 0
+    sub = event_broker.subscribe(wanted, last_id, tenant)
+
+    async def events():
+        try:
+            while True:
+                try:
+                    event_id, kind, payload = await asyncio.wait_for(
+                        sub.queue.get(), timeout=STREAM_HEARTBEAT_S
+                    )
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield b": keep-alive\n\n"
+                    continue
+                yield b"id: %d\nevent: %s\ndata: %s\n\n" % (
+                    event_id, kind.encode(), fastpath.encode(payload)
+                )
+        finally:
+            event_broker.unsubscribe(sub)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
+@app.get("/gate/stats")
+def gate_stats():
+    if gate is None:
+        return {"enabled": False}
+    return {"enabled": True, **gate.stats()}
+
+
+@app.get("/dedup/stats")
+def dedup_stats():
+    if duplicate_filter is None:
+        return {"enabled": False}
+    return {"enabled": True, **duplicate_filter.stats()}
+
+
+@app.get("/drift")
+def drift_report():
+    """PSI / KS per feature and unknown-category rates for recent traffic."""
+    if drift_monitor is None:
+        return {"enabled": False}
+    return {"enabled": True, **drift_monitor.report()}
+
+
+def is_admin_request(request: Request) -> bool:
+    return is_admin(request.headers.get(ADMIN_KEY_HEADER), TENANT_ADMIN_KEY)
+
+
+@app.get("/metrics")
+def get_metrics(request: Request):
+    """Process metrics; other tenants' ``tenant.*`` series need the admin key."""
+    snapshot = metrics.snapshot()
+    if not is_admin_request(request):
+        own = f"tenant.{request.state.tenant}."
+        for series in snapshot.values():
+            for name in [n for n in series if n.startswith("tenant.") and not n.startswith(own)]:
+                del series[name]
+    return {**snapshot, "admission": admission.stats()}
+
+
+@app.get("/tenants")
+def tenant_stats(request: Request):
+    """Per-tenant latency, outcomes, rate limits and admission state, plus fairness.
+
+    ``fairness`` has, per endpoint class, Jain's index over the tenants'
+    admitted request counts (1 = even) and the ratio between the worst
+    and best tenant p99 latency. Without the admin key only the caller's
+    own tenant is listed and ``fairness`` is null.
+    """
+    admin = is_admin_request(request)
+    snapshot = metrics.snapshot()
+    counters, latency = snapshot["counters"], snapshot["latency"]
+    tenants = {}
+    for tenant in tenant_views.tenants() if admin else [request.state.tenant]:
+        classes = {}
+        for name in admission.classes:
+            prefix = f"tenant.{tenant}.{name}"
+            classes[name] = {
+                "latency": latency.get(prefix),
+                "admitted": counters.get(f"{prefix}.admitted", 0),
+                "rate_limited": counters.get(f"{prefix}.rate_limited", 0),
+                "rejected": counters.get(f"{prefix}.rejected", 0),
+                "rps_limit": rate_limiter.rate(tenant, name) or None,
+            }
+        tenants[tenant] = {
+            "classes": classes,
+            "rate_limits": rate_limiter.stats(tenant),
+            "admission": admission.tenant_stats(tenant),
+        }
+
+    if not admin:
+        return {"count": len(tenants), "max_tenants": TENANT_MAX, "fairness": None, "tenants": tenants}
+    fairness = {}
+    for name in admission.classes:
+        served = [t["classes"][name] for t in tenants.values() if t["classes"][name]["admitted"]]
+        p99s = [c["latency"]["p99_ms"] for c in served if c["latency"]]
+        fairness[name] = {
+            "tenants": len(served),
+            "jain_admitted": jain_index([c["admitted"] for c in served]) if served else None,
+            "p99_spread": max(p99s) / max(min(p99s), 1e-9) if p99s else None,
+        }
+    return {"count": len(tenants), "max_tenants": TENANT_MAX, "fairness": fairness, "tenants": tenants}
+
+
 # -------------------------------------------------------------------
 # Tool execution helpers for the Agent
 # -------------------------------------------------------------------
@@ -191,51 +1064,105 @@ def tool_predict_leak_risk(args: dict) -> dict:
     except Exception as e:
         return {"error": str(e)}
 
-def tool_summarize_recent_leakage(args: dict) -> dict:
-    """Run a BigQuery aggregation over recent predictions."""
+def find_nearby_pipes(args: dict, tenant: str) -> dict:
+    """Radius or k-nearest search over the tenant's spatial index."""
+    geo = views_of(tenant).geo
+    min_risk = args.get("min_risk_level") or "high"
+    if min_risk not in RISK_MIN_PROB:
+        return {"error": f"Unknown risk level: {min_risk}"}
+    min_prob = RISK_MIN_PROB[min_risk]
+
+    lat, lon = args.get("Latitude"), args.get("Longitude")
+    exclude = None
+    if lat is None or lon is None:
+        key = (args.get("Zone"), args.get("Block"), args.get("Pipe"))
+        loc = geo.location(key)
+        if loc is None:
+            return {"error": "Provide Latitude/Longitude or a known Zone/Block/Pipe."}
+        lat, lon = loc
+        exclude = key
+
+    k = args.get("k")
+    if k:
+        pipes = geo.nearest(lat, lon, k=min(int(k), 100), min_prob=min_prob, exclude=exclude)
+        return {"Latitude": lat, "Longitude": lon, "k": int(k), "min_risk_level": min_risk, "pipes": pipes}
+
+    radius_m = float(args.get("radius_m") or 500.0)
+    pipes = geo.radius(lat, lon, radius_m, min_prob=min_prob, exclude=exclude)
+    return {"Latitude": lat, "Longitude": lon, "radius_m": radius_m, "min_risk_level": min_risk, "pipes": pipes}
+
+
+def tool_drill_down_leakage(args: dict, tenant: str) -> dict:
+    try:
+        node = views_of(tenant).tree.subtree(args.get("Zone"), args.get("Block"), args.get("Pipe"))
+    except ValueError as e:
+        return {"error": str(e)}
+    if node is None:
+        return {"error": "No predictions recorded for this Zone/Block/Pipe yet."}
+    return node
+
+
+def tool_summarize_recent_leakage(args: dict, tenant: str) -> dict:
+    """The tenant's top Zones by leak events over recent predictions."""
     hours = int(args.get("hours", 24))
-    query = f"""
-        SELECT
-          Zone,
-          COUNT(*) AS total_events,
-          SUM(CASE WHEN leakage_flag = 1 THEN 1 ELSE 0 END) AS leak_events,
-          AVG(leakage_prob) AS avg_leakage_prob
-        FROM `{BQ_TABLE_ID}`
-        WHERE timestamp >= TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL {hours} HOUR)
-        GROUP BY Zone
-        ORDER BY leak_events DESC, avg_leakage_prob DESC
-        LIMIT 10
-    """
-    job = bq_client.query(query)
-    rows = list(job.result())
-    zones = [
-        {
-            "Zone": r["Zone"],
-            "total_events": int(r["total_events"]),
-            "leak_events": int(r["leak_events"]),
-            "avg_leakage_prob": float(r["avg_leakage_prob"]),
-        }
-        for r in rows
-    ]
     return {
         "hours": hours,
-        "top_zones": zones,
+        "top_zones": prediction_store.zone_summary(hours, limit=10, tenant=tenant),
     }
 
 
+def tool_leak_probability_quantiles(args: dict, tenant: str) -> dict:
+    """Tail of the leak probability distribution, per Zone unless one is given."""
+    hours = float(args.get("hours", 24))
+    zone = args.get("Zone")
+    end = time.time()
+    result = views_of(tenant).quantiles.quantiles(end - hours * 3600, end, zone=zone, by_zone=zone is None)
+    return {"hours": hours, "Zone": zone, **result}
+
+
 # -------------------------------------------------------------------
 # Agent endpoint
 # -------------------------------------------------------------------
 
+def run_agent_tool(fn_name: str, fn_args: dict, tenant: str = DEFAULT_TENANT) -> dict:
+    """Run a tool; everything but predict_leak_risk reads only the tenant's data."""
+    if fn_name == "predict_leak_risk":
+        return tool_predict_leak_risk(fn_args)
+    elif fn_name == "summarize_recent_leakage":
+        return tool_summarize_recent_leakage(fn_args, tenant)
+    elif fn_name == "find_nearby_risky_pipes":
+        return find_nearby_pipes(fn_args, tenant)
+    elif fn_name == "drill_down_leakage":
+        return tool_drill_down_leakage(fn_args, tenant)
+    elif fn_name == "get_leak_probability_quantiles":
+        return tool_leak_probability_quantiles(fn_args, tenant)
+    return {"error": f"Unknown tool: {fn_name}"}
+
+
 @app.post("/agent")
-async def agent_endpoint(payload: dict):
+async def agent_endpoint(payload: dict, request: Request):
+    tenant = request.state.tenant
     try:
         user_query = payload.get("query", "")
         if not user_query:
             return {"answer": "Please provide a 'query' in request body."}
 
+        trace = AgentTrace(metrics, GEMINI_INPUT_USD_PER_1K, GEMINI_OUTPUT_USD_PER_1K)
+        want_debug = AGENT_DEBUG or bool(payload.get("debug"))
+
+        def reply(body: dict) -> dict:
+            debug = trace.finish()
+            if want_debug:
+                body["debug"] = debug
+            return body
+
+        # Follow-ups see a compact view of the conversation so far
+        session = agent_sessions.get(payload.get("session_id"), tenant)
+        history = agent_sessions.context(session)
+        preamble = [history] if history else []
+
         # First call: let Gemini decide the tool
-        response = gemini_model.generate_content([user_query])
+        response = await run_in_threadpool(trace.generate, gemini_model, preamble + [user_query], "plan")
 
 
         candidate = response.candidates[0]
@@ -250,44 +1177,56 @@ async def agent_endpoint(payload: dict):
 
         # If no tool needed → respond directly
         if not tool_call:
-            return {
-                "answer": natural_text.strip(),
-                "used_tool": None
-            }
+            answer = natural_text.strip()
+            agent_sessions.add_turn(session, user_query, answer)
+            return reply({
+                "answer": answer,
+                "used_tool": None,
+                "session_id": session.id,
+            })
 
         fn_name = tool_call.name
         fn_args = json.loads(tool_call.args) if isinstance(tool_call.args, str) else dict(tool_call.args)
 
-        # Execute tool
-        if fn_name == "predict_leak_risk":
-            tool_result = tool_predict_leak_risk(fn_args)
-
-        elif fn_name == "summarize_recent_leakage":
-            # Graceful fallback if no logs yet
-            result = tool_summarize_recent_leakage(fn_args)
-            if not result["top_zones"]:
-                return {
-                    "answer": "No leakage data logged yet — system healthy 👍",
-                    "used_tool": fn_name,
-                    "tool_result": result,
-                }
-            tool_result = result
+        # Execute tool, reusing a result computed earlier in this session
+        tool_result = agent_sessions.cached_tool(session, fn_name, fn_args)
+        tool_cached = tool_result is not None
+        with trace.tool(fn_name, cached=tool_cached):
+            if not tool_cached:
+                tool_result = await run_in_threadpool(run_agent_tool, fn_name, fn_args, tenant)
+                if "error" not in tool_result:
+                    agent_sessions.store_tool(session, fn_name, fn_args, tool_result)
 
-        else:
-            tool_result = {"error": f"Unknown tool: {fn_name}"}
+        # Graceful fallback if no logs yet
+        if fn_name == "summarize_recent_leakage" and tool_result.get("top_zones") == []:
+            answer = "No leakage data logged yet — system healthy 👍"
+            agent_sessions.add_turn(session, user_query, answer, fn_name)
+            return reply({
+                "answer": answer,
+                "used_tool": fn_name,
+                "tool_result": tool_result,
+                "session_id": session.id,
+            })
 
-        # Second pass: Gemini explains tool result
-        final = gemini_model.generate_content([
+        # Second pass: Gemini explains tool result (trimmed to the prompt budget)
+        result_text, trace.trimmed = fit_to_budget(tool_result, AGENT_TOOL_RESULT_MAX_BYTES)
+        if trace.trimmed:
+            result_text += " (truncated to fit the prompt budget)"
+        final = await run_in_threadpool(trace.generate, gemini_model, preamble + [
             f"User asked: {user_query}",
-            f"Tool {fn_name} returned: {json.dumps(tool_result)}",
+            f"Tool {fn_name} returned: {result_text}",
             "Explain clearly + provide actionable suggestions."
-        ])
+        ], "explain")
 
-        return {
-            "answer": final.text.strip(),
+        answer = final.text.strip()
+        agent_sessions.add_turn(session, user_query, answer, fn_name)
+        return reply({
+            "answer": answer,
             "used_tool": fn_name,
             "tool_result": tool_result,
-        }
+            "tool_cached": tool_cached,
+            "session_id": session.id,
+        })
 
     except Exception as e:
         return {"error": str(e)}
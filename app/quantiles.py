@@ -0,0 +1,236 @@
+"""Mergeable per-Zone quantile sketches of leakage_prob.
+
+Each (time bucket, Zone) pair holds a t-digest: centroids sized by the
+arcsine scale function, so they are tiny near 0 and 1 where the tail
+quantiles live and at most ``compression / 2 + 1`` remain after a
+compress. Digests from different buckets, Zones or workers merge by
+concatenating centroids and compressing again, which is what window
+queries do. Other workers' snapshots are kept apart from this worker's
+own digests and only merged in at query time.
+"""
+import math
+import threading
+import time
+import uuid
+
+import numpy as np
+
+# Inserts are buffered and folded in once the buffer holds this many
+# times ``compression`` values
+BUFFER_FACTOR = 5
+
+
+def quantile_key(q: float) -> str:
+    return f"p{q * 100:g}"
+
+
+class TDigest:
+    """Merging t-digest over numpy centroid arrays."""
+
+    __slots__ = ("compression", "means", "weights", "buffer", "min", "max")
+
+    def __init__(self, compression: float = 100.0):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.buffer = []
+        self.min = math.inf
+        self.max = -math.inf
+
+    @property
+    def count(self) -> float:
+        return float(self.weights.sum()) + len(self.buffer)
+
+    def add(self, value: float):
+        self.buffer.append(value)
+        if len(self.buffer) >= BUFFER_FACTOR * self.compression:
+            self.compress()
+
+    def add_many(self, values):
+        self.buffer.extend(values)
+        if len(self.buffer) >= BUFFER_FACTOR * self.compression:
+            self.compress()
+
+    def compress(self, others=()):
+        """Fold the buffer (and any ``others``) into at most ~compression/2 centroids."""
+        digests = [self, *others]
+        means = [d.means for d in digests] + [np.asarray(d.buffer, dtype=float) for d in digests]
+        weights = [d.weights for d in digests] + [np.ones(len(d.buffer)) for d in digests]
+        self.min = min(d.min if not d.buffer else min(d.min, min(d.buffer)) for d in digests)
+        self.max = max(d.max if not d.buffer else max(d.max, max(d.buffer)) for d in digests)
+        self.buffer = []
+        m, w = np.concatenate(means), np.concatenate(weights)
+        if not len(m):
+            return
+        order = np.argsort(m, kind="stable")
+        m, w = m[order], w[order]
+        q = (np.cumsum(w) - w / 2) / w.sum()
+        # k1 scale: unit-width k intervals map to narrow q ranges near 0 and 1
+        k = np.floor(self.compression / (2 * np.pi) * (np.arcsin(2 * q - 1) + np.pi / 2))
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(k)) + 1))
+        self.weights = np.add.reduceat(w, starts)
+        self.means = np.add.reduceat(m * w, starts) / self.weights
+
+    def merged(self, others) -> "TDigest":
+        """A new digest combining this one and ``others`` (all left unchanged)."""
+        out = TDigest(self.compression)
+        out.compress([self, *others])
+        return out
+
+    def quantile(self, q: float):
+        if self.buffer:
+            self.compress()
+        if not len(self.weights):
+            return None
+        total = self.weights.sum()
+        centers = np.cumsum(self.weights) - self.weights / 2
+        return float(np.interp(
+            q * total,
+            np.concatenate(([0.0], centers, [total])),
+            np.concatenate(([self.min], self.means, [self.max])),
+        ))
+
+    def to_dict(self) -> dict:
+        if self.buffer:
+            self.compress()
+        return {
+            "min": self.min if self.weights.size else None,
+            "max": self.max if self.weights.size else None,
+            "means": self.means.tolist(),
+            "weights": self.weights.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict, compression: float = 100.0) -> "TDigest":
+        digest = cls(compression)
+        digest.means = np.asarray(data["means"], dtype=float)
+        digest.weights = np.asarray(data["weights"], dtype=float)
+        if len(digest.means) != len(digest.weights):
+            raise ValueError("means and weights differ in length")
+        if digest.weights.size:
+            digest.min = float(data["min"])
+            digest.max = float(data["max"])
+        return digest
+
+
+class QuantileStore:
+    """t-digests of leakage_prob per Zone and time bucket, at two granularities.
+
+    Fine buckets (``fine_s``) are kept for ``fine_retention_s`` and hour
+    buckets for ``hour_retention_s``. A window query merges the digests of
+    every bucket overlapping it, from the finest level that still covers
+    the window start, so windows are effectively widened to bucket
+    boundaries. Digests imported from another worker (``merge_snapshot``)
+    are stored per ``source`` worker and bucket, each import replacing the
+    previous one, so repeated or two-way syncs never count data twice;
+    ``snapshot`` exports only this worker's own digests.
+    """
+
+    def __init__(
+        self,
+        compression: float = 100.0,
+        fine_s: int = 300,
+        fine_retention_s: float = 86400,
+        hour_retention_s: float = 30 * 86400,
+        source: str = None,
+    ):
+        self.compression = compression
+        self.source = source or uuid.uuid4().hex
+        self._retention = {fine_s: fine_retention_s, 3600: hour_retention_s}
+        self._levels = {fine_s: {}, 3600: {}}
+        self._imported = {}  # source -> {(bucket_s, bucket, Zone): TDigest}
+        self._lock = threading.Lock()
+
+    def _digest(self, size: int, bucket: int, zone: str, now: float) -> TDigest:
+        digests = self._levels[size]
+        digest = digests.get((bucket, zone))
+        if digest is None:
+            digest = digests[(bucket, zone)] = TDigest(self.compression)
+            cutoff = now - self._retention[size]
+            for key in [k for k in digests if k[0] + size <= cutoff]:
+                del digests[key]
+        return digest
+
+    def add(self, zone: str, prob: float, at: float = None):
+        at = time.time() if at is None else at
+        with self._lock:
+            for size in self._levels:
+                self._digest(size, int(at // size * size), zone, at).add(prob)
+
+    def _level(self, start: float) -> int:
+        now = time.time()
+        for size in sorted(self._levels):
+            if now - start <= self._retention[size]:
+                return size
+        return max(self._levels)
+
+    def _select(self, start: float, end: float, zone: str = None) -> dict:
+        """Zone -> digests of the buckets overlapping [start, end)."""
+        size = self._level(start)
+        candidates = list(self._levels[size].items())
+        for digests in self._imported.values():
+            candidates.extend(((b, z), d) for (s, b, z), d in digests.items() if s == size)
+        selected = {}
+        for (bucket, z), digest in candidates:
+            if bucket + size > start and bucket < end and (zone is None or z == zone):
+                selected.setdefault(z, []).append(digest)
+        return selected
+
+    def quantiles(self, start: float, end: float, qs=(0.5, 0.9, 0.99),
+                  zone: str = None, by_zone: bool = False) -> dict:
+        with self._lock:
+            selected = self._select(start, end, zone)
+            zones = {z: TDigest(self.compression).merged(ds) for z, ds in selected.items()}
+
+        def summary(digest: TDigest) -> dict:
+            return {"count": int(digest.count), **{quantile_key(q): digest.quantile(q) for q in qs}}
+
+        overall = TDigest(self.compression).merged(zones.values())
+        result = summary(overall)
+        if by_zone:
+            result["by_zone"] = {z: summary(d) for z, d in sorted(zones.items())}
+        return result
+
+    def snapshot(self, start: float = None, end: float = None) -> dict:
+        """This worker's own digests of both levels, for merging into another worker."""
+        with self._lock:
+            levels = []
+            for size, digests in self._levels.items():
+                levels.append({
+                    "bucket_s": size,
+                    "digests": [
+                        {"bucket": bucket, "Zone": zone, **digest.to_dict()}
+                        for (bucket, zone), digest in digests.items()
+                        if (start is None or bucket + size > start) and (end is None or bucket < end)
+                    ],
+                })
+        return {"source": self.source, "compression": self.compression, "levels": levels}
+
+    def merge_snapshot(self, snapshot: dict) -> int:
+        """Import another worker's snapshot; returns the number of digests stored.
+
+        Each digest replaces the one previously imported from the same
+        source for its bucket and Zone. Snapshots of this worker are ignored.
+        """
+        source = str(snapshot["source"])
+        if source == self.source:
+            return 0
+        incoming = []
+        for level in snapshot["levels"]:
+            size = int(level["bucket_s"])
+            if size not in self._levels:
+                raise ValueError(f"Unknown bucket size {size}s")
+            for d in level["digests"]:
+                incoming.append((size, int(d["bucket"]), str(d["Zone"]), TDigest.from_dict(d, self.compression)))
+        now = time.time()
+        with self._lock:
+            imported = self._imported.setdefault(source, {})
+            for key in [k for k in imported if k[1] + k[0] <= now - self._retention[k[0]]]:
+                del imported[key]
+            stored = 0
+            for size, bucket, zone, digest in incoming:
+                if bucket + size <= now - self._retention[size]:
+                    continue
+                imported[(size, bucket, zone)] = digest
+                stored += 1
+        return stored
@@ -0,0 +1,154 @@
+import threading
+import time
+from datetime import datetime, timezone
+
+RISK_LEVELS = ("low", "medium", "high", "critical")
+GROUP_DIMENSIONS = ("Zone", "Block", "Location_Code")
+GRANULARITY_S = {"minute": 60, "hour": 3600, "day": 86400}
+
+
+class Bucket:
+    """Counts for one time bucket: risk mix, leaks and per-group events."""
+
+    __slots__ = ("risk", "leaks", "groups")
+
+    def __init__(self):
+        self.risk = [0, 0, 0, 0]
+        self.leaks = 0
+        self.groups = {}
+
+
+def to_epoch(dt: datetime) -> float:
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def to_iso(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).isoformat()
+
+
+class TimeRollup:
+    """In-memory per-minute and per-hour rollup of predictions.
+
+    Minute buckets are kept for ``minute_retention_s`` and hour buckets for
+    ``hour_retention_s``; day granularity is derived from hours. Queries read
+    only the buckets in the requested range, so their cost is independent of
+    the number of events.
+    """
+
+    def __init__(self, minute_retention_s: float = 2 * 86400, hour_retention_s: float = 400 * 86400):
+        self.minute_retention_s = minute_retention_s
+        self.hour_retention_s = hour_retention_s
+        self._levels = {60: {}, 3600: {}}
+        self._risk_index = {r: i for i, r in enumerate(RISK_LEVELS)}
+        self._lock = threading.Lock()
+
+    def add(self, features: dict, flag: int, risk: str, at: float = None):
+        at = time.time() if at is None else at
+        risk_idx = self._risk_index[risk]
+        groups = [(dim, features[dim]) for dim in GROUP_DIMENSIONS]
+        with self._lock:
+            for size, buckets in self._levels.items():
+                key = int(at // size * size)
+                bucket = buckets.get(key)
+                if bucket is None:
+                    bucket = buckets[key] = Bucket()
+                    self._prune(size, buckets, at)
+                bucket.risk[risk_idx] += 1
+                bucket.leaks += flag
+                for g in groups:
+                    bucket.groups[g] = bucket.groups.get(g, 0) + 1
+
+    def _prune(self, size, buckets, now):
+        # Buckets are created in (roughly) time order, so the oldest come first
+        retention = self.minute_retention_s if size == 60 else self.hour_retention_s
+        cutoff = now - retention
+        while buckets:
+            oldest = next(iter(buckets))
+            if oldest >= cutoff:
+                break
+            del buckets[oldest]
+
+    def _buckets(self, start: float, end: float, size: int):
+        buckets = self._levels[size]
+        lo = int(start // size * size)
+        if (end - lo) / size < len(buckets):
+            return [(k, buckets[k]) for k in range(lo, int(end) + 1, size) if k in buckets]
+        return sorted((k, b) for k, b in buckets.items() if lo <= k <= end)
+
+    def risk_distribution(self, start: float, end: float) -> dict:
+        totals = [0, 0, 0, 0]
+        leaks = 0
+        with self._lock:
+            # Minute buckets give exact range edges while they are retained
+            size = 60 if time.time() - start <= self.minute_retention_s else 3600
+            for _, b in self._buckets(start, end, size):
+                for i, c in enumerate(b.risk):
+                    totals[i] += c
+                leaks += b.leaks
+        return {"risk_counts": dict(zip(RISK_LEVELS, totals)), "total_events": sum(totals), "leak_events": leaks}
+
+    def timeline(self, start: float, end: float, granularity: str) -> list:
+        step = GRANULARITY_S[granularity]
+        series = {}
+        with self._lock:
+            for key, b in self._buckets(start, end, 60 if granularity == "minute" else 3600):
+                t = int(key // step * step)
+                row = series.get(t)
+                if row is None:
+                    row = series[t] = [0, 0, 0, 0, 0]
+                for i, c in enumerate(b.risk):
+                    row[i] += c
+                row[4] += b.leaks
+        points = []
+        for t in range(int(start // step * step), int(end) + 1, step):
+            row = series.get(t, (0, 0, 0, 0, 0))
+            points.append({
+                "t": to_iso(t),
+                "events": sum(row[:4]),
+                "leak_events": row[4],
+                **dict(zip(RISK_LEVELS, row[:4])),
+            })
+        return points
+
+    def heatmap(self, start: float, end: float, granularity: str, by: str) -> dict:
+        step = GRANULARITY_S[granularity]
+        cells = {}
+        with self._lock:
+            for key, b in self._buckets(start, end, 60 if granularity == "minute" else 3600):
+                t = int(key // step * step)
+                for (dim, value), c in b.groups.items():
+                    if dim == by:
+                        cells[(value, t)] = cells.get((value, t), 0) + c
+        rows = sorted({v for v, _ in cells})
+        columns = list(range(int(start // step * step), int(end) + 1, step))
+        return {
+            "by": by,
+            "rows": rows,
+            "columns": [to_iso(t) for t in columns],
+            "z": [[cells.get((r, t), 0) for t in columns] for r in rows],
+        }
+
+
+class TTLCache:
+    """Tiny time-bounded cache for query results."""
+
+    def __init__(self, ttl_s: float = 5.0, max_entries: int = 256):
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        now = time.monotonic()
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is not None and now - hit[0] < self.ttl_s:
+                return hit[1]
+        value = compute()
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[key] = (now, value)
+        return value
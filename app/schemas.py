@@ -1,7 +1,9 @@
-from pydantic import BaseModel
-from typing import Literal
+from pydantic import BaseModel, ConfigDict
+from typing import Dict, List, Literal, Optional
 
 class Reading(BaseModel):
+    model_config = ConfigDict(allow_inf_nan=False)
+
     Pressure: float
     Flow_Rate: float
     Temperature: float
@@ -18,4 +20,14 @@ class Reading(BaseModel):
 class PredictionOut(BaseModel):
     leakage_flag: int
     leakage_prob: float
-    risk_level: Literal["low", "medium", "high", "critical"]
\ No newline at end of file
+    risk_level: Literal["low", "medium", "high", "critical"]
+    # True when the gate answered from the pipe's envelope without the model
+    gated: Optional[bool] = None
+    attributions: Optional[Dict[str, float]] = None
+
+class BatchPredictionOut(BaseModel):
+    count: int
+    leakage_flag: List[int]
+    leakage_prob: List[float]
+    risk_level: List[Literal["low", "medium", "high", "critical"]]
+    attributions: Optional[Dict[str, List[float]]] = None
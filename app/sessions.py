@@ -0,0 +1,136 @@
+import json
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def first_sentence(text: str, max_chars: int) -> str:
+    """Leading sentence of ``text``, cut to ``max_chars``."""
+    text = " ".join((text or "").split())
+    head = _SENTENCE_END.split(text, 1)[0]
+    return head if len(head) <= max_chars else head[: max_chars - 1] + "…"
+
+
+def tool_key(name: str, args: dict) -> str:
+    return name + ":" + json.dumps(args, sort_keys=True, default=str)
+
+
+class Turn:
+    __slots__ = ("query", "answer", "tool", "at")
+
+    def __init__(self, query, answer, tool, at):
+        self.query = query
+        self.answer = answer
+        self.tool = tool
+        self.at = at
+
+
+class AgentSession:
+    """One conversation: recent turns, a running summary and cached tool results."""
+
+    def __init__(self, session_id: str, tenant: str = "default"):
+        self.id = session_id
+        self.tenant = tenant
+        self.turns = deque()
+        self.summary = []
+        self.tools = {}
+        self.last_used = time.time()
+
+
+class SessionStore:
+    """Bounded in-memory agent sessions.
+
+    Only the last ``window`` turns are kept verbatim. Older turns are
+    compacted into an extractive summary (the question plus the first
+    sentence of the answer) capped at ``summary_chars``, dropping the
+    oldest lines first. Tool results are reused within a session for
+    ``tool_ttl_s``. Idle sessions expire after ``ttl_s`` and at most
+    ``max_sessions`` are kept (least recently used evicted). Sessions
+    belong to a tenant: the same ID from another tenant is a different
+    session.
+    """
+
+    def __init__(self, window: int = 6, summary_chars: int = 1500, turn_chars: int = 400,
+                 tool_ttl_s: float = 60.0, ttl_s: float = 3600.0, max_sessions: int = 1000):
+        self.window = window
+        self.summary_chars = summary_chars
+        self.turn_chars = turn_chars
+        self.tool_ttl_s = tool_ttl_s
+        self.ttl_s = ttl_s
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str = None, tenant: str = "default") -> AgentSession:
+        """Return the tenant's session ``session_id``, starting a new one if unknown or expired."""
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            session = self._sessions.get((tenant, session_id)) if session_id else None
+            if session is None:
+                session = AgentSession(session_id or uuid.uuid4().hex, tenant)
+                self._sessions[(tenant, session.id)] = session
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            self._sessions.move_to_end((tenant, session.id))
+            session.last_used = now
+            return session
+
+    def _expire(self, now):
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if now - oldest.last_used < self.ttl_s:
+                break
+            del self._sessions[(oldest.tenant, oldest.id)]
+
+    def add_turn(self, session: AgentSession, query: str, answer: str, tool: str = None):
+        with self._lock:
+            session.turns.append(Turn(query, answer, tool, time.time()))
+            while len(session.turns) > self.window:
+                self._compact(session, session.turns.popleft())
+
+    def _compact(self, session, turn):
+        line = f"- Q: {first_sentence(turn.query, 160)}"
+        if turn.tool:
+            line += f" [{turn.tool}]"
+        line += f" A: {first_sentence(turn.answer, 200)}"
+        session.summary.append(line)
+        while session.summary and sum(len(s) + 1 for s in session.summary) > self.summary_chars:
+            session.summary.pop(0)
+
+    def context(self, session: AgentSession) -> str:
+        """Prompt prefix with the summary and recent turns ('' for a new session)."""
+        with self._lock:
+            parts = []
+            if session.summary:
+                parts.append("Earlier in this conversation:\n" + "\n".join(session.summary))
+            if session.turns:
+                recent = []
+                for t in session.turns:
+                    answer = t.answer
+                    if len(answer) > self.turn_chars:
+                        answer = answer[: self.turn_chars - 1] + "…"
+                    recent.append(f"User: {t.query}\nAssistant: {answer}")
+                parts.append("Recent turns:\n" + "\n".join(recent))
+        return "\n\n".join(parts)
+
+    def cached_tool(self, session: AgentSession, name: str, args: dict):
+        with self._lock:
+            hit = session.tools.get(tool_key(name, args))
+        if hit is not None and time.time() - hit[0] < self.tool_ttl_s:
+            return hit[1]
+        return None
+
+    def store_tool(self, session: AgentSession, name: str, args: dict, result):
+        now = time.time()
+        with self._lock:
+            for key in [k for k, (at, _) in session.tools.items() if now - at >= self.tool_ttl_s]:
+                del session.tools[key]
+            session.tools[tool_key(name, args)] = (now, result)
+
+    def __len__(self):
+        return len(self._sessions)
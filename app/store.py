@@ -0,0 +1,340 @@
+import logging
+import os
+from abc import ABC, abstractmethod
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+from app import warehouse
+from app.rollup import to_epoch
+from app.tenants import DEFAULT_TENANT
+
+try:
+    import duckdb
+except ImportError:  # optional: the local store falls back to SQLite
+    duckdb = None
+
+logger = logging.getLogger(__name__)
+
+# Column order of the local predictions table
+FEATURE_COLUMNS = (
+    "Pressure", "Flow_Rate", "Temperature", "Vibration", "RPM",
+    "Operational_Hours", "Latitude", "Longitude",
+    "Zone", "Block", "Pipe", "Location_Code",
+)
+COLUMNS = ("ts", "timestamp") + FEATURE_COLUMNS + (
+    "leakage_flag", "leakage_prob", "risk_level", "request_id", "tenant_id", "gated",
+)
+COLUMN_TYPES = {
+    "ts": "DOUBLE", "timestamp": "TEXT",
+    "Zone": "TEXT", "Block": "TEXT", "Pipe": "TEXT", "Location_Code": "TEXT",
+    "leakage_flag": "INTEGER", "leakage_prob": "DOUBLE",
+    "risk_level": "TEXT", "request_id": "TEXT", "tenant_id": "TEXT", "gated": "INTEGER",
+}
+
+
+class PredictionStore(ABC):
+    """Where prediction rows are logged and zone summaries are read from.
+
+    ``append`` takes the log rows built by ``prediction_row``;
+    ``zone_summary`` returns one tenant's top Zones by leak events over
+    the last ``hours``, as dicts with Zone, total_events, leak_events and
+    avg_leakage_prob.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def append(self, rows: list):
+        ...
+
+    @abstractmethod
+    def zone_summary(self, hours: int, limit: int = 10, tenant: str = DEFAULT_TENANT) -> list:
+        ...
+
+    @abstractmethod
+    def rows(self, start: float = None, end: float = None, tenant: str = None):
+        """Yield logged rows (timestamp, features, leakage_prob, tenant_id, gated) in time order.
+
+        All tenants' rows unless ``tenant`` is given.
+        """
+
+
+REPLAY_COLUMNS = ("timestamp",) + FEATURE_COLUMNS + ("leakage_prob", "tenant_id", "gated")
+
+
+def _summary_row(zone, total, leaks, avg_prob) -> dict:
+    return {
+        "Zone": zone,
+        "total_events": int(total),
+        "leak_events": int(leaks or 0),
+        "avg_leakage_prob": float(avg_prob or 0.0),
+    }
+
+
+class BigQueryStore(PredictionStore):
+    """Streaming inserts into the managed BigQuery layout (app.warehouse).
+
+    Rows go to the partitioned ``table_id`` in chunks of ``chunk_size``.
+    Summaries read the hourly ``rollup_table_id``, which is merged from
+    the recent partitions at most every ``merge_interval_s``; each merge
+    recomputes the hours since the previous one, plus ``late_s`` for
+    late rows (``lookback_s`` on the first merge).
+    """
+
+    name = "bigquery"
+
+    def __init__(self, project: str, table_id: str, rollup_table_id: str, chunk_size: int = 500,
+                 merge_interval_s: float = 300, lookback_s: float = 86400, late_s: float = 3600,
+                 client=None):
+        from google.cloud import bigquery
+
+        self.bigquery = bigquery
+        self.client = client or warehouse.make_client(project)
+        self.table_id = table_id
+        self.rollup_table_id = rollup_table_id
+        self.chunk_size = chunk_size
+        self.merge_interval_s = merge_interval_s
+        self.lookback_s = lookback_s
+        self.late_s = late_s
+        self._merged_at = None
+        self._attempted_at = None
+        self._merge_lock = threading.Lock()
+
+    def append(self, rows: list):
+        """Stream rows in; RuntimeError if BigQuery rejects any of them.
+
+        Rejections come back per row rather than as an exception, e.g. for
+        the tenant_id/gated columns on a table that was not migrated.
+        """
+        rejected = []
+        for i in range(0, len(rows), self.chunk_size):
+            errors = self.client.insert_rows_json(self.table_id, rows[i:i + self.chunk_size])
+            rejected += [{**e, "index": i + e.get("index", 0)} for e in errors or ()]
+        if rejected:
+            logger.error("%s rejected %d of %d rows: %s", self.table_id, len(rejected), len(rows),
+                         rejected[0].get("errors"))
+            raise RuntimeError(f"BigQuery rejected {len(rejected)} of {len(rows)} rows for {self.table_id}")
+
+    def _query(self, sql: str, **params):
+        types = {datetime: "TIMESTAMP", int: "INT64", str: "STRING"}
+        config = self.bigquery.QueryJobConfig(query_parameters=[
+            self.bigquery.ScalarQueryParameter(k, types[type(v)], v) for k, v in params.items()
+        ])
+        return self.client.query(sql, job_config=config).result()
+
+    def merge_rollup(self, since: datetime):
+        """Recompute rollup rows for the hours from ``since`` onwards."""
+        self._query(warehouse.merge_sql(self.table_id, self.rollup_table_id), since=since)
+
+    def refresh_rollup(self):
+        now = time.time()
+        if self._attempted_at is not None and now - self._attempted_at < self.merge_interval_s:
+            return
+        # One merge at a time; concurrent callers read the current rollup
+        if not self._merge_lock.acquire(blocking=False):
+            return
+        try:
+            self._attempted_at = now
+            since = now - self.lookback_s if self._merged_at is None else self._merged_at - self.late_s
+            self.merge_rollup(datetime.fromtimestamp(since, tz=timezone.utc))
+            self._merged_at = now
+        except Exception:
+            # A slightly stale rollup beats a failed summary; the next merge
+            # after merge_interval_s starts from the last successful one
+            logger.exception("rollup merge into %s failed", self.rollup_table_id)
+        finally:
+            self._merge_lock.release()
+
+    def rows(self, start: float = None, end: float = None, tenant: str = None):
+        params = {
+            "start": datetime.fromtimestamp(start or 0, tz=timezone.utc),
+            "end": datetime.fromtimestamp(end or time.time(), tz=timezone.utc),
+        }
+        if tenant is not None:
+            params["tenant"] = tenant
+        sql = f"""
+            SELECT {", ".join(REPLAY_COLUMNS)}
+            FROM `{self.table_id}`
+            WHERE timestamp BETWEEN @start AND @end
+              {"AND tenant_id = @tenant" if tenant is not None else ""}
+            ORDER BY timestamp
+        """
+        for r in self._query(sql, **params):
+            row = dict(r.items())
+            row["timestamp"] = row["timestamp"].replace(tzinfo=None).isoformat()
+            yield row
+
+    def zone_summary(self, hours: int, limit: int = 10, tenant: str = DEFAULT_TENANT) -> list:
+        self.refresh_rollup()
+        rows = self._query(
+            warehouse.summary_sql(self.rollup_table_id), hours=int(hours), limit=int(limit), tenant=tenant
+        )
+        return [
+            _summary_row(r["Zone"], r["total_events"], r["leak_events"], r["avg_leakage_prob"])
+            for r in rows
+        ]
+
+
+class LocalStore(PredictionStore):
+    """Embedded SQL store (SQLite here, DuckDB in the subclass).
+
+    Rows carry an epoch ``ts`` column next to the ISO ``timestamp``. Like
+    the BigQuery layout, a per-hour, per-tenant, per-Zone ``zone_hourly``
+    rollup is kept, upserted in the same transaction as each append, and
+    summaries read only the rollup rows of their tenant and window. One
+    connection is shared behind a lock.
+    """
+
+    name = "sqlite"
+    SUMMARY_SQL = """
+        SELECT
+          Zone,
+          SUM(total_events) AS total_events,
+          SUM(leak_events) AS leak_events,
+          SUM(prob_sum) / SUM(total_events) AS avg_leakage_prob
+        FROM zone_hourly
+        WHERE tenant_id = ? AND hour >= ?
+        GROUP BY Zone
+        ORDER BY leak_events DESC, avg_leakage_prob DESC
+        LIMIT ?
+    """
+    UPSERT_SQL = """
+        INSERT INTO zone_hourly VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (tenant_id, hour, Zone) DO UPDATE SET
+          total_events = total_events + excluded.total_events,
+          leak_events = leak_events + excluded.leak_events,
+          prob_sum = prob_sum + excluded.prob_sum
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = self._connect()
+        columns = ", ".join(f"{c} {COLUMN_TYPES.get(c, 'DOUBLE')}" for c in COLUMNS)
+        with self._lock:
+            self.conn.execute(f"CREATE TABLE IF NOT EXISTS predictions ({columns})")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS predictions_ts ON predictions (ts)")
+            # Stores created before tenants existed: their rows belong to the
+            # default tenant, and the rollup is rebuilt with a tenant key
+            if "tenant_id" not in self._columns("predictions"):
+                self.conn.execute(
+                    f"ALTER TABLE predictions ADD COLUMN tenant_id TEXT DEFAULT '{DEFAULT_TENANT}'"
+                )
+                self.conn.execute("DROP TABLE IF EXISTS zone_hourly")
+            # ... and before gated rows were flagged
+            if "gated" not in self._columns("predictions"):
+                self.conn.execute("ALTER TABLE predictions ADD COLUMN gated INTEGER DEFAULT 0")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS zone_hourly (hour DOUBLE, tenant_id TEXT, Zone TEXT, "
+                "total_events INTEGER, leak_events INTEGER, prob_sum DOUBLE, "
+                "PRIMARY KEY (tenant_id, hour, Zone))"
+            )
+            # Stores created before the rollup existed are backfilled once
+            if not self.conn.execute("SELECT COUNT(*) FROM zone_hourly").fetchone()[0]:
+                history = self.conn.execute(
+                    "SELECT ts, tenant_id, Zone, leakage_flag, leakage_prob FROM predictions"
+                ).fetchall()
+                self._upsert_rollup(history)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _columns(self, table: str) -> list:
+        return [d[0] for d in self.conn.execute(f"SELECT * FROM {table} LIMIT 0").description]
+
+    @staticmethod
+    def _tuples(rows: list) -> list:
+        out = []
+        for r in rows:
+            ts = to_epoch(datetime.fromisoformat(r["timestamp"]))
+            out.append((ts,) + tuple(r[c] for c in COLUMNS[1:-1]) + (int(r.get("gated", False)),))
+        return out
+
+    def _upsert_rollup(self, values):
+        """Fold (ts, tenant_id, Zone, flag, prob) tuples into zone_hourly."""
+        cells = {}
+        for ts, tenant, zone, flag, prob in values:
+            key = (ts // 3600 * 3600, tenant or DEFAULT_TENANT, zone)
+            cell = cells.get(key)
+            if cell is None:
+                cell = cells[key] = [0, 0, 0.0]
+            cell[0] += 1
+            cell[1] += flag
+            cell[2] += prob
+        if cells:
+            self.conn.executemany(self.UPSERT_SQL, [(*k, *c) for k, c in cells.items()])
+
+    def _rollup_values(self, values):
+        tenant, zone = COLUMNS.index("tenant_id"), COLUMNS.index("Zone")
+        flag, prob = COLUMNS.index("leakage_flag"), COLUMNS.index("leakage_prob")
+        return [(v[0], v[tenant], v[zone], v[flag], v[prob]) for v in values]
+
+    def _insert(self, values):
+        placeholders = ", ".join("?" for _ in COLUMNS)
+        self.conn.executemany(f"INSERT INTO predictions VALUES ({placeholders})", values)
+
+    def append(self, rows: list):
+        if not rows:
+            return
+        values = self._tuples(rows)
+        with self._lock:
+            self.conn.execute("BEGIN")
+            try:
+                self._insert(values)
+                self._upsert_rollup(self._rollup_values(values))
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+
+    def rows(self, start: float = None, end: float = None, tenant: str = None):
+        sql = f"SELECT {', '.join(REPLAY_COLUMNS)} FROM predictions WHERE ts >= ? AND ts <= ?"
+        params = (start or 0, end or time.time())
+        if tenant is not None:
+            sql += " AND tenant_id = ?"
+            params += (tenant,)
+        with self._lock:
+            fetched = self.conn.execute(sql + " ORDER BY ts", params).fetchall()
+        for values in fetched:
+            yield dict(zip(REPLAY_COLUMNS, values))
+
+    def zone_summary(self, hours: int, limit: int = 10, tenant: str = DEFAULT_TENANT) -> list:
+        since = (time.time() - int(hours) * 3600) // 3600 * 3600
+        with self._lock:
+            rows = self.conn.execute(self.SUMMARY_SQL, (tenant, since, int(limit))).fetchall()
+        return [_summary_row(*r) for r in rows]
+
+
+class DuckDBStore(LocalStore):
+    """Columnar embedded store; batches are appended as DataFrames."""
+
+    name = "duckdb"
+
+    def _connect(self):
+        return duckdb.connect(self.path)
+
+    def _insert(self, values):
+        import pandas as pd
+
+        self.conn.append("predictions", pd.DataFrame(values, columns=COLUMNS))
+
+
+def local_store(path: str, engine: str = None) -> LocalStore:
+    """Open the embedded store at ``path`` (extension set by the engine).
+
+    ``engine`` is "duckdb" or "sqlite"; by default DuckDB is used when it
+    is installed.
+    """
+    engine = engine or ("duckdb" if duckdb is not None else "sqlite")
+    if engine == "duckdb" and duckdb is None:
+        raise RuntimeError("PREDICTION_STORE=duckdb requires the duckdb package")
+    if path != ":memory:":
+        path = os.path.splitext(path)[0] + (".duckdb" if engine == "duckdb" else ".sqlite")
+    return DuckDBStore(path) if engine == "duckdb" else LocalStore(path)
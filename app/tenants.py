@@ -0,0 +1,184 @@
+"""Tenant authentication, per-tenant rate limits and per-tenant live state.
+
+Every request belongs to a tenant (one customer building). A request
+names its tenant in ``X-Tenant-ID`` and proves it with that tenant's key
+in ``X-Tenant-Key``; only tenants configured with a key exist. Requests
+without a tenant belong to ``default``, which is also the tenant of rows
+logged before tenants existed. Cross-tenant statistics need the operator's
+admin key in ``X-Admin-Key``.
+"""
+import hmac
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_TENANT = "default"
+TENANT_HEADER = "X-Tenant-ID"
+TENANT_KEY_HEADER = "X-Tenant-Key"
+ADMIN_KEY_HEADER = "X-Admin-Key"
+_TENANT_ID = re.compile(r"[A-Za-z0-9][A-Za-z0-9_.-]{0,63}")
+
+
+def parse_keys(spec: str) -> dict:
+    """Tenant keys, e.g. ``{"bldg-7": "<secret>"}``."""
+    if not spec:
+        return {}
+    keys = json.loads(spec)
+    if not isinstance(keys, dict):
+        raise ValueError("TENANT_KEYS must map tenant IDs to keys")
+    for tenant, key in keys.items():
+        if not _TENANT_ID.fullmatch(tenant) or tenant == DEFAULT_TENANT:
+            raise ValueError(f"Invalid tenant ID in TENANT_KEYS: {tenant!r}")
+        if not isinstance(key, str) or not key:
+            raise ValueError(f"TENANT_KEYS[{tenant!r}] must be a non-empty string")
+    return keys
+
+
+def resolve_tenant(tenant: str, key: str, keys: dict) -> str:
+    """The tenant a request is authenticated as.
+
+    No tenant (or ``default``) needs no key; any other tenant must be in
+    ``keys`` with a matching key, else PermissionError.
+    """
+    if not tenant or tenant == DEFAULT_TENANT:
+        return DEFAULT_TENANT
+    expected = keys.get(tenant)
+    if expected is None or not key or not hmac.compare_digest(expected.encode(), key.encode()):
+        raise PermissionError("Unknown tenant or invalid tenant key")
+    return tenant
+
+
+def is_admin(key: str, admin_key: str) -> bool:
+    """Whether ``key`` is the admin key (never, if none is configured)."""
+    return bool(admin_key) and bool(key) and hmac.compare_digest(admin_key.encode(), key.encode())
+
+
+def parse_limits(spec: str) -> dict:
+    """Per-tenant overrides, e.g. ``{"bldg-7": {"predict_rps": 50, "agent_rps": 1}}``."""
+    if not spec:
+        return {}
+    limits = json.loads(spec)
+    if not isinstance(limits, dict) or not all(isinstance(v, dict) for v in limits.values()):
+        raise ValueError("TENANT_LIMITS must map tenant IDs to objects")
+    return limits
+
+
+class TenantRegistry:
+    """Per-tenant state, created by ``factory`` on first use.
+
+    State idle for ``idle_ttl_s`` is dropped, and past ``max_tenants`` the
+    least recently used tenant's is, so memory stays bounded. A tenant
+    whose state was dropped starts again from empty live views; its
+    history stays in the prediction store.
+    """
+
+    def __init__(self, factory, max_tenants: int = 1000, idle_ttl_s: float = 86400.0,
+                 clock=time.monotonic):
+        self.factory = factory
+        self.max_tenants = max_tenants
+        self.idle_ttl_s = idle_ttl_s
+        self.clock = clock
+        self._states = OrderedDict()  # tenant -> [state, last_used], LRU first
+        self._lock = threading.Lock()
+
+    def get(self, tenant: str, create: bool = True):
+        now = self.clock()
+        with self._lock:
+            entry = self._states.get(tenant)
+            if entry is not None:
+                entry[1] = now
+                self._states.move_to_end(tenant)
+                return entry[0]
+            if not create:
+                return None
+            self._expire(now)
+            while len(self._states) >= self.max_tenants:
+                self._states.popitem(last=False)
+            state = self.factory()
+            self._states[tenant] = [state, now]
+            return state
+
+    def _expire(self, now: float):
+        while self._states:
+            tenant, (_, last_used) = next(iter(self._states.items()))
+            if now - last_used < self.idle_ttl_s:
+                break
+            del self._states[tenant]
+
+    def tenants(self) -> list:
+        with self._lock:
+            self._expire(self.clock())
+            return sorted(self._states)
+
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, now: float, cost: float = 1.0) -> float:
+        """Spend ``cost`` tokens; return 0 if allowed, else seconds until it would be."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """Token-bucket request rate limit per (tenant, endpoint class).
+
+    ``rates`` maps an endpoint class to its default requests per second
+    (0 or missing means unlimited); ``overrides`` maps a tenant to
+    ``{"<class>_rps": rate}``. Buckets hold ``burst_s`` seconds of tokens.
+    """
+
+    def __init__(self, rates: dict, overrides: dict = None, burst_s: float = 2.0, clock=time.monotonic):
+        self.rates = rates
+        self.overrides = overrides or {}
+        self.burst_s = burst_s
+        self.clock = clock
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def rate(self, tenant: str, name: str) -> float:
+        return float(self.overrides.get(tenant, {}).get(f"{name}_rps", self.rates.get(name, 0)))
+
+    def check(self, tenant: str, name: str) -> float:
+        """0 when the request may proceed, else the suggested Retry-After in seconds."""
+        rate = self.rate(tenant, name)
+        if rate <= 0:
+            return 0.0
+        now = self.clock()
+        with self._lock:
+            bucket = self._buckets.get((tenant, name))
+            if bucket is None:
+                burst = max(1.0, rate * self.burst_s)
+                bucket = self._buckets[(tenant, name)] = TokenBucket(rate, burst, now)
+            return bucket.take(now)
+
+    def stats(self, tenant: str) -> dict:
+        with self._lock:
+            return {
+                name: {
+                    "rps": bucket.rate,
+                    "burst": bucket.burst,
+                    "tokens": min(bucket.burst, bucket.tokens + (self.clock() - bucket.updated) * bucket.rate),
+                }
+                for (t, name), bucket in self._buckets.items()
+                if t == tenant
+            }
+
+
+def jain_index(values: list) -> float:
+    """Jain's fairness index: 1 when all values are equal, 1/n when one takes all."""
+    total = sum(values)
+    squares = sum(v * v for v in values)
+    return total * total / (len(values) * squares) if squares else 1.0
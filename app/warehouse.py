@@ -0,0 +1,144 @@
+"""BigQuery warehouse layout for prediction logs.
+
+``predictions`` is typed, partitioned by day on ``timestamp`` and
+clustered by tenant and Zone. ``predictions_zone_hourly`` holds per-hour,
+per-tenant, per-Zone counts and is kept current with an idempotent MERGE
+that recomputes only the recent hours, so both the merge and the
+summaries that read the rollup scan bytes proportional to their window
+(and, through the clustering, mostly their tenant's blocks).
+"""
+import os
+
+from app.tenants import DEFAULT_TENANT
+
+PREDICTIONS_SCHEMA = (
+    ("timestamp", "TIMESTAMP", "REQUIRED"),
+    ("Pressure", "FLOAT64", "NULLABLE"),
+    ("Flow_Rate", "FLOAT64", "NULLABLE"),
+    ("Temperature", "FLOAT64", "NULLABLE"),
+    ("Vibration", "FLOAT64", "NULLABLE"),
+    ("RPM", "FLOAT64", "NULLABLE"),
+    ("Operational_Hours", "FLOAT64", "NULLABLE"),
+    ("Latitude", "FLOAT64", "NULLABLE"),
+    ("Longitude", "FLOAT64", "NULLABLE"),
+    ("Zone", "STRING", "NULLABLE"),
+    ("Block", "STRING", "NULLABLE"),
+    ("Pipe", "STRING", "NULLABLE"),
+    ("Location_Code", "STRING", "NULLABLE"),
+    ("leakage_flag", "INT64", "NULLABLE"),
+    ("leakage_prob", "FLOAT64", "NULLABLE"),
+    ("risk_level", "STRING", "NULLABLE"),
+    ("request_id", "STRING", "NULLABLE"),
+    ("tenant_id", "STRING", "NULLABLE"),
+    ("gated", "BOOL", "NULLABLE"),
+)
+
+# Values for columns that tables from before them lack
+LEGACY_DEFAULTS = {"tenant_id": f"'{DEFAULT_TENANT}'", "gated": "FALSE"}
+
+ROLLUP_SCHEMA = (
+    ("hour", "TIMESTAMP", "REQUIRED"),
+    ("tenant_id", "STRING", "NULLABLE"),
+    ("Zone", "STRING", "NULLABLE"),
+    ("total_events", "INT64", "NULLABLE"),
+    ("leak_events", "INT64", "NULLABLE"),
+    ("prob_sum", "FLOAT64", "NULLABLE"),
+)
+
+
+def make_client(project: str):
+    """BigQuery client, or an emulator client when BIGQUERY_EMULATOR_HOST is set."""
+    from google.cloud import bigquery
+
+    host = os.getenv("BIGQUERY_EMULATOR_HOST")
+    if not host:
+        return bigquery.Client(project=project)
+    from google.api_core.client_options import ClientOptions
+    from google.auth.credentials import AnonymousCredentials
+
+    return bigquery.Client(
+        project=project,
+        client_options=ClientOptions(api_endpoint=f"http://{host}"),
+        credentials=AnonymousCredentials(),
+    )
+
+
+def _columns(schema) -> str:
+    return ",\n  ".join(
+        f"{name} {type_}" + (" NOT NULL" if mode == "REQUIRED" else "")
+        for name, type_, mode in schema
+    )
+
+
+def predictions_ddl(table_id: str) -> str:
+    return f"""CREATE TABLE IF NOT EXISTS `{table_id}` (
+  {_columns(PREDICTIONS_SCHEMA)}
+)
+PARTITION BY DATE(timestamp)
+CLUSTER BY tenant_id, Zone"""
+
+
+def rollup_ddl(table_id: str) -> str:
+    return f"""CREATE TABLE IF NOT EXISTS `{table_id}` (
+  {_columns(ROLLUP_SCHEMA)}
+)
+PARTITION BY DATE(hour)
+CLUSTER BY tenant_id, Zone"""
+
+
+def rebuild_sql(source_id: str, target_id: str) -> str:
+    """Copy a legacy (untyped, unpartitioned or pre-tenant) table into the managed layout.
+
+    Legacy tables predate tenants and gating, so their rows go to the
+    default tenant and are not gated.
+    """
+    casts = ",\n  ".join(
+        f"{LEGACY_DEFAULTS[name]} AS {name}" if name in LEGACY_DEFAULTS
+        else f"SAFE_CAST({name} AS {type_}) AS {name}"
+        for name, type_, _ in PREDICTIONS_SCHEMA
+    )
+    return f"""INSERT INTO `{target_id}`
+SELECT
+  {casts}
+FROM `{source_id}`
+WHERE SAFE_CAST(timestamp AS TIMESTAMP) IS NOT NULL"""
+
+
+def merge_sql(predictions_id: str, rollup_id: str) -> str:
+    """Recompute rollup rows for hours at or after ``@since`` (idempotent)."""
+    return f"""MERGE `{rollup_id}` AS t
+USING (
+  SELECT
+    TIMESTAMP_TRUNC(timestamp, HOUR) AS hour,
+    IFNULL(tenant_id, '{DEFAULT_TENANT}') AS tenant_id,
+    Zone,
+    COUNT(*) AS total_events,
+    COUNTIF(leakage_flag = 1) AS leak_events,
+    SUM(leakage_prob) AS prob_sum
+  FROM `{predictions_id}`
+  WHERE timestamp >= TIMESTAMP_TRUNC(@since, HOUR)
+  GROUP BY hour, tenant_id, Zone
+) AS s
+ON t.hour = s.hour AND t.tenant_id = s.tenant_id AND t.Zone = s.Zone
+  AND t.hour >= TIMESTAMP_TRUNC(@since, HOUR)
+WHEN MATCHED THEN UPDATE SET
+  total_events = s.total_events,
+  leak_events = s.leak_events,
+  prob_sum = s.prob_sum
+WHEN NOT MATCHED THEN INSERT (hour, tenant_id, Zone, total_events, leak_events, prob_sum)
+  VALUES (s.hour, s.tenant_id, s.Zone, s.total_events, s.leak_events, s.prob_sum)"""
+
+
+def summary_sql(rollup_id: str) -> str:
+    """A tenant's top Zones over the hours overlapping the last ``@hours`` hours."""
+    return f"""SELECT
+  Zone,
+  SUM(total_events) AS total_events,
+  SUM(leak_events) AS leak_events,
+  SAFE_DIVIDE(SUM(prob_sum), SUM(total_events)) AS avg_leakage_prob
+FROM `{rollup_id}`
+WHERE tenant_id = @tenant
+  AND hour >= TIMESTAMP_TRUNC(TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL @hours HOUR), HOUR)
+GROUP BY Zone
+ORDER BY leak_events DESC, avg_leakage_prob DESC
+LIMIT @limit"""
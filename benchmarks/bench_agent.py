@@ -0,0 +1,100 @@
+"""Load benchmark: /agent throughput and tail latency with the local LLM.
+
+Runs the app in-process (httpx ASGI transport) with ``LLM_BACKEND=local``
+and an in-memory sqlite prediction store so no Vertex AI or BigQuery calls
+are made, or against a running server with
+``--url``. A fixed mix of queries is sent by ``--concurrency`` closed-loop
+workers. Each request asks for the debug block, so the time spent outside
+the model (tools, sessions, serialization, queueing) is reported next to
+end-to-end latency.
+
+    python -m benchmarks.bench_agent --requests 500 --concurrency 16 \\
+        --plan-latency lognormal:400,0.3 --explain-latency lognormal:900,0.3
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import httpx
+
+QUERIES = [
+    "Predict leak risk for pressure 72 and vibration 6.5 in Zone_2",
+    "Summarize leakage over the last 24 hours",
+    "Which zones had the most leaks in the last 3 days?",
+    "Is a reading with temperature 140 and flow rate 300 risky?",
+    "What can you do?",
+]
+
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def worker(client, url, queue, results):
+    while True:
+        try:
+            i = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+        body = {"query": QUERIES[i % len(QUERIES)], "debug": True}
+        start = time.perf_counter()
+        resp = await client.post(url, json=body)
+        ms = (time.perf_counter() - start) * 1000
+        data = resp.json() if resp.status_code == 200 else {}
+        model_ms = data.get("debug", {}).get("model_ms", 0.0)
+        results.append((resp.status_code, ms, ms - model_ms))
+
+
+async def run(args):
+    if args.url:
+        client = httpx.AsyncClient(timeout=120)
+        url = args.url.rstrip("/") + "/agent"
+    else:
+        os.environ["LLM_BACKEND"] = "local"
+        # Keep benchmark predictions out of the configured prediction log
+        os.environ["PREDICTION_STORE"] = "sqlite"
+        os.environ["PREDICTION_STORE_PATH"] = ":memory:"
+        os.environ["LOCAL_LLM_PLAN_LATENCY"] = args.plan_latency
+        os.environ["LOCAL_LLM_EXPLAIN_LATENCY"] = args.explain_latency
+        from app.main import app
+
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), timeout=120)
+        url = "http://bench/agent"
+
+    queue = asyncio.Queue()
+    for i in range(args.requests):
+        queue.put_nowait(i)
+    results = []
+    start = time.perf_counter()
+    async with client:
+        await asyncio.gather(*(worker(client, url, queue, results) for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+
+    ok = [r for r in results if r[0] == 200]
+    print(f"requests: {len(results)}  ok: {len(ok)}  rejected/failed: {len(results) - len(ok)}")
+    print(f"throughput: {len(results) / elapsed:.1f} req/s over {elapsed:.1f}s")
+    if ok:
+        for label, idx in (("end-to-end", 1), ("outside model", 2)):
+            values = [r[idx] for r in ok]
+            print(
+                f"{label:>13}: mean {statistics.mean(values):8.1f} ms  "
+                f"p50 {percentile(values, 0.5):8.1f}  p90 {percentile(values, 0.9):8.1f}  "
+                f"p99 {percentile(values, 0.99):8.1f}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--plan-latency", default="lognormal:400,0.3")
+    parser.add_argument("--explain-latency", default="lognormal:900,0.3")
+    parser.add_argument("--url", help="benchmark a running server instead of the in-process app")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Benchmark: attribution cost relative to a plain forward pass.
+
+Times ``model.predict_proba`` against ``PipelineExplainer.explain`` on the
+saved pipeline for several batch sizes; both include preprocessing.
+
+    python -m benchmarks.bench_explain [model_path]
+"""
+import random
+import sys
+import timeit
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from app.explain import PipelineExplainer
+
+BATCH_SIZES = (1, 10, 100, 1000)
+
+
+def synthetic_frame(n: int, rng: random.Random) -> pd.DataFrame:
+    rows = []
+    for _ in range(n):
+        zone, block, pipe = rng.randint(1, 5), rng.randint(1, 5), rng.randint(1, 5)
+        rows.append({
+            "Pressure": rng.uniform(40, 80),
+            "Flow_Rate": rng.uniform(60, 100),
+            "Temperature": rng.uniform(70, 100),
+            "Vibration": rng.uniform(0, 5),
+            "RPM": rng.uniform(1500, 2000),
+            "Operational_Hours": rng.uniform(0, 10000),
+            "Latitude": 28.6 + rng.uniform(-0.1, 0.1),
+            "Longitude": 77.2 + rng.uniform(-0.1, 0.1),
+            "Zone": f"Zone_{zone}",
+            "Block": f"Block_{block}",
+            "Pipe": f"Pipe_{pipe}",
+            "Location_Code": f"Zone_{zone}_Block_{block}_Pipe_{pipe}",
+        })
+    return pd.DataFrame(rows)
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else "models/waterleak_best.pkl"
+    model = joblib.load(path)
+    explainer = PipelineExplainer(model)
+    rng = random.Random(0)
+    for n in BATCH_SIZES:
+        df = synthetic_frame(n, rng)
+        proba, _ = explainer.explain(df)
+        assert np.allclose(proba, model.predict_proba(df)[:, 1])
+        number = max(1, 200 // n)
+        forward = min(timeit.repeat(lambda: model.predict_proba(df), number=number, repeat=3)) / number
+        explain = min(timeit.repeat(lambda: explainer.explain(df), number=number, repeat=3)) / number
+        print(f"batch {n:>5}: predict_proba {forward * 1000:8.2f} ms, "
+              f"explain {explain * 1000:8.2f} ms ({explain / forward:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
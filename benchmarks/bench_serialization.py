@@ -0,0 +1,61 @@
+"""Microbenchmark: /predict request parsing + response encoding.
+
+Compares FastAPI's default path (json.loads, pydantic ``Reading`` validation,
+``jsonable_encoder`` on ``PredictionOut`` without its unset optional
+fields, as ``response_model_exclude_none`` does, and ``JSONResponse`` rendering)
+against ``app.fastpath`` (orjson + generated validator). Model scoring is
+excluded so only the serialization overhead is measured.
+
+    python -m benchmarks.bench_serialization [iterations]
+"""
+import json
+import sys
+import timeit
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app import fastpath
+from app.schemas import Reading, PredictionOut
+
+BODY = json.dumps({
+    "Pressure": 55.0,
+    "Flow_Rate": 80.0,
+    "Temperature": 90.0,
+    "Vibration": 2.0,
+    "RPM": 1800.0,
+    "Operational_Hours": 4000.0,
+    "Latitude": 28.6,
+    "Longitude": 77.2,
+    "Zone": "Zone_1",
+    "Block": "Block_2",
+    "Pipe": "Pipe_1",
+    "Location_Code": "LG-77X",
+}).encode()
+RESULT = {"leakage_flag": 1, "leakage_prob": 0.8123, "risk_level": "critical"}
+
+
+def default_path():
+    reading = Reading.model_validate(json.loads(BODY))
+    out = PredictionOut(**RESULT)
+    return reading, JSONResponse(jsonable_encoder(out, exclude_none=True)).body
+
+
+def fast_path():
+    features = fastpath.decode_reading(BODY)
+    return features, fastpath.encode(RESULT)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    assert json.loads(default_path()[1]) == json.loads(fast_path()[1])
+    results = {}
+    for name, fn in (("default", default_path), ("fastpath", fast_path)):
+        best = min(timeit.repeat(fn, number=n, repeat=5))
+        results[name] = best / n * 1e6
+        print(f"{name:>9}: {results[name]:7.2f} us/request")
+    print(f"  speedup: {results['default'] / results['fastpath']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
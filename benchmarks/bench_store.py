@@ -0,0 +1,80 @@
+"""Benchmark: embedded prediction store appends and zone summaries.
+
+Fills a temporary local store (DuckDB if installed, else SQLite) with
+synthetic predictions from ``TENANTS`` tenants spread over the last 30
+days, appended in batches like ``/predict/batch`` does, then times one
+tenant's ``zone_summary`` over several windows.
+
+    python -m benchmarks.bench_store [rows] [sqlite|duckdb]
+"""
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from app.store import local_store
+
+BATCH = 500
+TENANTS = 10
+WINDOWS_H = (1, 24, 24 * 7, 24 * 30)
+
+
+def synthetic_rows(n: int, rng: random.Random):
+    now = datetime.utcnow()
+    for i in range(n):
+        prob = rng.random()
+        yield {
+            "timestamp": (now - timedelta(seconds=rng.uniform(0, 30 * 86400))).isoformat(),
+            "Pressure": rng.uniform(40, 80),
+            "Flow_Rate": rng.uniform(60, 100),
+            "Temperature": rng.uniform(70, 100),
+            "Vibration": rng.uniform(0, 5),
+            "RPM": rng.uniform(1500, 2000),
+            "Operational_Hours": rng.uniform(0, 10000),
+            "Latitude": 28.6 + rng.uniform(-0.1, 0.1),
+            "Longitude": 77.2 + rng.uniform(-0.1, 0.1),
+            "Zone": f"Zone_{rng.randint(1, 20)}",
+            "Block": f"Block_{rng.randint(1, 10)}",
+            "Pipe": f"Pipe_{rng.randint(1, 50)}",
+            "Location_Code": f"LG-{rng.randint(1, 200)}",
+            "leakage_flag": int(prob >= 0.5),
+            "leakage_prob": prob,
+            "risk_level": "critical" if prob >= 0.75 else "high" if prob >= 0.5 else "low",
+            "request_id": f"bench-{i}",
+            "tenant_id": f"bldg-{rng.randrange(TENANTS)}",
+            "gated": False,
+        }
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    engine = sys.argv[2] if len(sys.argv) > 2 else None
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = local_store(f"{tmp}/predictions", engine=engine)
+        print(f"store: {store.name}, rows: {n}")
+
+        start = time.perf_counter()
+        batch = []
+        for row in synthetic_rows(n, rng):
+            batch.append(row)
+            if len(batch) == BATCH:
+                store.append(batch)
+                batch = []
+        store.append(batch)
+        elapsed = time.perf_counter() - start
+        print(f"append: {n / elapsed:,.0f} rows/s")
+
+        for hours in WINDOWS_H:
+            store.zone_summary(hours, tenant="bldg-0")
+            runs = 20
+            start = time.perf_counter()
+            for _ in range(runs):
+                store.zone_summary(hours, tenant="bldg-0")
+            ms = (time.perf_counter() - start) / runs * 1000
+            print(f"zone_summary({hours:>3}h): {ms:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
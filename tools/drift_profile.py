@@ -0,0 +1,66 @@
+"""Build the reference profile the drift monitor compares live traffic with.
+
+The profile (decile bin edges and proportions per numeric feature,
+category frequencies per categorical feature) is written beside the
+model as ``<model>.drift.json``, where the API picks it up at startup.
+Build it from the training data (``--data``, JSONL or CSV with the input
+columns) or from logged traffic known to be healthy (``--store``). With
+neither, the profile is derived from the fitted scaler and one-hot
+encoder, which is what the API falls back to when no file exists.
+
+    python -m tools.drift_profile --data training.csv
+    python -m tools.drift_profile --store data/predictions.sqlite --hours 720
+"""
+import argparse
+import json
+import sys
+import time
+
+import joblib
+
+from app import drift
+from tools.replay import read_file, read_store
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default="models/waterleak_best.pkl")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--data", help="JSONL or CSV of training rows")
+    source.add_argument("--store", help='"bigquery" or the path of a local .sqlite/.duckdb store')
+    parser.add_argument("--hours", type=float, default=24 * 30, help="store window (most recent hours)")
+    parser.add_argument("--bins", type=int, default=drift.REFERENCE_BINS)
+    parser.add_argument("--out", help="output path (default: beside the model)")
+    args = parser.parse_args()
+
+    model_profile = drift.profile_from_model(joblib.load(args.model), bins=args.bins)
+    if args.data or args.store:
+        if args.data:
+            rows = read_file(args.data)
+        else:
+            end = time.time()
+            rows = read_store(args.store, end - args.hours * 3600, end)
+        numeric = {f: [] for f in drift.NUMERIC_FEATURES}
+        categorical = {f: [] for f in drift.CATEGORICAL_FEATURES}
+        for row in rows:
+            for f, values in numeric.items():
+                values.append(float(row[f]))
+            for f, values in categorical.items():
+                values.append(row[f])
+        profile = drift.profile_from_samples(
+            numeric, categorical, bins=args.bins, source=args.data or args.store,
+            known=model_profile["categorical"],
+        )
+        count = len(next(iter(numeric.values())))
+    else:
+        profile, count = model_profile, 0
+
+    out = args.out or drift.profile_path(args.model)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(profile, f, indent=1)
+    print(f"wrote {out} ({profile['source']}, {count} rows)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
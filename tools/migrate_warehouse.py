@@ -0,0 +1,145 @@
+"""Create or migrate the BigQuery warehouse layout for prediction logs.
+
+Creates the dataset, the day-partitioned, tenant- and Zone-clustered
+``predictions`` table and the ``predictions_zone_hourly`` rollup, then
+backfills the rollup with a MERGE. An existing ``predictions`` table that
+is not yet partitioned is copied into the new layout (values cast, rows
+without a parseable timestamp dropped) and kept as
+``predictions_legacy_<date>``. A partitioned table from before tenants
+is copied the same way (existing rows: tenant ``default``) rather than
+updated in place, which BigQuery refuses for rows still in the streaming
+buffer, and its rollup is recreated from full history; one from before
+gating gets a ``gated`` column. Stop the API while a migration runs and
+deploy the tenant-aware API only after it: rows streamed during a copy
+would land in the legacy table, and its inserts fail on a table without
+``tenant_id``.
+
+    python -m tools.migrate_warehouse [--project P] [--dataset D] [--dry-run]
+    python -m tools.migrate_warehouse --merge-hours 3   # incremental merge only
+
+Set BIGQUERY_EMULATOR_HOST=localhost:9050 to run against a local
+BigQuery emulator.
+"""
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+from app import warehouse
+
+
+def is_managed(table) -> bool:
+    partitioning = table.time_partitioning
+    types = {f.name: f.field_type for f in table.schema}
+    return (
+        partitioning is not None
+        and partitioning.field == "timestamp"
+        and types.get("timestamp") == "TIMESTAMP"
+        and "Zone" in (table.clustering_fields or [])
+    )
+
+
+def has_tenants(table) -> bool:
+    return any(f.name == "tenant_id" for f in table.schema)
+
+
+class Migration:
+    def __init__(self, client, project: str, dataset: str, dry_run: bool):
+        from google.cloud import bigquery
+
+        self.bigquery = bigquery
+        self.client = client
+        self.dataset_id = f"{project}.{dataset}"
+        self.table_id = f"{self.dataset_id}.predictions"
+        self.rollup_id = f"{self.dataset_id}.predictions_zone_hourly"
+        self.dry_run = dry_run
+        self.rollup_recreated = False
+
+    def run(self, sql: str, **params):
+        print(sql.strip() + ";\n")
+        if self.dry_run:
+            return
+        config = self.bigquery.QueryJobConfig(query_parameters=[
+            self.bigquery.ScalarQueryParameter(k, "TIMESTAMP", v) for k, v in params.items()
+        ])
+        self.client.query(sql, job_config=config).result()
+
+    def table(self, table_id: str):
+        from google.api_core.exceptions import NotFound
+
+        try:
+            return self.client.get_table(table_id)
+        except NotFound:
+            return None
+
+    def ensure_dataset(self):
+        print(f"-- dataset {self.dataset_id}")
+        if not self.dry_run:
+            self.client.create_dataset(self.dataset_id, exists_ok=True)
+
+    def ensure_predictions(self):
+        existing = self.table(self.table_id)
+        if existing is None:
+            self.run(warehouse.predictions_ddl(self.table_id))
+            return
+        if is_managed(existing) and has_tenants(existing):
+            print(f"-- {self.table_id} already partitioned and clustered\n")
+            if not any(f.name == "gated" for f in existing.schema):
+                self.run(f"ALTER TABLE `{self.table_id}` ADD COLUMN IF NOT EXISTS gated BOOL")
+            return
+
+        # Copy rather than UPDATE in place: DML fails on rows still in the
+        # streaming buffer (up to ~90 minutes after the last insert), while
+        # a query reads them like any other row
+        staging = f"{self.table_id}_managed"
+        legacy = f"predictions_legacy_{datetime.now(timezone.utc):%Y%m%d}"
+        self.run(warehouse.predictions_ddl(staging))
+        self.run(warehouse.rebuild_sql(self.table_id, staging))
+        self.run(f"ALTER TABLE `{self.table_id}` RENAME TO {legacy}")
+        self.run(f"ALTER TABLE `{staging}` RENAME TO predictions")
+
+    def ensure_rollup(self):
+        existing = self.table(self.rollup_id)
+        if existing is not None and not has_tenants(existing):
+            # Derived data: recreate with the tenant key and refill from history
+            self.run(f"DROP TABLE `{self.rollup_id}`")
+            self.rollup_recreated = True
+        self.run(warehouse.rollup_ddl(self.rollup_id))
+
+    def merge(self, since: datetime):
+        print(f"-- @since = {since.isoformat()}")
+        self.run(warehouse.merge_sql(self.table_id, self.rollup_id), since=since)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--project", default=os.getenv("GCP_PROJECT", "weighty-stacker-472817-j1"))
+    parser.add_argument("--dataset", default=os.getenv("BQ_DATASET", "leakguard_db"))
+    parser.add_argument("--dry-run", action="store_true", help="print the SQL without running it (table metadata is still read)")
+    parser.add_argument("--backfill-hours", type=float,
+                        help="limit the initial rollup backfill to this many hours (default: all history)")
+    parser.add_argument("--merge-hours", type=float,
+                        help="only merge the rollup for the last N hours (for cron / Cloud Scheduler)")
+    args = parser.parse_args()
+
+    client = warehouse.make_client(args.project)
+    migration = Migration(client, args.project, args.dataset, args.dry_run)
+    now = datetime.now(timezone.utc)
+
+    if args.merge_hours is not None:
+        migration.merge(now - timedelta(hours=args.merge_hours))
+        return 0
+
+    migration.ensure_dataset()
+    migration.ensure_predictions()
+    migration.ensure_rollup()
+    if args.backfill_hours is not None and not migration.rollup_recreated:
+        since = now - timedelta(hours=args.backfill_hours)
+    else:
+        since = datetime(1970, 1, 1, tzinfo=timezone.utc)
+    migration.merge(since)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
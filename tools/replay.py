@@ -0,0 +1,262 @@
+"""Replay logged prediction traffic against a running API.
+
+Rows are read from a JSONL or CSV file with the fields ``predict`` logs,
+or from a prediction store (``--store bigquery`` or the path of a local
+SQLite/DuckDB store). Requests are sent open loop: each one is fired at
+its original offset divided by ``--speed``, whether or not earlier
+requests have completed, so a slow server sees the queue build up the
+way it would in production. With ``--endpoint batch`` the rows that
+arrived within ``--batch-window-ms`` of each other (original time) go out
+as one ``/predict/batch`` call. Each row is sent as its logged tenant
+(``tenant_id``, via X-Tenant-ID) unless ``--tenant`` names one for all;
+``--tenant-keys`` is a JSON file of tenant keys in the API's TENANT_KEYS
+format. ``--dry-run`` keeps the replayed rows out of the target's
+prediction log and live views on either endpoint.
+
+The report gives achieved vs. offered rate, status counts, latency and
+scheduling-lag percentiles, and how often the returned leakage_prob
+diverges from the logged one by more than ``--tolerance``. Rows logged
+with ``gated`` set carry the gate's envelope estimate rather than a
+model score, so they are counted but not compared.
+
+    python -m tools.replay --url http://localhost:8080 --file day.jsonl --speed 10
+    python -m tools.replay --url ... --store data/predictions.sqlite --hours 24 --endpoint batch
+"""
+import argparse
+import asyncio
+import csv
+import json
+import sys
+import time
+from datetime import datetime
+
+import httpx
+
+from app.fastpath import FLOAT_FIELDS, READING_FIELDS
+from app.rollup import to_epoch
+
+
+def read_file(path: str):
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith(".csv"):
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def read_store(spec: str, start: float, end: float):
+    if spec == "bigquery":
+        import os
+
+        from app.store import BigQueryStore
+
+        project = os.getenv("GCP_PROJECT", "weighty-stacker-472817-j1")
+        dataset = os.getenv("BQ_DATASET", "leakguard_db")
+        store = BigQueryStore(project, f"{project}.{dataset}.predictions",
+                              f"{project}.{dataset}.predictions_zone_hourly")
+    else:
+        from app.store import local_store
+
+        engine = "duckdb" if spec.endswith(".duckdb") else "sqlite"
+        store = local_store(spec, engine=engine)
+    return store.rows(start, end)
+
+
+def logged_flag(value) -> bool:
+    # bool/int from a store, "True"/"1" from CSV, missing in older logs
+    return str(value).strip().lower() in ("1", "true")
+
+
+def load_rows(args) -> list:
+    """(epoch, reading, logged_prob, tenant, gated) tuples in time order."""
+    if args.file:
+        source = read_file(args.file)
+    else:
+        end = time.time()
+        source = read_store(args.store, end - args.hours * 3600, end)
+    rows = []
+    for r in source:
+        reading = {k: float(r[k]) if k in FLOAT_FIELDS else r[k] for k in READING_FIELDS}
+        logged = r.get("leakage_prob")
+        rows.append((
+            to_epoch(datetime.fromisoformat(str(r["timestamp"]))),
+            reading,
+            float(logged) if logged not in (None, "") else None,
+            args.tenant or r.get("tenant_id") or None,
+            logged_flag(r.get("gated")),
+        ))
+        if args.limit and len(rows) >= args.limit:
+            break
+    rows.sort(key=lambda row: row[0])
+    return rows
+
+
+def schedule(rows: list, endpoint: str, window_s: float, max_batch: int) -> list:
+    """Group rows into (offset_s, [rows]) requests in original time, one tenant per request."""
+    if not rows:
+        return []
+    t0 = rows[0][0]
+    if endpoint == "predict":
+        return [(r[0] - t0, [r]) for r in rows]
+    requests, current = [], []
+    for r in rows:
+        if current and (r[0] - current[0][0] > window_s or len(current) >= max_batch
+                        or r[3] != current[0][3]):
+            requests.append((current[0][0] - t0, current))
+            current = []
+        current.append(r)
+    requests.append((current[0][0] - t0, current))
+    return requests
+
+
+def percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Replay:
+    def __init__(self, client, url: str, endpoint: str, dry_run: bool, tolerance: float,
+                 tenant_keys: dict = None):
+        self.client = client
+        self.tenant_keys = tenant_keys or {}
+        self.url = url.rstrip("/") + ("/predict" if endpoint == "predict" else "/predict/batch")
+        self.endpoint = endpoint
+        self.dry_run = dry_run
+        self.tolerance = tolerance
+        self.latencies_ms = []
+        self.lags_ms = []
+        self.status = {}
+        self.compared = 0
+        self.gated = 0
+        self.diverged = 0
+        self.abs_diff = 0.0
+
+    def headers(self, tenant: str):
+        if not tenant:
+            return None
+        return {"X-Tenant-ID": tenant, "X-Tenant-Key": self.tenant_keys.get(tenant, "")}
+
+    async def send(self, due: float, batch: list):
+        self.lags_ms.append(max(0.0, time.perf_counter() - due) * 1000)
+        params = None
+        if self.endpoint == "predict":
+            body = batch[0][1]
+            params = {"dry_run": "true"} if self.dry_run else None
+        else:
+            body = {"readings": [r[1] for r in batch], "dry_run": self.dry_run}
+        tenant = batch[0][3]
+        start = time.perf_counter()
+        try:
+            resp = await self.client.post(self.url, json=body, params=params, headers=self.headers(tenant))
+            code = resp.status_code
+        except httpx.HTTPError as e:
+            code = type(e).__name__
+            resp = None
+        self.latencies_ms.append((time.perf_counter() - start) * 1000)
+        self.status[code] = self.status.get(code, 0) + 1
+        if code != 200:
+            return
+        data = resp.json()
+        probs = [data["leakage_prob"]] if self.endpoint == "predict" else data["leakage_prob"]
+        for (_, _, logged, _, gated), prob in zip(batch, probs):
+            if gated:
+                self.gated += 1
+                continue
+            if logged is None:
+                continue
+            diff = abs(prob - logged)
+            self.compared += 1
+            self.abs_diff += diff
+            self.diverged += diff > self.tolerance
+
+    async def run(self, requests: list, speed: float):
+        tasks = []
+        start = time.perf_counter()
+        for offset, batch in requests:
+            due = start + offset / speed
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(self.send(due, batch)))
+        await asyncio.gather(*tasks)
+        return time.perf_counter() - start
+
+    def report(self, rows: int, requests: list, elapsed: float, speed: float) -> dict:
+        span = requests[-1][0] / speed if requests else 0.0
+        return {
+            "rows": rows,
+            "requests": len(requests),
+            "offered_rps": len(requests) / span if span else None,
+            "achieved_rps": len(requests) / elapsed if elapsed else None,
+            "elapsed_s": elapsed,
+            "status": {str(k): v for k, v in sorted(self.status.items(), key=str)},
+            "latency_ms": {
+                "p50": percentile(self.latencies_ms, 0.5),
+                "p90": percentile(self.latencies_ms, 0.9),
+                "p99": percentile(self.latencies_ms, 0.99),
+                "max": max(self.latencies_ms, default=0.0),
+            },
+            "schedule_lag_ms": {
+                "p50": percentile(self.lags_ms, 0.5),
+                "p99": percentile(self.lags_ms, 0.99),
+            },
+            "divergence": {
+                "compared": self.compared,
+                "skipped_gated": self.gated,
+                "tolerance": self.tolerance,
+                "rate": self.diverged / self.compared if self.compared else None,
+                "mean_abs_diff": self.abs_diff / self.compared if self.compared else None,
+            },
+        }
+
+
+async def main_async(args) -> dict:
+    rows = load_rows(args)
+    requests = schedule(rows, args.endpoint, args.batch_window_ms / 1000, args.max_batch)
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    tenant_keys = {}
+    if args.tenant_keys:
+        with open(args.tenant_keys, encoding="utf-8") as f:
+            tenant_keys = json.load(f)
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        replay = Replay(client, args.url, args.endpoint, args.dry_run, args.tolerance, tenant_keys)
+        elapsed = await replay.run(requests, args.speed)
+    return replay.report(len(rows), requests, elapsed, args.speed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", required=True, help="base URL of the API, e.g. http://localhost:8080")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--file", help="JSONL or CSV of logged prediction rows")
+    source.add_argument("--store", help='"bigquery" or the path of a local .sqlite/.duckdb store')
+    parser.add_argument("--hours", type=float, default=24, help="store window to replay (most recent hours)")
+    parser.add_argument("--limit", type=int, help="replay at most this many rows")
+    parser.add_argument("--tenant", help="send every row as this tenant (default: each row's tenant_id)")
+    parser.add_argument("--tenant-keys", help="JSON file mapping tenant IDs to their keys")
+    parser.add_argument("--speed", type=float, default=1.0, help="time compression factor (10 = 10x faster)")
+    parser.add_argument("--endpoint", choices=("predict", "batch"), default="predict")
+    parser.add_argument("--batch-window-ms", type=float, default=100.0)
+    parser.add_argument("--max-batch", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true", help="do not log replayed rows or update live views")
+    parser.add_argument("--tolerance", type=float, default=0.01, help="|prob - logged prob| counted as divergence")
+    parser.add_argument("--max-connections", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--report", help="also write the report as JSON to this path")
+    args = parser.parse_args()
+
+    report = asyncio.run(main_async(args))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())